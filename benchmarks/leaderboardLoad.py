@@ -0,0 +1,105 @@
+import argparse
+import os
+import statistics
+import sys
+import threading
+import time
+import numpy as np
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Repo root, for fetchEngine etc.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "crypto_game"))
+import leaderboard
+import priceMatrix
+import scoring
+from scoringBench import START_DATE, synthetic_inputs
+
+# Load test for crypto_game/leaderboard.py: 10k synthetic attendees over 100 coins, then an hour of per-minute ticks (every
+# coin moves once a minute) squashed into a few seconds. After each simulated minute it asks for the top 10 and a batch of
+# individual ranks, and reports how long ticks and queries took. At the end the board is checked against a full re-score, and
+# the HTTP endpoint is polled while ticks keep coming in, to see what a widget would see.
+
+
+def percentiles(samples):
+    samples = sorted(samples)
+    return (f"p50 {statistics.median(samples) * 1e6:,.0f}us, p99 {samples[int(len(samples) * 0.99)] * 1e6:,.0f}us, "
+            f"max {samples[-1] * 1e6:,.0f}us")
+
+
+def timed(fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    return result, time.perf_counter() - started
+
+
+# Every attendee's gain worked out from scratch, for checking the board against
+def brute_force_gains(board):
+    return np.array([leaderboard.gain(start, board.prices[symbol])
+                     for symbol, entries in board.coins.items() for start, _, _ in entries])
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Load test the live leaderboard")
+    arg_parser.add_argument("--entrants", type=int, default=10_000)
+    arg_parser.add_argument("--minutes", type=int, default=60, help="Simulated minutes of ticks (one per coin per minute)")
+    arg_parser.add_argument("--ranks", type=int, default=100, help="Rank queries per simulated minute")
+    arg_parser.add_argument("--polls", type=int, default=500, help="HTTP polls of /leaderboard at the end")
+    args = arg_parser.parse_args()
+
+    attendee_df, price_df, end_date = synthetic_inputs(args.entrants, days=120)
+    matrix = priceMatrix.PriceMatrix(price_df.to_numpy().T, START_DATE, list(price_df.index), list(price_df.index))
+
+    board, build_seconds = timed(leaderboard.from_price_matrix, attendee_df, matrix, end_date)
+    print(f"Built board for {board.size:,} attendees over {len(board.coins)} coins in {build_seconds * 1000:.1f}ms")
+
+    batch = scoring.score_price_matrix(attendee_df, matrix, end_date)
+    same = np.array_equal(batch['gainLoss'].to_numpy(), np.array([r["gainLoss"] for r in board.top(board.size)]))
+    print(f"Starting order matches the batch scorer: {same}")
+
+    rng = np.random.default_rng(7)
+    names = attendee_df['attendeeName'].to_numpy()
+    tick_times, top_times, rank_times = [], [], []
+    for minute in range(args.minutes):
+        for symbol in board.coins:
+            price = board.prices[symbol] * (1 + rng.normal(0, 0.01))
+            _, seconds = timed(board.tick, symbol, price)
+            tick_times.append(seconds)
+        _, seconds = timed(board.top, 10)
+        top_times.append(seconds)
+        for name in rng.choice(names, size=args.ranks):
+            _, seconds = timed(board.rank, name)
+            rank_times.append(seconds)
+
+    print(f"{len(tick_times):,} ticks: {percentiles(tick_times)}")
+    print(f"{len(top_times):,} top-10 queries: {percentiles(top_times)}")
+    print(f"{len(rank_times):,} rank queries: {percentiles(rank_times)}")
+
+    gains = brute_force_gains(board)
+    top = board.top(100)
+    top_ok = np.array_equal(np.sort(gains)[::-1][:100], np.array([r["gainLoss"] for r in top]))
+    rank_ok = all(r["rank"] == 1 + int((gains > r["gainLoss"]).sum())
+                  for name in rng.choice(names, size=200) for r in board.rank(name))
+    print(f"After {args.minutes} minutes of ticks - top 100 matches a full re-score: {top_ok}, sampled ranks match: {rank_ok}")
+
+    server = leaderboard.start_server(board, port=0)
+    url = f"http://{server.server_address[0]}:{server.server_address[1]}/leaderboard?n=10"
+    stop = threading.Event()
+
+    def keep_ticking():
+        while not stop.is_set():
+            for symbol in board.coins:
+                board.tick(symbol, board.prices[symbol] * (1 + rng.normal(0, 0.01)))
+            time.sleep(0.01)
+
+    ticker = threading.Thread(target=keep_ticking, daemon=True)
+    ticker.start()
+    session = requests.Session()
+    poll_times = []
+    for _ in range(args.polls):
+        response, seconds = timed(session.get, url)
+        response.raise_for_status()
+        poll_times.append(seconds)
+    stop.set()
+    ticker.join()
+    server.shutdown()
+    print(f"{args.polls:,} HTTP polls of /leaderboard?n=10 while ticking: {percentiles(poll_times)}")
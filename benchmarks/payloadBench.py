@@ -0,0 +1,76 @@
+import argparse
+import gzip
+import json
+import os
+import statistics
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Repo root, for tableExport
+import tableExport
+
+# What does the widget download and parse on a page load? Compares the full tableData.json (as committed, pretty-printed)
+# with the compact payloads tableExport.py writes:
+#   - first visit: static + hot payloads
+#   - repeat visit: just the hot payload, the static part coming from the browser's cache
+# Sizes are shown raw, gzipped and brotli'd (if brotli is installed), and parse time is json.loads() - not the browser's
+# JSON.parse, but the relative difference carries over. --coins scales the table up with copies of the real coins.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def scaled_table(table_data, coins):
+    entries = list(table_data.values())
+    scaled = {}
+    for i in range(coins):
+        entry = dict(entries[i % len(entries)])
+        if i >= len(entries):
+            entry["symbol"] = f"{entry['symbol']}{i}"
+        scaled[entry["symbol"]] = entry
+    return scaled
+
+
+def sizes(data):
+    result = [len(data), len(gzip.compress(data, compresslevel=9, mtime=0))]
+    if tableExport.brotli is not None:
+        result.append(len(tableExport.brotli.compress(data, quality=11)))
+    return result
+
+
+def parse_time(data, runs):
+    timings = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        json.loads(data)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Compare tableData.json with the compact static/hot widget payloads")
+    arg_parser.add_argument("--coins", type=int, help="Scale the table to this many coins (default: as committed)")
+    arg_parser.add_argument("--runs", type=int, default=200, help="Parses per payload (the median is reported)")
+    args = arg_parser.parse_args()
+
+    with open(os.path.join(REPO_ROOT, "tableData.json"), "rb") as f:
+        full = f.read()
+    table_data = json.loads(full)
+    if args.coins:
+        table_data = scaled_table(table_data, args.coins)
+        full = json.dumps(table_data, indent=2).encode("utf-8")
+
+    static = tableExport.encode(tableExport.static_payload(table_data))
+    hot = tableExport.encode(tableExport.hot_payload(table_data, "0" * 12))
+    # Each is a list of the files fetched - the first visit parses two documents, so its parse time is the pair's
+    payloads = [("tableData.json", [full]), ("static + hot (first visit)", [static, hot]), ("hot only (repeat visit)", [hot])]
+
+    columns = ["raw", "gzip"] + (["brotli"] if tableExport.brotli is not None else [])
+    print(f"{len(table_data)} coins\n")
+    print(f"{'':>28} " + " ".join(f"{c:>10}" for c in columns) + f" {'parse':>10}")
+    baseline = None
+    for name, files in payloads:
+        row = [sum(column) for column in zip(*(sizes(data) for data in files))] + [sum(parse_time(data, args.runs) for data in files)]
+        saving = "" if baseline is None else \
+            f"   ({1 - row[1] / baseline[1]:.0%} fewer gzipped bytes, {1 - row[-1] / baseline[-1]:.0%} less parsing)"
+        baseline = baseline or row
+        print(f"{name:>28} " + " ".join(f"{size:>9,}B" for size in row[:-1]) + f" {row[-1] * 1e6:>8.0f}us" + saving)
@@ -0,0 +1,72 @@
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Repo root, for priceStore
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "crypto_game"))
+import priceMatrix
+import scoring
+from scoringBench import START_DATE, synthetic_inputs
+
+# Loading a year of daily prices for the crypto game two ways:
+#   - the old way: parse the wide coinGeckoData.csv (one column per day), then work out which column each date is
+#   - the new way: memory-map priceMatrix.npy, where a date's row is just its day offset from START_DATE
+# and then scoring the same synthetic entrant list through the old price_df route and the memmap, to check they agree.
+
+
+def median_time(fn, repeats):
+    times = []
+    for _ in range(repeats):
+        started = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - started)
+    return statistics.median(times)
+
+
+def load_csv(path):
+    price_df = pd.read_csv(path, index_col=0)
+    price_df.set_index("symbol", inplace=True)
+    return price_df, scoring.price_matrix(price_df)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Compare coinGeckoData.csv with the memory-mapped price matrix")
+    arg_parser.add_argument("--days", type=int, default=365)
+    arg_parser.add_argument("--entrants", type=int, default=100_000)
+    arg_parser.add_argument("--repeats", type=int, default=20)
+    args = arg_parser.parse_args()
+
+    attendee_df, price_df, end_date = synthetic_inputs(args.entrants, days=args.days)
+    workdir = tempfile.mkdtemp(prefix="priceMatrixBench")
+    try:
+        csv_path = os.path.join(workdir, "coinGeckoData.csv")
+        npy_path = os.path.join(workdir, priceMatrix.MATRIX_PATH)
+        price_df.reset_index().to_csv(csv_path)     # Same layout get_data() writes: row number, symbol, one column per day
+        matrix = priceMatrix.PriceMatrix(price_df.to_numpy().T, START_DATE, list(price_df.index), list(price_df.index))
+        priceMatrix.save(matrix, npy_path)
+        print(f"{len(price_df)} symbols x {args.days} days: coinGeckoData.csv {os.path.getsize(csv_path) / 1024:,.0f}KB, "
+              f"priceMatrix.npy {os.path.getsize(npy_path) / 1024:,.0f}KB")
+
+        csv_seconds = median_time(lambda: load_csv(csv_path), args.repeats)
+        npy_seconds = median_time(lambda: priceMatrix.load(npy_path), args.repeats)
+        print(f"load: csv {csv_seconds * 1000:.1f}ms, memmap {npy_seconds * 1000:.2f}ms ({csv_seconds / npy_seconds:,.0f}x faster)")
+
+        # Scored against the original frame rather than the one read back from the CSV - pandas' default float parser isn't
+        # exactly round-trip, so the CSV copy can be a last-bit different, and it was never what decide_winner() scored anyway
+        stored = priceMatrix.load(npy_path)
+        started = time.perf_counter()
+        old_results = scoring.score_attendees(attendee_df, price_df, end_date)
+        old_seconds = time.perf_counter() - started
+        started = time.perf_counter()
+        new_results = scoring.score_price_matrix(attendee_df, stored, end_date)
+        new_seconds = time.perf_counter() - started
+        print(f"score {args.entrants:,} entrants: via price_df {old_seconds:.3f}s, via memmap {new_seconds:.3f}s")
+        print(f"Results identical: {old_results.to_csv(index=False) == new_results.to_csv(index=False)}")
+        del stored     # Let go of the memmap before deleting the file underneath it
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
@@ -0,0 +1,57 @@
+from datetime import date, timedelta
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Repo root, for priceStore
+import priceStore
+
+# Checks how priceStore.missing_since() decides what's left to fetch, against an in-memory store. Each case is a coin's fetch
+# history and the first day the crypto game should still ask CoinGecko for (None - nothing to ask for):
+#   - a coin listed after the start date, so it has no prices for the first days of the window - not fetched again
+#   - a gap in the middle of what's been fetched - asked for from the start of the gap
+#   - "today" as fetched today (covered) and as fetched yesterday (only a snapshot, so asked for again)
+# Exits with code 1 if any case comes out wrong.
+
+START_DATE = date(2025, 7, 14)
+TODAY = date(2025, 10, 1)
+
+
+def days(first, last):
+    return {first + timedelta(days=i): 1.0 + i for i in range((last - first).days + 1)}
+
+
+# (name, [(from, to, fetched_on, first day with a price or None)], end date, today, expected)
+CASES = [
+    ("never fetched", [], TODAY, TODAY, START_DATE),
+    ("listed after the start date, same-day re-run",
+     [(START_DATE, TODAY, TODAY, date(2025, 9, 1))], TODAY, TODAY, None),
+    ("listed after the start date, next day",
+     [(START_DATE, TODAY, TODAY, date(2025, 9, 1))], TODAY + timedelta(days=1), TODAY + timedelta(days=1), TODAY),
+    ("never had a price at all",
+     [(START_DATE, TODAY, TODAY, None)], TODAY, TODAY, None),
+    ("gap in the middle",
+     [(START_DATE, date(2025, 8, 1), TODAY, START_DATE), (date(2025, 8, 20), TODAY, TODAY, date(2025, 8, 20))],
+     TODAY, TODAY, date(2025, 8, 2)),
+    ("fetched up to yesterday",
+     [(START_DATE, TODAY - timedelta(days=1), TODAY - timedelta(days=1), START_DATE)], TODAY, TODAY, TODAY - timedelta(days=1)),
+    ("topped up after an earlier run",
+     [(START_DATE, TODAY - timedelta(days=1), TODAY - timedelta(days=1), START_DATE),
+      (TODAY - timedelta(days=1), TODAY, TODAY, TODAY - timedelta(days=1))], TODAY, TODAY, None),
+]
+
+
+def check(name, fetches, end_date, today, expected):
+    store = priceStore.open_store(":memory:")
+    for from_date, to_date, fetched_on, first_price in fetches:
+        if first_price is not None:
+            priceStore.save_prices(store, "coin", days(max(first_price, from_date), to_date))
+        priceStore.record_fetched(store, "coin", from_date, to_date, fetched_on)
+    got = priceStore.missing_since(store, "coin", START_DATE, end_date, today)
+    store.close()
+    print(f"{'ok' if got == expected else 'FAIL':>4}  {name}: {got} (expected {expected})")
+    return got == expected
+
+
+if __name__ == "__main__":
+    failed = sum(1 for case in CASES if not check(*case))
+    sys.exit(1 if failed else 0)
@@ -0,0 +1,75 @@
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Repo root, for fetchEngine
+import fetchEngine
+from stubCoinGecko import start_stub
+
+# Runs the shared fetch engine against the local stub server and reports how long a batch of requests took compared with
+# what the rate limit says it should take, plus how many 429s came back. Three checks by default:
+#   1. client limit == server limit  -> should see zero 429s and an end-to-end time close to the theoretical minimum
+#   2. client limit  > server limit  -> the server pushes back, and the engine should recover using Retry-After
+#   3. no server at all - jobs waiting on the bucket when a 429 pauses it must still go out one interval apart afterwards,
+#      not all at once the moment the pause ends (which would just earn another 429). Exits with code 1 if they bunch up
+# The matched run uses high per-minute rates, and the second shrinks the stub's "minute" to a couple of seconds, so the whole
+# thing finishes in seconds rather than minutes.
+
+
+def run(requests_to_send, client_rate, server_rate, burst, window=60):
+    stub = start_stub(rate_per_minute=server_rate, window=window)
+    jobs = [(f"{stub.base_url}/simple/price", {"ids": f"coin-{i}", "vs_currencies": "usd"}) for i in range(requests_to_send)]
+    engine = fetchEngine.FetchEngine(rate_per_minute=client_rate, burst=burst, cache=False)   # Every request must hit the stub
+
+    started = time.perf_counter()
+    results = fetchEngine.fetch_many(jobs, engine)
+    elapsed = time.perf_counter() - started
+    engine.close()
+    stub.shutdown()
+
+    expected = max(0, requests_to_send - burst) * 60.0 / client_rate
+    failed = sum(1 for r in results if r is None)
+    print(f"client {client_rate:g}/min vs server {server_rate:g}/min: {requests_to_send} requests in {elapsed:.2f}s "
+          f"(rate-limit minimum {expected:.2f}s), {stub.rejected} x 429, {failed} failed, "
+          f"{engine.stats['requests']} sent in total")
+    return elapsed, stub.rejected, failed
+
+
+# Sends 'jobs' through a bare bucket, with a pause() partway through as if one of them had been sent a 429
+def pause_check(jobs=6, rate=60, pause_at=0.5, pause_for=3):
+    bucket = fetchEngine.TokenBucket(rate)
+    started = time.monotonic()
+    sends = []
+
+    async def job():
+        await bucket.acquire()
+        sends.append(time.monotonic() - started)
+
+    async def rate_limited():
+        await asyncio.sleep(pause_at)
+        bucket.pause(pause_for)
+
+    async def main():
+        await asyncio.gather(rate_limited(), *(job() for _ in range(jobs)))
+
+    asyncio.run(main())
+    after = [t for t in sends if t >= pause_at]
+    gaps = [b - a for a, b in zip(after, after[1:])]
+    bunched = sum(1 for gap in gaps if gap < bucket.interval * 0.9)
+    print(f"pause({pause_for:g}s) at {pause_at:g}s, {rate:g}/min: sends at {', '.join(f'{t:.2f}' for t in sends)}s - "
+          f"{bunched} sent less than {bucket.interval:g}s after the one before")
+    return bunched
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Check the fetch engine's token bucket against the local stub server")
+    arg_parser.add_argument("--requests", type=int, default=30)
+    arg_parser.add_argument("--rate", type=float, default=600, help="Requests per minute for the matched run")
+    arg_parser.add_argument("--burst", type=int, default=1)
+    args = arg_parser.parse_args()
+
+    run(args.requests, args.rate, args.rate, args.burst)
+    run(args.requests // 3, args.rate * 10, args.requests // 6, args.burst, window=2)
+    sys.exit(1 if pause_check() else 0)
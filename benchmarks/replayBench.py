@@ -0,0 +1,78 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Repo root, for priceProvider etc.
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "crypto_game"))
+import cryptoGame
+import cryptoTable
+import priceProvider
+from stubCoinGecko import start_stub
+
+# Records one full fetch pass (today's prices for every coin in cryptoList.csv, plus a crypto game market_chart request per
+# coin) from the local stub through CoinGeckoProvider, then replays it through ReplayProvider:
+#   - flat out (no recorded timings), to show what fetch + parse costs on its own with the network taken away
+#   - at the recorded pace (scaled by --speed), to show a replay can stand in for a real run timing-wise
+# Every replay has to give back exactly what was recorded, so this doubles as a check that the replay path is deterministic.
+# Pass --keep DIR to hold on to the recordings, eg. to point PRICE_PROVIDER=replay PRICE_REPLAY_DIR=DIR at them in CI.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def fetch_pass(provider, coin_ids, days):
+    prices = cryptoTable.fetch_todays_prices(coin_ids, provider)
+    jobs = [(priceProvider.MARKET_CHART.format(coin_id), {"vs_currency": cryptoGame.CURRENCY, "days": days, "interval": "daily"})
+            for coin_id in coin_ids]
+    charts = priceProvider.fetch_many(jobs, provider)
+    return prices, charts
+
+
+def timed_pass(provider, coin_ids, days):
+    started = time.perf_counter()
+    result = fetch_pass(provider, coin_ids, days)
+    return result, time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Record a fetch pass from the stub, then replay it offline")
+    arg_parser.add_argument("--latency", type=float, default=0.05, help="Stub latency per request (seconds)")
+    arg_parser.add_argument("--speed", type=float, default=1.0, help="Replay pace, as a multiple of the recorded pace")
+    arg_parser.add_argument("--replays", type=int, default=5, help="Flat-out replays to time")
+    arg_parser.add_argument("--keep", help="Keep the recordings in this folder")
+    args = arg_parser.parse_args()
+
+    os.chdir(REPO_ROOT)     # For cryptoList.csv
+    coin_ids = list(cryptoTable.load_symbols().values())
+    days = (cryptoGame.END_DATE - cryptoGame.START_DATE + timedelta(days=1)).days
+
+    record_dir = args.keep or tempfile.mkdtemp(prefix="replayBench")
+    stub = start_stub(latency=args.latency)
+    try:
+        recorder = priceProvider.CoinGeckoProvider(api_base=stub.base_url, record_dir=record_dir, rate_per_minute=100_000,
+                                                   cache=False)
+        recorded, live_seconds = timed_pass(recorder, coin_ids, days)
+        recorder.close()
+        stub.shutdown()
+        print(f"Recorded {len(os.listdir(record_dir))} responses for {len(coin_ids)} coins from the stub "
+              f"({args.latency * 1000:.0f}ms latency) in {live_seconds:.2f}s")
+
+        flat_out = priceProvider.ReplayProvider(record_dir)
+        times = []
+        for _ in range(args.replays):
+            replayed, seconds = timed_pass(flat_out, coin_ids, days)
+            times.append(seconds)
+            if replayed != recorded:
+                sys.exit("❌ Replay didn't match the recording")
+        print(f"Replay flat out: best {min(times) * 1000:.1f}ms of {args.replays}, identical to the recording every time")
+
+        paced = priceProvider.ReplayProvider(record_dir, speed=args.speed)
+        replayed, seconds = timed_pass(paced, coin_ids, days)
+        print(f"Replay at {args.speed:g}x recorded pace: {seconds:.2f}s (live run took {live_seconds:.2f}s), "
+              f"identical: {replayed == recorded}")
+    finally:
+        if not args.keep:
+            shutil.rmtree(record_dir, ignore_errors=True)
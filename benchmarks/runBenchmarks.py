@@ -0,0 +1,316 @@
+from contextlib import redirect_stdout
+from datetime import date, datetime, timedelta
+import argparse
+import csv
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+import numpy as np
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, REPO_ROOT)                                   # For cryptoTable, priceProvider etc.
+sys.path.insert(0, os.path.join(REPO_ROOT, "crypto_game"))      # For cryptoGame, entrantDataNormalizer, priceMatrix
+from stubCoinGecko import start_stub
+
+# End-to-end benchmarks for the three hot paths, each run against the local stub API on synthetic inputs at several scales:
+#   - updater            cryptoTable.main() over N coins (cryptoList.csv + tableData.json with N entries)
+#   - normalizer         entrantDataNormalizer.main() over a messy N-row entrants export - duplicate picks, full coin names
+#                        and ids instead of tickers, mixed date formats, missing times, coins we don't list
+#   - normalizer-stream  the same export through entrantDataNormalizer's --stream mode
+#   - scorer             cryptoGame.decide_winner() over N attendees, with a tie planted at the top so the tiebreaker runs too
+# Every run is a fresh worker process in a fresh copy of the inputs, so peak RSS belongs to that stage alone. Allocations
+# are measured by tracemalloc in a separate run, so they don't slow down the timed one.
+#
+# Results go to a JSON report (with the commit it was run on), which --compare checks against an earlier one:
+#   python benchmarks/runBenchmarks.py --output before.json
+#   ... change things ...
+#   python benchmarks/runBenchmarks.py --output after.json --compare before.json
+#   python benchmarks/runBenchmarks.py --compare before.json after.json      (just compare two reports)
+# Anything that got slower or bigger than --threshold is flagged, and the exit code is 1 so CI can fail on it.
+#
+# The 1M runs take a while (and a few GB of disk for the updater), so use eg. --scales 100,10000 for a quick pass.
+
+STAGES = ["updater", "normalizer", "normalizer-stream", "scorer"]
+SCALES = [100, 10_000, 1_000_000]
+METRICS = ["wall_seconds", "peak_rss_mb", "alloc_peak_mb"]
+THRESHOLD = 0.10        # Flag anything more than 10% worse than the baseline
+SEED = 42
+START_DATE = date(2025, 7, 14)
+SIGNUP_DAYS = 60        # Entrants sign up over the first two months of the game
+
+
+# ----------------------------------------------------------------------
+# Synthetic inputs
+# ----------------------------------------------------------------------
+
+def real_coins():
+    with open(os.path.join(REPO_ROOT, "cryptoList.csv"), newline="", encoding="utf-8") as f:
+        return [(row["id"], row["symbol"], row["name"]) for row in csv.DictReader(f)]
+
+
+def write_csv(path, header, rows):
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(header)
+        writer.writerows(rows)
+
+
+# cryptoList.csv and tableData.json for n made-up coins, all started on START_DATE
+def updater_inputs(workdir, n, rng):
+    coins = [(f"synthetic-coin-{i}", f"sc{i}", f"Synthetic Coin {i}") for i in range(n)]
+    write_csv(os.path.join(workdir, "cryptoList.csv"), ["id", "symbol", "name"], coins)
+
+    start_prices = rng.lognormal(mean=2, sigma=2, size=n)
+    table = {}
+    for (coin_id, symbol, name), price in zip(coins, start_prices):
+        price = float(price)
+        table[symbol] = {"symbol": symbol, "id": name, "thumb": f"https://example.invalid/{coin_id}/small.png",
+                         "start_date": START_DATE.isoformat(), "start_price": price,
+                         "start_prices": {"usd": price, "eur": price * 0.9, "gbp": price * 0.8},
+                         "todays_date": START_DATE.isoformat(), "todays_price": price, "percent_change": 0.0}
+    with open(os.path.join(workdir, "tableData.json"), "w") as f:
+        json.dump(table, f, indent=4)
+
+
+# An n-row entrants export in the shape the ticketing site gives us, warts and all
+def normalizer_inputs(workdir, n, rng):
+    shutil.copy(os.path.join(REPO_ROOT, "cryptoList.csv"), workdir)
+    coins = real_coins()
+
+    base = n - n // 20
+    people = rng.integers(0, max(1, int(base * 0.7)), size=base)       # Plenty of people pick more than one coin
+    coin_picks = rng.integers(0, len(coins), size=base)
+    coin_styles = rng.choice(6, size=base, p=[0.35, 0.25, 0.15, 0.1, 0.1, 0.05])
+    days = rng.integers(0, SIGNUP_DAYS, size=base)
+    date_styles = rng.choice(4, size=base, p=[0.5, 0.35, 0.1, 0.05])
+    minutes = rng.integers(0, 24 * 60, size=base)
+    has_time = rng.random(size=base) < 0.85
+
+    rows = []
+    for person, pick, coin_style, day, date_style, minute, timed in zip(people, coin_picks, coin_styles, days, date_styles,
+                                                                        minutes, has_time):
+        coin_id, symbol, name = coins[pick]
+        coin = [symbol, symbol.upper(), name, coin_id, f"{name} ({symbol.upper()})", f"NotACoin{pick}"][coin_style]
+        signed_up = START_DATE + timedelta(days=int(day))
+        signed_up_on = [signed_up.strftime("%d/%m/%Y"), signed_up.strftime("%d/%m/%y"), signed_up.strftime("%d %B %Y"),
+                        "TBC"][date_style]
+        signed_up_at = f"{minute // 60:02d}:{minute % 60:02d}" if timed else ""
+        rows.append([f"Entrant {person}" + (" " if person % 7 == 0 else ""), signed_up_on, signed_up_at, coin,
+                     "Party" if person % 11 == 0 else "Standard"])
+
+    rows.extend(rows[i] for i in rng.integers(0, base, size=n - base))  # Straight double submissions
+    order = rng.permutation(len(rows))
+    write_csv(os.path.join(workdir, "GDAC Crypto game entrants.csv"), ["Name", "Date ", "Time ", "Coin", "Ticket Type"],
+              [rows[i] for i in order])
+
+
+# attendeeList.csv with n attendees over the real coin list, plus a priceMatrix.npy of made-up prices up to today
+def scorer_inputs(workdir, n, rng):
+    import priceMatrix
+
+    shutil.copy(os.path.join(REPO_ROOT, "cryptoList.csv"), workdir)
+    symbols = [symbol for _, symbol, _ in real_coins()]
+
+    days = (datetime.today().date() - START_DATE).days + 1
+    walk = np.exp(np.cumsum(rng.normal(0, 0.03, size=(days, len(symbols))), axis=0))
+    prices = rng.lognormal(mean=2, sigma=2, size=len(symbols)) * walk
+    priceMatrix.save(priceMatrix.PriceMatrix(prices, START_DATE, symbols, symbols), os.path.join(workdir, priceMatrix.MATRIX_PATH))
+
+    labels = np.array([(START_DATE + timedelta(days=d)).strftime("%d-%b-%Y") for d in range(SIGNUP_DAYS)])
+    sign_up_days = rng.integers(0, SIGNUP_DAYS, size=n)
+    picks = rng.integers(0, len(symbols), size=n)
+    minutes = rng.integers(0, 24 * 60, size=n)
+
+    # The first two attendees both take the best pick there was, so the top is always tied and the tiebreaker gets run too
+    best_day, best_pick = np.unravel_index(np.argmax(prices[-1] / prices[:SIGNUP_DAYS]), (SIGNUP_DAYS, len(symbols)))
+    sign_up_days[:2], picks[:2] = best_day, best_pick
+
+    write_csv(os.path.join(workdir, "attendeeList.csv"), ["attendeeName", "signUpDate", "signUpTime", "cryptoSymbol"],
+              zip((f"Entrant {i}" for i in range(n)), labels[sign_up_days], (f"{m // 60:02d}:{m % 60:02d}" for m in minutes),
+                  np.array(symbols)[picks]))
+
+
+INPUTS = {"updater": updater_inputs, "normalizer": normalizer_inputs, "normalizer-stream": normalizer_inputs,
+          "scorer": scorer_inputs}
+
+
+# ----------------------------------------------------------------------
+# Worker side - runs one stage in the current directory and prints its measurements as JSON
+# ----------------------------------------------------------------------
+
+def stage_function(stage):
+    if stage == "updater":
+        import cryptoTable
+        return cryptoTable.main
+    if stage == "normalizer":
+        import entrantDataNormalizer
+        return entrantDataNormalizer.main
+    if stage == "normalizer-stream":
+        import entrantDataNormalizer
+        return entrantDataNormalizer.main_streaming
+    if stage == "scorer":
+        import cryptoGame
+        return cryptoGame.decide_winner
+    raise ValueError(f"Unknown stage '{stage}'")
+
+
+def run_worker(stage, trace):
+    fn = stage_function(stage)      # Imported up front, so the numbers are the stage itself rather than module start-up
+    with open(os.devnull, "w") as devnull, redirect_stdout(devnull):
+        if trace:
+            tracemalloc.start()
+        started = time.perf_counter()
+        fn()
+        wall = time.perf_counter() - started
+        if trace:
+            current, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+    result = {"wall_seconds": wall, "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}
+    if trace:
+        result.update(alloc_peak_mb=peak / 2**20, alloc_retained_mb=current / 2**20)
+    print(json.dumps(result))
+
+
+# ----------------------------------------------------------------------
+# Driver side
+# ----------------------------------------------------------------------
+
+def run_in_worker(stage, inputs_dir, env, trace=False):
+    workdir = tempfile.mkdtemp(prefix=f"bench-{stage}-")
+    try:
+        shutil.copytree(inputs_dir, workdir, dirs_exist_ok=True)
+        command = [sys.executable, os.path.abspath(__file__), "--worker", stage] + (["--trace"] if trace else [])
+        output = subprocess.run(command, cwd=workdir, env=env, capture_output=True, text=True)
+        if output.returncode != 0:
+            # A negative code is the signal that killed it - usually the OOM killer, eg. tracemalloc at 1M on a small box
+            reason = output.stderr.strip().splitlines()[-1] if output.stderr.strip() else f"exit code {output.returncode}"
+            raise RuntimeError(f"{stage}{' (traced)' if trace else ''} failed: {reason}")
+        return json.loads(output.stdout.strip().splitlines()[-1])
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def summary(result):
+    parts = []
+    if "wall_seconds" in result:
+        parts.append(f"{result['wall_seconds']:8.3f}s, peak RSS {result['peak_rss_mb']:7.1f}MB")
+    if "alloc_peak_mb" in result:
+        parts.append(f"peak allocated {result['alloc_peak_mb']:7.1f}MB")
+    if "error" in result:
+        parts.append(f"❌ {result['error']}")
+    return ", ".join(parts)
+
+
+def run_suite(stages, scales, repeats, trace):
+    stub = start_stub()
+    env = dict(os.environ, COINGECKO_API_BASE=stub.base_url, COINGECKO_RATE_PER_MINUTE="100000000", COINGECKO_BURST="100",
+               COINGECKO_CACHE_PATH="", PRICE_PROVIDER="coingecko", PRICE_RECORD_DIR="", PYTHONDONTWRITEBYTECODE="1")
+    results = []
+    try:
+        for scale in scales:
+            for stage in stages:
+                result = {"stage": stage, "scale": scale}
+                inputs_dir = tempfile.mkdtemp(prefix=f"bench-inputs-{stage}-")
+                # A stage that falls over is noted in the report and the suite carries on - one bad run shouldn't lose the rest
+                try:
+                    INPUTS[stage](inputs_dir, scale, np.random.default_rng(SEED))
+                    runs = [run_in_worker(stage, inputs_dir, env) for _ in range(repeats)]
+                    result.update(wall_seconds=statistics.median(r["wall_seconds"] for r in runs),
+                                  peak_rss_mb=max(r["peak_rss_mb"] for r in runs))
+                    if trace:
+                        result.update({k: v for k, v in run_in_worker(stage, inputs_dir, env, trace=True).items()
+                                       if k.startswith("alloc_")})
+                except RuntimeError as e:
+                    result["error"] = str(e)
+                finally:
+                    shutil.rmtree(inputs_dir, ignore_errors=True)
+                results.append(result)
+                print(f"{stage:>18} @ {scale:>9,}: {summary(result)}")
+    finally:
+        stub.shutdown()
+
+    return {"commit": git_commit(), "created": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(), "platform": platform.platform(), "repeats": repeats, "results": results}
+
+
+# Prints old -> new for every stage/scale both reports have, and returns how many metrics got worse by more than threshold
+def compare(baseline, report, threshold):
+    old = {(r["stage"], r["scale"]): r for r in baseline["results"]}
+    regressions = 0
+    print(f"\nComparing {report.get('commit')} against {baseline.get('commit')} (flagging anything >{threshold:.0%} worse)")
+    for result in report["results"]:
+        before = old.get((result["stage"], result["scale"]))
+        if before is None:
+            continue
+        cells = []
+        for metric in METRICS:
+            if metric not in result or not before.get(metric):
+                continue
+            change = result[metric] / before[metric] - 1
+            flag = ""
+            if change > threshold:
+                flag = " ⚠️"
+                regressions += 1
+            cells.append(f"{metric} {before[metric]:.3f} -> {result[metric]:.3f} ({change:+.0%}){flag}")
+        if "error" in result and "error" not in before:
+            cells.append(f"now fails ({result['error']}) ⚠️")
+            regressions += 1
+        print(f"{result['stage']:>18} @ {result['scale']:>9,}: " + ", ".join(cells))
+    print(f"{regressions} regression(s)" if regressions else "No regressions")
+    return regressions
+
+
+def load_report(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark the updater, normaliser and game scorer at several scales")
+    arg_parser.add_argument("--stages", default=",".join(STAGES), help=f"Comma-separated, from {', '.join(STAGES)}")
+    arg_parser.add_argument("--scales", default=",".join(str(s) for s in SCALES), help="Comma-separated coin/entrant counts")
+    arg_parser.add_argument("--repeats", type=int, default=1, help="Timed runs per stage and scale (the median is reported)")
+    arg_parser.add_argument("--no-trace", action="store_true", help="Skip the tracemalloc run")
+    arg_parser.add_argument("--output", default="benchmarkReport.json", help="Where to write the JSON report")
+    arg_parser.add_argument("--compare", nargs="+", metavar="REPORT",
+                            help="Baseline report to compare this run with, or two reports to compare without running")
+    arg_parser.add_argument("--threshold", type=float, default=THRESHOLD, help="Fraction worse that counts as a regression")
+    arg_parser.add_argument("--worker", help=argparse.SUPPRESS)
+    arg_parser.add_argument("--trace", action="store_true", help=argparse.SUPPRESS)
+    args = arg_parser.parse_args()
+
+    if args.worker:
+        run_worker(args.worker, args.trace)
+        sys.exit(0)
+
+    if args.compare and len(args.compare) == 2:
+        sys.exit(1 if compare(load_report(args.compare[0]), load_report(args.compare[1]), args.threshold) else 0)
+
+    stages = args.stages.split(",")
+    for stage in stages:
+        if stage not in STAGES:
+            arg_parser.error(f"unknown stage '{stage}'")
+    report = run_suite(stages, [int(s) for s in args.scales.split(",")], args.repeats, not args.no_trace)
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+    if args.compare:
+        sys.exit(1 if compare(load_report(args.compare[0]), report, args.threshold) else 0)
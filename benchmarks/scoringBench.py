@@ -0,0 +1,75 @@
+from datetime import date, timedelta
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "crypto_game"))
+import scoring
+
+# Scores a big synthetic entrant list (1M by default) with the batch scorer in crypto_game/scoring.py, and compares it with
+# the old row-by-row iterrows loop on a small sample (the old loop takes several minutes at 1M rows, so its
+# time is extrapolated rather than measured).
+
+START_DATE = date(2025, 7, 14)
+DAYS = 400
+SYMBOLS = 100
+
+
+def synthetic_inputs(entrants, seed=42, days=DAYS):
+    rng = np.random.default_rng(seed)
+    dates = [START_DATE + timedelta(days=i) for i in range(days)]
+    symbols = [f"coin{i}" for i in range(SYMBOLS)]
+    prices = rng.lognormal(mean=2, sigma=1, size=(SYMBOLS, days))
+    price_df = pd.DataFrame(prices, index=pd.Index(symbols, name="symbol"), columns=[d.strftime("%d-%b-%Y") for d in dates])
+
+    sign_up_offsets = rng.integers(0, 60, size=entrants)
+    date_labels = np.array([d.strftime("%d-%b-%Y") for d in dates[:60]])
+    attendee_df = pd.DataFrame({
+        "attendeeName": [f"Entrant {i}" for i in range(entrants)],
+        "signUpDate": date_labels[sign_up_offsets],
+        "cryptoSymbol": np.array(symbols)[rng.integers(0, SYMBOLS, size=entrants)]
+    })
+    return attendee_df, price_df, dates[-1]
+
+
+# The scoring loop from decide_winner() as it was before the batch scorer, kept here purely for comparison
+def iterrows_score(attendee_df, price_df, end_date):
+    from dateutil import parser
+    results = []
+    for _, row in attendee_df.iterrows():
+        sign_up_date = parser.parse(row['signUpDate']).date()
+        start_price = price_df.loc[row['cryptoSymbol'], sign_up_date.strftime("%d-%b-%Y")]
+        end_price = price_df.loc[row['cryptoSymbol'], end_date.strftime("%d-%b-%Y")]
+        percent_change = ((end_price - start_price) / start_price) * 100
+        results.append({"attendeeName": row['attendeeName'], "cryptoSymbol": row['cryptoSymbol'], "gainLoss": percent_change,
+                        "gainLossFormatted": scoring.format_gain(percent_change)})
+    return pd.DataFrame(results).sort_values(by="gainLoss", ascending=False)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark the batch attendee scorer")
+    arg_parser.add_argument("--entrants", type=int, default=1_000_000)
+    arg_parser.add_argument("--sample", type=int, default=5_000, help="Rows to run through the old iterrows loop")
+    args = arg_parser.parse_args()
+
+    attendee_df, price_df, end_date = synthetic_inputs(args.entrants)
+
+    started = time.perf_counter()
+    results_df = scoring.score_attendees(attendee_df, price_df, end_date)
+    batch_seconds = time.perf_counter() - started
+    print(f"Batch scorer: {args.entrants:,} entrants in {batch_seconds:.2f}s "
+          f"({args.entrants / batch_seconds:,.0f} entrants/s)")
+
+    sample_df = attendee_df.head(args.sample)
+    started = time.perf_counter()
+    old_df = iterrows_score(sample_df, price_df, end_date)
+    loop_seconds = time.perf_counter() - started
+    estimate = loop_seconds / args.sample * args.entrants
+    print(f"iterrows loop: {args.sample:,} entrants in {loop_seconds:.2f}s "
+          f"(~{estimate:,.0f}s estimated for {args.entrants:,}, {estimate / batch_seconds:,.0f}x slower)")
+
+    same = scoring.score_attendees(sample_df, price_df, end_date).to_csv(index=False) == old_df.to_csv(index=False)
+    print(f"Sample output identical to the old loop: {same}")
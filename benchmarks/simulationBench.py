@@ -0,0 +1,64 @@
+from datetime import date, datetime, timedelta
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Repo root, for priceStore
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "crypto_game"))
+import priceMatrix
+import simulator
+
+# Throughput of the what-if simulator (crypto_game/simulator.py): a synthetic entrant list with repeat picks, a year of
+# synthetic prices, and a grid of end dates x caps x cutoffs x dedupe rules, run in this process and then across the pool.
+# Reports scenarios per minute for each.
+
+START_DATE = date(2025, 7, 14)
+DAYS = 400
+SYMBOLS = 100
+
+
+def synthetic_inputs(entrants, seed=42):
+    rng = np.random.default_rng(seed)
+    symbols = [f"coin{i}" for i in range(SYMBOLS)]
+    prices = priceMatrix.PriceMatrix(rng.lognormal(mean=2, sigma=1, size=(DAYS, SYMBOLS)), START_DATE, symbols, symbols)
+
+    # About one entry in five is a second pick of the same coin by the same person, so the dedupe rules have work to do
+    people = rng.integers(0, max(1, entrants * 4 // 5), size=entrants)
+    signup = pd.Timestamp(START_DATE) + pd.to_timedelta(rng.integers(0, 60 * 24 * 60, size=entrants), unit="m")
+    entrants_df = pd.DataFrame({
+        "attendeeName": [f"Entrant {i}" for i in people],
+        "cryptoSymbol": np.array(symbols)[(people + rng.integers(0, 2, size=entrants)) % SYMBOLS],
+        "entry": signup,
+        "signup": signup,
+        "signupDay": signup.normalize()
+    })
+    return entrants_df, prices
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Benchmark the what-if simulator")
+    arg_parser.add_argument("--entrants", type=int, default=10_000)
+    arg_parser.add_argument("--processes", type=int, help="Pool size (default: one per CPU)")
+    args = arg_parser.parse_args()
+
+    entrants_df, prices = synthetic_inputs(args.entrants)
+    end_dates = [START_DATE + timedelta(days=d) for d in range(90, DAYS, 10)]
+    caps = [1, 3, 5, 10, None]
+    cutoffs = [None] + [datetime.combine(START_DATE + timedelta(days=d), datetime.min.time()) for d in (7, 14, 30)]
+    scenarios = simulator.grid(end_dates, caps, cutoffs, simulator.DEDUPE_RULES)
+
+    started = time.perf_counter()
+    sim = simulator.Simulator(entrants_df, prices)
+    print(f"{args.entrants:,} entries, {len(scenarios):,} scenarios - set up in {time.perf_counter() - started:.2f}s")
+    try:
+        for label, processes in (("in process", 1), ("process pool", args.processes)):
+            started = time.perf_counter()
+            results = sim.run(scenarios, processes)
+            elapsed = time.perf_counter() - started
+            print(f"{label:>14}: {elapsed:.2f}s ({len(scenarios) / elapsed * 60:,.0f} scenarios/min)")
+    finally:
+        sim.close()
+    print(f"First scenario's winner: {results[0].get('winner')} ({results[0].get('cryptoSymbol')})")
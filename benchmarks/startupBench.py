@@ -0,0 +1,72 @@
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from stubCoinGecko import start_stub
+
+# How long does the hourly cryptoTable.py run take from a cold start? Each measurement is a fresh Python process, so this
+# includes interpreter start-up and every import, which for a one-request script is most of the cost. Reports:
+#   - import time of cryptoTable itself (and which heavy modules it dragged in, eg. pandas/numpy)
+#   - total wall time of `python cryptoTable.py` against the local stub, using copies of cryptoList.csv and tableData.json
+# Run it before and after touching cryptoTable.py's imports - if the import time jumps, something heavy has crept back in.
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ["pandas", "numpy", "dateutil"]
+
+IMPORT_PROBE = """
+import sys, time
+started = time.perf_counter()
+import cryptoTable
+elapsed = time.perf_counter() - started
+heavy = [m for m in {heavy!r} if m in sys.modules]
+print(elapsed, ",".join(heavy))
+"""
+
+
+def time_import(env):
+    probe = IMPORT_PROBE.format(heavy=HEAVY_MODULES)
+    output = subprocess.run([sys.executable, "-c", probe], cwd=REPO_ROOT, env=env, capture_output=True, text=True,
+                            check=True).stdout.split()
+    return float(output[0]), (output[1].split(",") if len(output) > 1 else [])
+
+
+def time_run(env, workdir):
+    started = time.perf_counter()
+    subprocess.run([sys.executable, os.path.join(REPO_ROOT, "cryptoTable.py")], cwd=workdir, env=env,
+                   stdout=subprocess.DEVNULL, check=True)
+    return time.perf_counter() - started
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Measure cold-start import and run time of cryptoTable.py")
+    arg_parser.add_argument("--runs", type=int, default=5)
+    args = arg_parser.parse_args()
+
+    stub = start_stub(rate_per_minute=100_000)
+    env = dict(os.environ, COINGECKO_API_BASE=stub.base_url, COINGECKO_RATE_PER_MINUTE="100000",
+               PYTHONPATH=REPO_ROOT, PYTHONDONTWRITEBYTECODE="1", COINGECKO_CACHE_PATH="")     # Cold path, no cached responses
+
+    workdir = tempfile.mkdtemp(prefix="startupBench")
+    try:
+        for name in ["cryptoList.csv", "tableData.json"]:
+            shutil.copy(os.path.join(REPO_ROOT, name), workdir)
+
+        time_import(env)    # Warm the OS file cache so the first measurement isn't an outlier
+        imports = [time_import(env) for _ in range(args.runs)]
+        runs = [time_run(env, workdir) for _ in range(args.runs)]
+    finally:
+        stub.shutdown()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    import_times = [t for t, _ in imports]
+    heavy = sorted(set(m for _, loaded in imports for m in loaded))
+    print(f"import cryptoTable: median {statistics.median(import_times) * 1000:.0f}ms "
+          f"(min {min(import_times) * 1000:.0f}ms over {args.runs} runs)")
+    print(f"heavy modules pulled in at import: {', '.join(heavy) if heavy else 'none'}")
+    print(f"python cryptoTable.py against the stub: median {statistics.median(runs) * 1000:.0f}ms "
+          f"(min {min(runs) * 1000:.0f}ms, {len(stub.request_log)} requests served)")
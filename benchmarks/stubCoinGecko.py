@@ -0,0 +1,163 @@
+from datetime import datetime, timedelta, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+import argparse
+import hashlib
+import json
+import math
+import threading
+import time
+
+# A tiny local stand-in for the bits of the CoinGecko v3 API that this repo uses, so that the fetch engine (and the scripts
+# built on it) can be exercised without touching the real thing. Prices are made-up but deterministic for a given coin and time.
+#
+# The stub can also enforce its own rate limit and answer with 429 + Retry-After, which is how we check that the token bucket
+# in fetchEngine.py really does keep us under the limit. Responses carry an ETag and honour If-None-Match (304), like the real
+# API, for the response cache. Point the scripts at it with:
+#   COINGECKO_API_BASE=http://127.0.0.1:8765/api/v3 python cryptoTable.py
+# after starting it with:
+#   python benchmarks/stubCoinGecko.py --port 8765 --rate-per-minute 30
+
+FX = {"usd": 1.0, "eur": 0.9, "gbp": 0.8}     # Fixed made-up exchange rates for the non-USD currencies
+
+
+def fake_price(coin_id, ts):
+    seed = int(hashlib.md5(coin_id.encode()).hexdigest()[:6], 16)
+    base = 1 + seed % 1000
+    return base * (1 + 0.2 * math.sin(ts / 86400 / 7 + seed))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass    # Keep the console quiet
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.request_log.append((time.monotonic(), self.path))
+            retry_after = server.check_rate_limit()
+        if retry_after is not None:
+            self.send_response(429)
+            self.send_header("Retry-After", str(math.ceil(retry_after)))
+            self.end_headers()
+            return
+        if server.latency:
+            time.sleep(server.latency)
+
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+        parts = url.path.strip("/").split("/")
+        if "v3" in parts:
+            parts = parts[parts.index("v3") + 1:]
+
+        body = self.route(parts, query)
+        if body is None:
+            self.send_response(404)
+            self.end_headers()
+            return
+
+        data = json.dumps(body).encode()
+        etag = '"' + hashlib.md5(data).hexdigest() + '"'
+        if self.headers.get("If-None-Match") == etag:
+            with server.lock:
+                server.not_modified += 1
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def route(self, parts, query):
+        now = time.time()
+        if parts[:2] == ["simple", "price"]:
+            currencies = query.get("vs_currencies", "usd").split(",")
+            return {coin_id: {c: round(fake_price(coin_id, now) * FX.get(c, 1.0), 6) for c in currencies}
+                    for coin_id in query["ids"].split(",")}
+
+        if len(parts) < 2 or parts[0] != "coins":
+            return None
+        coin_id = parts[1]
+
+        if parts[2:] == ["market_chart"]:
+            midnight = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+            days = [midnight - timedelta(days=d) for d in range(int(query["days"]) - 1, -1, -1)]
+            rate = FX.get(query.get("vs_currency", "usd"), 1.0)
+            prices = [[d.timestamp() * 1000, fake_price(coin_id, d.timestamp()) * rate] for d in days]
+            prices.append([now * 1000, fake_price(coin_id, now) * rate])
+            return {"prices": prices}
+
+        if parts[2:] == ["market_chart", "range"]:
+            start, end = int(query["from"]), int(query["to"])
+            step = 300 if end - start <= 86400 else 3600 if end - start <= 90 * 86400 else 86400   # Same granularity rules as CoinGecko
+            rate = FX.get(query.get("vs_currency", "usd"), 1.0)
+            return {"prices": [[ts * 1000, fake_price(coin_id, ts) * rate] for ts in range(start, end + 1, step)]}
+
+        if parts[2:] == ["history"]:
+            day = datetime.strptime(query["date"], "%d-%m-%Y").replace(tzinfo=timezone.utc).timestamp()
+            return {"market_data": {"current_price": {c: fake_price(coin_id, day) * rate for c, rate in FX.items()}}}
+
+        if parts[2:] == []:
+            return {"id": coin_id, "image": {"thumb": f"https://example.invalid/{coin_id}/thumb.png",
+                                             "small": f"https://example.invalid/{coin_id}/small.png"}}
+        return None
+
+
+class StubServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, port=0, rate_per_minute=None, latency=0.0, window=60):
+        super().__init__(("127.0.0.1", port), StubHandler)
+        self.rate_per_minute = rate_per_minute
+        self.window = window    # Shrink this to scale the "minute" down for quick checks
+        self.latency = latency
+        self.lock = threading.Lock()
+        self.request_log = []
+        self.accepted = []
+        self.rejected = 0
+        self.not_modified = 0     # 304s sent in reply to If-None-Match
+
+    # Sliding one-minute window over the requests we've accepted - returns seconds until the oldest one falls out of the
+    # window if this request should be refused, or None if it's allowed
+    def check_rate_limit(self):
+        if not self.rate_per_minute:
+            return None
+        now = time.monotonic()
+        self.accepted = [t for t in self.accepted if now - t < self.window]
+        if len(self.accepted) >= self.rate_per_minute:
+            self.rejected += 1
+            return self.window - (now - self.accepted[0])
+        self.accepted.append(now)
+        return None
+
+    @property
+    def base_url(self):
+        return f"http://127.0.0.1:{self.server_port}/api/v3"
+
+
+# Starts a stub in a background thread - handy for benchmarks that want to run the scripts end-to-end
+def start_stub(port=0, rate_per_minute=None, latency=0.0, window=60):
+    server = StubServer(port, rate_per_minute, latency, window)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Local CoinGecko stub server")
+    arg_parser.add_argument("--port", type=int, default=8765)
+    arg_parser.add_argument("--rate-per-minute", type=float, default=None)
+    arg_parser.add_argument("--latency", type=float, default=0.0, help="Seconds to wait before answering each request")
+    args = arg_parser.parse_args()
+
+    stub = StubServer(args.port, args.rate_per_minute, args.latency)
+    print(f"Stub CoinGecko listening on {stub.base_url} (Ctrl+C to stop)")
+    try:
+        stub.serve_forever()
+    except KeyboardInterrupt:
+        pass
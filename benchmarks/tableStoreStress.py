@@ -0,0 +1,104 @@
+from multiprocessing import Event, Pool, Process, Value
+import argparse
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Repo root, for tableStore
+import tableExport
+import tableStore
+
+# Hammers a copy of tableData.json with many writer processes at once, the way overlapping runs of the updater,
+# metaPipeline.py and startDataGetter.py would, while a reader keeps loading it the way the website does. Each writer owns
+# one field (w0, w1, ...) and sets it on a few random coins per update, so at the end every coin must still hold the last
+# value each writer gave it - anything else is a lost update. Every third writer goes through save_changes() with the
+# widget payloads, like the updater; the rest use merge_update(), like the two setup scripts.
+#   - any lost update, or the reader ever seeing a file it can't parse, is a failure (exit code 1)
+#   - --naive does the same with a plain load / open(..., "w") / dump and no lock, for comparison - expect both kinds of failure
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+COINS_PER_UPDATE = 3
+
+
+def naive_update(path, changes):
+    with open(path, "r") as f:
+        table_data = json.load(f)
+    tableStore.merge(table_data, changes)
+    with open(path, "w") as f:
+        json.dump(table_data, f)
+
+
+def write(job):
+    path, symbols, writer_id, updates, naive = job
+    rng = random.Random(writer_id)
+    field = f"w{writer_id}"
+
+    last, failed = {}, 0
+    for i in range(1, updates + 1):
+        changes = {symbol: {field: i} for symbol in rng.sample(symbols, COINS_PER_UPDATE)}
+        try:
+            if naive:
+                naive_update(path, changes)
+            elif writer_id % 3 == 0:
+                tableStore.save_changes(path, {}, changes, lambda data: tableExport.write_payloads(path, data))
+            else:
+                tableStore.merge_update(path, changes)
+        except ValueError:      # Read a half-written file (only possible with --naive)
+            failed += 1
+            continue
+        last.update((symbol, i) for symbol in changes)
+    return field, last, failed
+
+
+def read(path, stop, reads, torn):
+    while not stop.is_set():
+        try:
+            with open(path, "r") as f:
+                json.load(f)
+        except ValueError:
+            torn.value += 1
+        reads.value += 1
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Stress concurrent read-modify-writes of tableData.json")
+    arg_parser.add_argument("--writers", type=int, default=16)
+    arg_parser.add_argument("--updates", type=int, default=50, help="Updates per writer")
+    arg_parser.add_argument("--naive", action="store_true", help="No lock, no merge, no atomic rename - how it used to be done")
+    args = arg_parser.parse_args()
+
+    work_dir = tempfile.mkdtemp(prefix="tableStoreStress.")
+    path = os.path.join(work_dir, "tableData.json")
+    shutil.copy(os.path.join(REPO_ROOT, "tableData.json"), path)
+    symbols = list(tableStore.load_table(path))
+
+    stop, reads, torn = Event(), Value("i", 0), Value("i", 0)
+    reader = Process(target=read, args=(path, stop, reads, torn))
+    reader.start()
+    started = time.perf_counter()
+    try:
+        with Pool(args.writers) as pool:
+            results = pool.map(write, [(path, symbols, w, args.updates, args.naive) for w in range(args.writers)])
+    finally:
+        elapsed = time.perf_counter() - started
+        stop.set()
+        reader.join()
+
+    with open(path, "r") as f:
+        table_data = json.load(f)
+    lost = sum(1 for field, last, _ in results for symbol, value in last.items() if table_data[symbol].get(field) != value)
+    expected = sum(len(last) for _, last, _ in results)
+    failed = sum(failed for _, _, failed in results)
+    shutil.rmtree(work_dir)
+
+    writes = args.writers * args.updates
+    print(f"{'naive' if args.naive else 'locked'}: {writes} updates from {args.writers} writers in {elapsed:.2f}s "
+          f"({writes / elapsed:,.0f}/s)")
+    print(f"  lost updates: {lost} of {expected} final values")
+    print(f"  failed updates (read a half-written file): {failed}")
+    print(f"  torn reads: {torn.value} of {reads.value}")
+    sys.exit(1 if lost or failed or torn.value else 0)
@@ -4,8 +4,12 @@ import json
 import os
 import pandas as pd
 import requests
+import sys
 import time
 
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Lets us share modules that live in the repo root
+import competitions
+
 # Pseudocode for this script:
 #   Parse cryptoList.csv
 #   Contact CoinGecko API to obtain today's coin price
@@ -15,7 +19,7 @@ import time
 #   EXTERNAL TO THIS SCRIPT: tableData.json is used to display current crypto gain/loss data in a code block on the GDAC website
 
 # --- CoinGecko CONFIG ---
-START_DATE = datetime(2025, 7, 14).date()
+START_DATE = competitions.DEFAULT.start_date
 TODAY_DATE = datetime.today().date()
 API_HEADER = {"user-agent": "Mozilla/5.0 (CryptoTableDataFetcher/1.0)"}
 API_URL = "https://api.coingecko.com/api/v3/simple/price"
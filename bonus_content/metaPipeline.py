@@ -0,0 +1,176 @@
+from concurrent.futures import ThreadPoolExecutor
+import argparse
+import base64
+import csv
+import hashlib
+import json
+import mimetypes
+import os
+import sys
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Lets us share modules that live in the repo root
+import competitions
+import fetchEngine
+import priceProvider
+import tableExport
+import tableStore
+
+# Coin metadata, start to finish. This replaces imageGetter.py + metaWriter.py, which fetched every coin's metadata into
+# metaImage.csv and then looked each symbol up with a DataFrame filter (once per coin, so O(n^2)), leaving the widget to load
+# 100 separate images from CoinGecko's CDN. Now one run:
+#   1. fetches /coins/{id} for every coin through the price provider - concurrently, right up to the rate limit - asking for
+#      just the metadata (no tickers, market data etc.)
+#   2. joins names and image URLs into tableData.json by dict lookup (just those fields, under the table's lock - see tableStore.py),
+#      making an entry for any coin in the coin list that the table doesn't have yet
+#   3. downloads each distinct image URL once, in parallel, into thumbs/ - named by content hash, so coins sharing a logo
+#      share a file, and a re-run only downloads URLs it hasn't seen
+#   4. writes tableThumbs.json: every distinct image inlined as a base64 data URI, plus which one each coin uses. The widget
+#      fetches it once (it's versioned along with tableData.static.json, so it can be cached indefinitely) and the table
+#      renders without a single image request to CoinGecko
+#
+# Usage: python metaPipeline.py [--competition spring2026] [--size small]
+
+CSV_FILE = 'cryptoList.csv'
+JSON_FILE = 'tableData.json'
+THUMBS_FILE = 'tableThumbs.json'
+THUMBS_DIR = 'thumbs'
+MANIFEST_FILE = 'manifest.json'     # In THUMBS_DIR - image URL -> file, so re-runs skip anything already downloaded
+IMAGE_SIZE = 'small'                # thumb (25px), small (~64px) or large - the widget shows 30px, so small keeps it sharp
+COIN_PARAMS = {'localization': 'false', 'tickers': 'false', 'market_data': 'false', 'community_data': 'false',
+               'developer_data': 'false', 'sparkline': 'false'}
+
+
+def load_coins(csv_file):
+    with open(csv_file, newline='', encoding='utf-8') as f:
+        return [(row['symbol'].lower(), row['id'], row['name']) for row in csv.DictReader(f)]
+
+
+# Step 1: {coin_id: coin metadata} for every coin CoinGecko gave us something for
+def fetch_metadata(coins):
+    jobs = [(priceProvider.COIN.format(coin_id), COIN_PARAMS) for _, coin_id, _ in coins]
+    print(f"→ Fetching metadata for {len(jobs)} coins...")
+    results = priceProvider.fetch_many(jobs)
+    metadata = {}
+    for (_, coin_id, _), data in zip(coins, results):
+        if data is None:
+            print(f"❌ Failed to retrieve metadata for {coin_id}")
+            continue
+        metadata[coin_id] = data
+    return metadata
+
+
+# Step 2: names and image URLs for the table. Returns the changes ({symbol: {field: value}}, for tableStore.merge_update) and
+# {symbol: image URL} for everything we've got an image for. symbol and id are always in the changes, so a coin the table
+# doesn't have yet gets an entry
+def join_metadata(coins, metadata, size):
+    changes, image_urls = {}, {}
+    for symbol, coin_id, name in coins:
+        data = metadata.get(coin_id)
+        if data is None:
+            continue
+        url = data.get('image', {}).get(size)
+        changes[symbol] = {'symbol': symbol, 'id': data.get('name') or name}
+        if url:
+            changes[symbol]['thumb'] = url
+            image_urls[symbol] = url
+        else:
+            print(f"⚠️ No '{size}' image for {coin_id}")
+    return changes, image_urls
+
+
+def load_manifest(thumbs_dir):
+    path = os.path.join(thumbs_dir, MANIFEST_FILE)
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        manifest = json.load(f)
+    return {url: name for url, name in manifest.items() if os.path.exists(os.path.join(thumbs_dir, name))}
+
+
+def file_name_for(content, url, content_type):
+    extension = mimetypes.guess_extension((content_type or '').split(';')[0].strip()) or \
+        os.path.splitext(url.split('?')[0])[1] or '.img'
+    return hashlib.sha1(content).hexdigest()[:16] + extension
+
+
+# Step 3: downloads every image URL we don't already hold. Images come from CoinGecko's CDN rather than the API, so they
+# don't count against the rate limit - they just go out POOL_SIZE at a time
+def download_images(urls, thumbs_dir):
+    os.makedirs(thumbs_dir, exist_ok=True)
+    manifest = load_manifest(thumbs_dir)
+    missing = sorted(set(urls) - set(manifest))
+    print(f"→ {len(set(urls))} distinct images, {len(missing)} to download")
+
+    session = requests.Session()
+    session.headers.update(fetchEngine.API_HEADER)
+
+    def download(url):
+        try:
+            response = session.get(url, timeout=30)
+            response.raise_for_status()
+        except requests.RequestException as e:
+            print(f"❌ Failed to download {url}: {e}")
+            return url, None
+        name = file_name_for(response.content, url, response.headers.get('Content-Type'))
+        path = os.path.join(thumbs_dir, name)
+        if not os.path.exists(path):       # Same content under another URL - already have it
+            with open(path, 'wb') as f:
+                f.write(response.content)
+        return url, name
+
+    try:
+        with ThreadPoolExecutor(max_workers=fetchEngine.POOL_SIZE) as executor:
+            for url, name in executor.map(download, missing):
+                if name is not None:
+                    manifest[url] = name
+    finally:
+        session.close()
+
+    tableStore.write_atomic(os.path.join(thumbs_dir, MANIFEST_FILE), manifest)
+    return manifest
+
+
+# Step 4: {"images": {file: data URI}, "coins": {symbol: file}} - each distinct image is inlined once, however many coins use it
+def build_thumbs(image_urls, manifest, thumbs_dir):
+    images, coins = {}, {}
+    for symbol, url in image_urls.items():
+        name = manifest.get(url)
+        if name is None:
+            continue
+        if name not in images:
+            with open(os.path.join(thumbs_dir, name), 'rb') as f:
+                content = f.read()
+            mime = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+            images[name] = f"data:{mime};base64,{base64.b64encode(content).decode('ascii')}"
+        coins[symbol] = name
+    return {'images': images, 'coins': coins}
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Fetch coin metadata, join it into the table and inline the thumbnails")
+    arg_parser.add_argument('--competition', help="Use this competition's coin list and table from competitions.json")
+    arg_parser.add_argument('--size', default=IMAGE_SIZE, choices=['thumb', 'small', 'large'], help="Which CoinGecko image to use")
+    args = arg_parser.parse_args()
+
+    csv_file, json_file = CSV_FILE, JSON_FILE
+    if args.competition:
+        competition = competitions.get_competition(args.competition)
+        csv_file, json_file = competition.coin_list, competition.table
+    out_dir = os.path.dirname(os.path.abspath(json_file))
+
+    coins = load_coins(csv_file)
+    changes, image_urls = join_metadata(coins, fetch_metadata(coins), args.size)
+    # Only names and thumbs are written, into the table as it is by then - the updater may well have been in since we read it
+    tableStore.merge_update(json_file, changes, lambda data: tableExport.write_payloads(json_file, data))
+    print(f"✅ Names and image URLs for {len(image_urls)} coins joined into {json_file}")
+
+    thumbs_dir = os.path.join(out_dir, THUMBS_DIR)
+    manifest = download_images(image_urls.values(), thumbs_dir)
+    thumbs = build_thumbs(image_urls, manifest, thumbs_dir)
+    tableStore.write_atomic(os.path.join(out_dir, THUMBS_FILE), thumbs)
+    print(f"✅ {len(thumbs['coins'])} coins' thumbnails ({len(thumbs['images'])} distinct images) inlined into {THUMBS_FILE}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,173 @@
+from datetime import date, datetime, timedelta, timezone
+import argparse
+import asyncio
 import csv
-import json
-import requests
-import time
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Lets us share modules that live in the repo root
+import competitions
+import priceProvider
+import priceStore
+import tableExport
+import tableStore
+from cryptoTable import START_DATE, CURRENCY, CURRENCIES
 
 # Intended for one-time-use, throwaway script. Use at your peril!
+#
+# Fills in start_price (and start_prices, one per currency in cryptoTable.CURRENCIES) in tableData.json for whatever the
+# competition start date is. This used to be one /history call per coin for a single hard-coded date, sent 12s apart, so
+# changing the date meant starting again from scratch. Now:
+#   - each coin's start-day prices come from one /coins/{id}/history request, which has every currency in it at once
+#   - requests go through the price provider (normally the shared fetch engine), so they run concurrently right up to the rate limit
+#   - every finished request is written to a checkpoint file straight away, so if it's interrupted just run it again and it
+#     picks up where it left off (use --fresh to ignore the checkpoint)
+#   - with --history, one USD /market_chart/range request per coin covers start date -> --end-date as well, and every day of
+#     it goes into the local price store (priceStore.py), so the crypto game has nothing left to fetch. Today is left out of
+#     it - all we could store for it is its 00:00 price, which the crypto game would then take as the whole day's
+#   - coins in the coin list that aren't in the table yet (or a table that doesn't exist yet, for a new competition) get an
+#     entry made for them, with the symbol and name from the coin list
+#
+# Usage: python startDataGetter.py [--start-date 2025-07-14] [--history [--end-date 2025-09-30] [--store priceHistory.db]]
+#        python startDataGetter.py --competition spring2026     (start date, coin list and table from competitions.json)
+# That's one request per coin, or two with --history.
 
 CSV_FILE = 'cryptoList.csv'
 JSON_FILE = 'tableData.json'
-TARGET_DATE = '14-07-2025'  # Adjust if start date of competition is different, obviously
-COINGECKO_API = 'https://api.coingecko.com/api/v3/coins/{id}/history?date={date}'
+CHECKPOINT_FILE = 'startDataCheckpoint.json'
+
+
+def midnight_ts(day):
+    return int(datetime.combine(day, datetime.min.time()).replace(tzinfo=timezone.utc).timestamp())
+
+
+# {currency: price} for the start day from a /history response - empty if CoinGecko had nothing for that day (eg. the coin
+# didn't exist yet)
+def start_prices(data):
+    current = (data.get('market_data') or {}).get('current_price') or {}
+    return {currency: current[currency] for currency in CURRENCIES if current.get(currency) is not None}
+
+
+# Reduces a range response to one price per UTC day - the first point of each day, which is the 00:00 snapshot that
+# /history (and market_chart's daily interval) would have given us
+def daily_prices(data):
+    days = {}
+    for ts, price in data.get('prices', []):
+        day = datetime.fromtimestamp(ts / 1000, tz=timezone.utc).date()
+        if day not in days:
+            days[day] = price
+    return days
+
+
+def load_checkpoint(path, settings, fresh):
+    if not fresh and os.path.exists(path):
+        try:
+            checkpoint = tableStore.load_table(path)
+            if checkpoint.get('settings') == settings:
+                return checkpoint
+            print(f"⚠️ {path} was for different settings ({checkpoint.get('settings')}) - starting again")
+        except (ValueError, OSError):
+            print(f"⚠️ Couldn't read {path} - starting again")
+    return {'settings': settings, 'done': {}}
+
+
+# Sends every outstanding request and records each one in the checkpoint as soon as it lands (callbacks all run on the event
+# loop's thread, one at a time, so there's no need for a lock around the checkpoint or the price store)
+async def backfill(provider, jobs, on_result):
+    async def run(job):
+        coin_id, kind, path, params = job
+        on_result(coin_id, kind, await provider.get_json(path, params))
+    await asyncio.gather(*(run(job) for job in jobs))
+
 
-with open(JSON_FILE, 'r') as f:
-    table_data = json.load(f)
-    with open(CSV_FILE, newline='') as csvfile:
+def main():
+    arg_parser = argparse.ArgumentParser(description="Backfill start prices (and optionally daily history) from CoinGecko")
+    arg_parser.add_argument('--competition', help="Backfill this competition from competitions.json, rather than the files here")
+    arg_parser.add_argument('--start-date', type=date.fromisoformat, help="yyyy-mm-dd (defaults to the competition's start date)")
+    arg_parser.add_argument('--history', action='store_true', help="Also store every day up to --end-date in the price store")
+    arg_parser.add_argument('--end-date', type=date.fromisoformat, default=datetime.today().date(), help="yyyy-mm-dd")
+    arg_parser.add_argument('--store', default=priceStore.DB_PATH, help="Price store to fill with --history")
+    arg_parser.add_argument('--fresh', action='store_true', help="Ignore any checkpoint from a previous run")
+    args = arg_parser.parse_args()
+
+    csv_file, json_file, start_date = CSV_FILE, JSON_FILE, START_DATE
+    if args.competition:
+        competition = competitions.get_competition(args.competition)
+        csv_file, json_file, start_date = competition.coin_list, competition.table, competition.start_date
+    start_date = args.start_date or start_date
+    end_date = min(args.end_date, datetime.now(timezone.utc).date() - timedelta(days=1))     # Only days that are over
+    history = args.history and end_date >= start_date
+    if args.history and not history:
+        print(f"⚠️ No finished days from {start_date} to {args.end_date} to store - just fetching start prices")
+    if not history:
+        end_date = start_date
+
+    table_data = tableStore.load_table(json_file) if os.path.exists(json_file) else {}
+
+    with open(csv_file, newline='') as csvfile:
         reader = csv.DictReader(csvfile)
-        for row in reader:
-            symbol = row['symbol']
-            coingeck_id = row['id']
-
-            if symbol not in table_data:
-                continue
-
-            url = COINGECKO_API.format(id=coingeck_id, date=TARGET_DATE)
-            try:
-                response = requests.get(url)
-                data = response.json()
-
-                market_data = data.get('market_data', {})
-                current_price = market_data.get('current_price', {})
-                usd_price = current_price.get('usd')
-
-                if usd_price is not None:
-                    print(f"Data obtained for {symbol}")
-                    table_data[symbol]['start_price'] = usd_price
-                    time.sleep(12) #respect the API calls @ 5/6 per minute
-                else:
-                    print(f"Warning: USD price not found for {symbol} on {TARGET_DATE}")
-            
-            except Exception as e:
-                print(f"Error: Failed to fetch data for {symbol}: {e}")
-
-with open(JSON_FILE, 'w') as f:
-    json.dump(table_data, f, indent=2)
-
-print("✅ start_price values in tableData.json updated successfully!")
+        coins = [(row['symbol'].lower(), row['id'], row['name']) for row in reader]
+
+    settings = {'table': json_file, 'start_date': start_date.isoformat(), 'end_date': end_date.isoformat(), 'currencies': CURRENCIES}
+    checkpoint = load_checkpoint(CHECKPOINT_FILE, settings, args.fresh)
+    done = checkpoint['done']
+    store = priceStore.open_store(args.store) if history else None
+
+    # 'start' is the coin's start-day prices in every currency, 'range' its daily USD history for --history
+    kinds = ['start', 'range'] if history else ['start']
+    jobs = []
+    for _, coin_id, _ in coins:
+        if 'start' not in done.get(coin_id, {}):
+            params = {'date': start_date.strftime('%d-%m-%Y'), 'localization': 'false'}
+            jobs.append((coin_id, 'start', priceProvider.HISTORY.format(coin_id), params))
+        if history and 'range' not in done.get(coin_id, {}):
+            params = {'vs_currency': CURRENCY, 'from': midnight_ts(start_date), 'to': midnight_ts(end_date + timedelta(days=1)) - 1}
+            jobs.append((coin_id, 'range', priceProvider.MARKET_CHART_RANGE.format(coin_id), params))
+
+    print(f"→ {len(coins)} coins from {start_date}{f' (with daily history to {end_date})' if history else ''}: "
+          f"{len(jobs)} requests to make, {len(coins) * len(kinds) - len(jobs)} already in {CHECKPOINT_FILE}")
+
+    def on_result(coin_id, kind, data):
+        if data is None:
+            print(f"Error: Failed to fetch {kind} data for {coin_id}")
+            return
+        if kind == 'start':
+            # Empty means CoinGecko had nothing for that day - recorded so we don't keep asking
+            done.setdefault(coin_id, {})['start'] = start_prices(data)
+        else:
+            priceStore.save_prices(store, coin_id, daily_prices(data))
+            priceStore.record_fetched(store, coin_id, start_date, end_date)
+            done.setdefault(coin_id, {})['range'] = True
+        tableStore.write_atomic(CHECKPOINT_FILE, checkpoint)
+
+    provider = priceProvider.get_provider()
+    try:
+        asyncio.run(backfill(provider, jobs, on_result))
+    except KeyboardInterrupt:
+        print(f"\n⏸️ Interrupted - run again to carry on from {CHECKPOINT_FILE}")
+        return
+    finally:
+        provider.close()
+        if store is not None:
+            store.close()
+
+    changes = {}
+    for symbol, coin_id, name in coins:
+        prices = done.get(coin_id, {}).get('start') or {}
+        if prices.get(CURRENCY) is None:
+            print(f"Warning: USD price not found for {symbol} on {start_date}")
+            continue
+        print(f"Data obtained for {symbol}")
+        changes[symbol] = {'start_date': start_date.isoformat(), 'start_price': prices[CURRENCY], 'start_prices': prices}
+        if symbol not in table_data:
+            changes[symbol].update({'symbol': symbol, 'id': name})
+
+    # Just the start fields (plus symbol and name for new coins), merged under the table's lock, so an hourly update that ran
+    # while we were fetching isn't lost - merge_update() creates the table if it isn't there yet. New start prices mean a new
+    # static payload for the widget
+    tableStore.merge_update(json_file, changes, lambda data: tableExport.write_payloads(json_file, data))
+    print(f"✅ start_price (and start_prices) values in {json_file} updated successfully!")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,96 @@
+from datetime import date
+import json
+import os
+
+# Which competitions we're running. Each one has its own start date, coin list, table for the website, and entrants
+# list for the crypto game, so a second event is just another entry in competitions.json rather than a fork of the repo.
+# The updater fetches the union of every competition's coins in one pass and writes each table from those shared prices, and
+# the game's price store (priceStore.py) and the response cache are keyed by coin, not competition, so the same coin is never
+# fetched twice however many competitions track it.
+#
+# competitions.json looks like this (paths are relative to the file itself, and every key but name/start_date is optional):
+#   {"competitions": [
+#       {"name": "gdac2025", "start_date": "2025-07-14", "coin_list": "cryptoList.csv", "table": "tableData.json",
+#        "entrants": "crypto_game/attendeeList.csv", "output_dir": "crypto_game"},
+#       {"name": "spring2026", "start_date": "2026-03-02", "coin_list": "spring2026/cryptoList.csv", ...}
+#   ]}
+# With no competitions.json at all, there's just DEFAULT - the original GDAC 2025 game, with every file in the working directory.
+#
+# Config via environment variable, in the same way as fetchEngine.py:
+#   COMPETITIONS_PATH   - defaults to competitions.json in the working directory
+
+COMPETITIONS_PATH = os.environ.get("COMPETITIONS_PATH", "competitions.json")
+
+
+class Competition:
+    def __init__(self, name, start_date, coin_list="cryptoList.csv", table="tableData.json", entrants="attendeeList.csv",
+                 output_dir="."):
+        self.name = name
+        self.start_date = start_date
+        self.coin_list = coin_list      # cryptoList.csv - id, symbol, name
+        self.table = table              # tableData.json for the website
+        self.entrants = entrants        # attendeeList.csv, as written by entrantDataNormalizer.py
+        self.output_dir = output_dir    # Where the crypto game writes its results, price matrix etc.
+
+    def output_path(self, file_name):
+        return os.path.join(self.output_dir, file_name)
+
+    def __repr__(self):
+        return f"Competition({self.name!r}, {self.start_date.isoformat()})"
+
+
+DEFAULT = Competition("gdac2025", date(2025, 7, 14))
+
+
+def from_config(entry, base_dir):
+    for key in ("name", "start_date"):
+        if not entry.get(key):
+            raise ValueError(f"Every competition in {COMPETITIONS_PATH} needs a '{key}' - got {entry}")
+    try:
+        start_date = date.fromisoformat(entry["start_date"])
+    except (TypeError, ValueError):
+        raise ValueError(f"Competition '{entry['name']}' has start_date '{entry['start_date']}' - expected yyyy-mm-dd")
+
+    def path(key, default):
+        value = entry.get(key, default)
+        return None if value is None else os.path.join(base_dir, value)
+
+    return Competition(entry["name"], start_date, path("coin_list", "cryptoList.csv"), path("table", "tableData.json"),
+                       path("entrants", "attendeeList.csv"), path("output_dir", "."))
+
+
+# Every configured competition, in the order they're listed, or just [DEFAULT] if there's no config file
+def load_competitions(path=COMPETITIONS_PATH):
+    if not os.path.exists(path):
+        return [DEFAULT]
+    with open(path, "r", encoding="utf-8") as f:
+        config = json.load(f)
+
+    base_dir = os.path.dirname(os.path.abspath(path))
+    competitions = [from_config(entry, base_dir) for entry in config.get("competitions", [])]
+    if not competitions:
+        raise ValueError(f"{path} doesn't list any competitions")
+
+    names, tables = set(), set()
+    for competition in competitions:
+        if competition.name in names:
+            raise ValueError(f"Competition '{competition.name}' is listed more than once in {path}")
+        if competition.table in tables:
+            raise ValueError(f"More than one competition in {path} writes to {competition.table}")
+        names.add(competition.name)
+        tables.add(competition.table)
+    return competitions
+
+
+# One competition by name - or, with no name, the only one there is (it's an error to be vague when there are several)
+def get_competition(name=None, path=COMPETITIONS_PATH):
+    competitions = load_competitions(path)
+    if name is None:
+        if len(competitions) > 1:
+            raise ValueError(f"{path} lists {len(competitions)} competitions - pick one with --competition "
+                             f"({', '.join(c.name for c in competitions)})")
+        return competitions[0]
+    for competition in competitions:
+        if competition.name == name:
+            return competition
+    raise ValueError(f"No competition called '{name}' - expected one of {', '.join(c.name for c in competitions)}")
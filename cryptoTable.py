@@ -1,103 +1,302 @@
-from datetime import datetime
-import base64
-import json
-import os
-import pandas as pd
-import requests
-import time
-
-# Pseudocode for this script:
-#   Parse cryptoList.csv
-#   Contact CoinGecko API to obtain today's coin price
-#   Work out % gain/loss between 14 July 2025 (competition start date) and today
-#   Update tableData.json todays_date, todays_price, percent_change
-#   Upload tableData.json to ShaneM9's GitHub repo (note that the token expires 11 Sept 2025)
-#   EXTERNAL TO THIS SCRIPT: tableData.json is used to display current crypto gain/loss data in a code block on the GDAC website
-
-# --- CoinGecko CONFIG ---
-START_DATE = datetime(2025, 7, 14).date()
-TODAY_DATE = datetime.today().date()
-API_HEADER = {"user-agent": "Mozilla/5.0 (CryptoTableDataFetcher/1.0)"}
-API_URL = "https://api.coingecko.com/api/v3/simple/price"
-CURRENCY = "usd"
-LOCAL_FILE_PATH = "tableData.json"
-
-# Call API for daily prices
-def fetch_todays_prices(coin_ids):
-    url = API_URL
-    params = {
-        "ids": ",".join(coin_ids),
-        "vs_currencies": CURRENCY
-    }
-
-    print(f"→ Fetching today's prices for {len(coin_ids)} coins...")
-
-    response = requests.get(url, headers=API_HEADER, params=params)
-    if response.status_code == 200:
-        return response.json()
-    elif response.status_code == 429:
-        print("⚠️ Rate limited. Waiting 12s to retry...")
-        time.sleep(12)
-        return fetch_todays_prices(coin_ids)  # Retry
-    else:
-        print(f"❌ Error {response.status_code}: {response.text}")
-        return None
-
-def main():
-    # Load cryptoList.csv, normalise symbols (covering-off manual updates where a capital letter might accidentally be used)
-    try:
-        crypto_df = pd.read_csv("cryptoList.csv")
-    except Exception as e:
-        print(f"❌ Failed to read cryptoList.csv: {e}")
-        return
-    crypto_df['symbol'] = crypto_df['symbol'].str.lower()
-    symbol_to_id = dict(zip(crypto_df['symbol'], crypto_df['id']))
-
-    if os.path.exists(LOCAL_FILE_PATH):
-        with open(LOCAL_FILE_PATH, "r") as f:
-            table_data = json.load(f)
-    else:
-        print(f"⚠️ {LOCAL_FILE_PATH} not found.")
-        return
-
-    # Bunch all coin ids from cryptoList.csv
-    all_coin_ids = list(symbol_to_id.values())
-    price_data = fetch_todays_prices(all_coin_ids)
-    if price_data is None:
-        print("❌ Failed to fetch price data.")
-        return
-
-    for symbol, coin_id in symbol_to_id.items():
-        print(f"Processing {symbol} ({coin_id})")
-        todays_price = price_data.get(coin_id, {}).get(CURRENCY)
-        if todays_price is None:
-            todays_price = 0.00
-            print(f"❌ Missing price for {symbol} ({coin_id}) in API response.")
-            continue
-
-        if symbol not in table_data or 'start_price' not in table_data[symbol]:
-            print(f"⚠️ Missing \"start_price\" in 'tableData.json' for {symbol}, skipping.")
-            continue
-
-        start_price = table_data[symbol]["start_price"]
-
-        try:
-            percent_change = ((todays_price - start_price) / start_price) * 100
-        except ZeroDivisionError:
-            percent_change = 0.0
-        
-        table_data[symbol].update({
-            "todays_date": TODAY_DATE.isoformat(),
-            "todays_price": todays_price,
-            "percent_change":round(percent_change, 2)
-        })
-
-    # Write to tableData.json
-    with open(LOCAL_FILE_PATH, "w") as f:
-        json.dump(table_data, f, indent=2)
-    print(f"✅ Updated {LOCAL_FILE_PATH}")
-
-    print("✅ Script completed - GitHub Actions will handle the commit.")
-
-if __name__ == "__main__":
-    main()
\ No newline at end of file
+from datetime import datetime
+import argparse
+import csv
+import os
+import signal
+import threading
+import time
+from urllib.parse import quote_plus
+import competitions
+import fetchEngine
+import historyStore
+import metrics
+import priceProvider
+import priceValidator
+import tableExport
+import tableStore
+
+# Pseudocode for this script:
+#   Parse cryptoList.csv - one per competition (see competitions.py; with no competitions.json there's just the one)
+#   Contact CoinGecko API to obtain today's coin price, for every competition's coins at once
+#   Check the batch for missing coins, stale prices and sudden spikes, holding back anything suspect (see priceValidator.py)
+#   Work out % gain/loss between each competition's start date (14 July 2025 for GDAC 2025) and today
+#   Update each tableData.json todays_date, todays_price, percent_change - but only for coins that actually moved, and only if any did
+#   Write the compact columnar tableData.static.json / tableData.hot.json alongside it (see tableExport.py)
+#   Append the prices to the hourly/daily history rings in tableHistory.bin, and write each table's sparklines (see historyStore.py)
+#   Upload tableData.json to ShaneM9's GitHub repo (note that the token expires 11 Sept 2025)
+#   EXTERNAL TO THIS SCRIPT: tableData.json is used to display current crypto gain/loss data in a code block on the GDAC website
+#
+# Run with --daemon to keep going in-process instead (see run_daemon() below), refreshing every --interval seconds.
+# Set METRICS_LOG and/or METRICS_PROM to see where each run's time goes (see metrics.py).
+
+# --- CoinGecko CONFIG ---
+START_DATE = competitions.DEFAULT.start_date
+TODAY_DATE = datetime.today().date()
+API_HEADER = {"user-agent": "Mozilla/5.0 (CryptoTableDataFetcher/1.0)"}
+API_URL = fetchEngine.API_BASE + priceProvider.SIMPLE_PRICE     # Only used to size the batches - requests go through the price provider
+CURRENCY = "usd"                        # Drives the original start_price/todays_price/percent_change fields
+CURRENCIES = ["usd", "eur", "gbp"]      # Every currency we fetch - each gets an entry in the per-coin prices/percent_changes
+MAX_URL_LENGTH = 2000                   # Keep each simple/price request under this, splitting the ids across several if needed
+CRYPTO_LIST_PATH = "cryptoList.csv"     # The table and coin list paths for each competition come from competitions.py
+PERCENT_TOLERANCE = 0.01                # Coins whose percent_change moved by less than this (percentage points) aren't rewritten
+DAEMON_INTERVAL = 60                    # Seconds between refreshes in --daemon mode
+
+# Splits the coin ids into groups whose simple/price URL stays under MAX_URL_LENGTH once encoded (commas become %2C)
+def id_batches(coin_ids, currencies):
+    fixed = len(API_URL) + len("?ids=&vs_currencies=") + len(quote_plus(",".join(currencies)))
+    batches, batch, length = [], [], fixed
+    for coin_id in coin_ids:
+        extra = len(quote_plus(coin_id)) + (3 if batch else 0)
+        if batch and length + extra > MAX_URL_LENGTH:
+            batches.append(batch)
+            batch, length = [], fixed
+            extra = len(quote_plus(coin_id))
+        batch.append(coin_id)
+        length += extra
+    if batch:
+        batches.append(batch)
+    return batches
+
+# Call API for daily prices, in every currency at once. Pass a provider to reuse its HTTP session (and rate-limit state)
+# between calls. Returns {coin_id: {currency: price, "last_updated_at": unix seconds}}, or None if every request failed
+@metrics.timed("fetch_todays_prices")
+def fetch_todays_prices(coin_ids, provider=None, currencies=CURRENCIES):
+    jobs = [(priceProvider.SIMPLE_PRICE, {"ids": ",".join(batch), "vs_currencies": ",".join(currencies), "include_last_updated_at": "true"})
+            for batch in id_batches(coin_ids, currencies)]
+
+    print(f"→ Fetching today's prices for {len(coin_ids)} coins in {', '.join(currencies)} ({len(jobs)} request(s))...")
+
+    # Batches go out in parallel - rate limiting and 429 retries (honouring Retry-After) are handled by the shared fetch engine
+    results = priceProvider.fetch_many(jobs, provider, headers=API_HEADER)
+    if all(result is None for result in results):
+        return None
+
+    price_data = {}
+    for result in results:
+        if result is None:
+            print("⚠️ One batch of prices failed - those coins will be reported as missing")
+            continue
+        price_data.update(result)
+    return price_data
+
+# Load cryptoList.csv, normalise symbols (covering-off manual updates where a capital letter might accidentally be used)
+# (plain csv module rather than pandas - this runs every hour and pandas alone used to be most of the start-up time)
+def load_symbols(path=CRYPTO_LIST_PATH):
+    with metrics.timer("csv_load", file=os.path.basename(path)), open(path, "r", encoding="utf-8", newline="") as f:
+        return {row['symbol'].lower(): row['id'] for row in csv.DictReader(f)}
+
+def percent_change_from(start_price, todays_price):
+    try:
+        return round(((todays_price - start_price) / start_price) * 100, 2)
+    except ZeroDivisionError:
+        return 0.0
+
+# Works out today's price and % change for every coin we have a price and a start_price for. Each currency is worked out
+# against its own start price (start_prices, filled in by startDataGetter.py) - a currency with no start price yet still gets
+# today's price recorded, just no % change
+@metrics.timed("compute_updates")
+def compute_updates(table_data, symbol_to_id, price_data, today, verbose=True):
+    updates = {}
+    for symbol, coin_id in symbol_to_id.items():
+        if verbose:
+            print(f"Processing {symbol} ({coin_id})")
+        coin_prices = price_data.get(coin_id, {})
+        todays_price = coin_prices.get(CURRENCY)
+        if todays_price is None:
+            print(f"❌ No usable price for {symbol} ({coin_id}) this run.")
+            continue
+
+        if symbol not in table_data or 'start_price' not in table_data[symbol]:
+            print(f"⚠️ Missing \"start_price\" in 'tableData.json' for {symbol}, skipping.")
+            continue
+
+        start_price = table_data[symbol]["start_price"]
+        start_prices = dict(table_data[symbol].get("start_prices", {}))
+        start_prices.setdefault(CURRENCY, start_price)
+
+        prices, percent_changes = {}, {}
+        for currency in CURRENCIES:
+            if coin_prices.get(currency) is None:
+                continue
+            prices[currency] = coin_prices[currency]
+            if start_prices.get(currency) is not None:
+                percent_changes[currency] = percent_change_from(start_prices[currency], coin_prices[currency])
+
+        updates[symbol] = {
+            "todays_date": today.isoformat(),
+            "todays_price": todays_price,
+            "percent_change": percent_change_from(start_price, todays_price),
+            "prices": prices,
+            "percent_changes": percent_changes
+        }
+    return updates
+
+# One competition's coin list and table, kept in memory between daemon refreshes. Either file is only re-read if it has changed
+# on disk since we last looked (a one-off run just reads them both the once)
+class CompetitionTable:
+    def __init__(self, competition):
+        self.competition = competition
+        self.symbol_to_id, self.list_mtime = None, None
+        self.table_data, self.table_mtime = None, None
+
+    def reload(self):
+        if os.path.getmtime(self.competition.coin_list) != self.list_mtime:
+            self.list_mtime = os.path.getmtime(self.competition.coin_list)
+            self.symbol_to_id = load_symbols(self.competition.coin_list)
+        if os.path.getmtime(self.competition.table) != self.table_mtime:
+            self.table_mtime = os.path.getmtime(self.competition.table)
+            self.table_data = tableStore.load_table(self.competition.table)
+
+    # Our own write - no need to re-read it next time
+    def written(self):
+        self.table_mtime = os.path.getmtime(self.competition.table)
+
+
+# Adds each coin's "status" from the validation report wherever it differs from what the table shows now (None clears it) -
+# folded into the coin's update if it has one, or as a status-only change if it doesn't (eg. a price held back)
+def status_changes(table, report, changes):
+    for symbol, coin_id in table.symbol_to_id.items():
+        if symbol not in table.table_data:
+            continue
+        status = priceValidator.table_status(report, coin_id)
+        if status != table.table_data[symbol].get("status"):
+            changes.setdefault(symbol, {})["status"] = status
+    return changes
+
+# Works out and writes one competition's updates from the shared price data. Returns the number of coins written
+def update_table(table, price_data, verbose=True, report=None):
+    competition = table.competition
+    updates = compute_updates(table.table_data, table.symbol_to_id, price_data, datetime.today().date(), verbose)
+
+    # Still holding the table's lock here, so the file is exactly what we just wrote
+    def on_write(table_data):
+        table.written()
+        tableExport.write_payloads(competition.table, table_data)     # The compact static/hot copies for the widget
+
+    # Write to tableData.json - only the coins that moved, and not at all if none did (so there's nothing for the Action to commit).
+    # Only the price fields are written, merged into whatever is on disk at the time, so a metaPipeline.py or startDataGetter.py
+    # run that overlaps with this one keeps its changes
+    changes = tableStore.changed_entries(table.table_data, updates, PERCENT_TOLERANCE)
+    updated = len(changes)
+    metrics.count("coins_updated", updated, competition=competition.name)
+    if report is not None:
+        status_changes(table, report, changes)
+    if not tableStore.save_changes(competition.table, table.table_data, changes, on_write):
+        print(f"✅ No prices moved beyond tolerance - {competition.table} left untouched")
+        return 0
+    flagged = f" (plus {len(changes) - updated} status-only change(s))" if len(changes) > updated else ""
+    print(f"✅ Updated {updated} of {len(updates)} coins in {competition.table}{flagged}")
+    return len(changes)
+
+# Min/max and a downsampled trend line per coin, next to the table as tableData.sparklines.json (+ .gz) - only rewritten
+# when a line actually changed
+def write_sparklines(table, history):
+    payload = historyStore.sparkline_payload(history, table.symbol_to_id)
+    tableExport.write_variants(historyStore.sparkline_path(table.competition.table), tableExport.encode(payload))
+
+# One fetch-and-update cycle for every competition. Coins are fetched once however many competitions track them, so each extra
+# competition costs only the coins nobody else has. Pass a history (historyStore.PriceHistory) to have the prices appended
+# to it too - it's up to the caller to save it. Pass held (the coins priceValidator held back last time) to have the batch
+# validated first; the report is written, and its "held" is what to pass next time. Returns the number of coins written and
+# the report, or None if the fetch failed
+def refresh(tables, provider=None, verbose=True, history=None, held=None):
+    # Bunch all coin ids from every cryptoList.csv (dict.fromkeys keeps them in order, without duplicates)
+    coin_ids = list(dict.fromkeys(coin_id for table in tables for coin_id in table.symbol_to_id.values()))
+    price_data = fetch_todays_prices(coin_ids, provider)
+    if price_data is None:
+        print("❌ Failed to fetch price data.")
+        return None, None
+
+    report = None
+    if held is not None:
+        price_data, report = priceValidator.validate(price_data, coin_ids, history, time.time(), held, CURRENCY)
+        priceValidator.write_report(report)
+
+    written = sum(update_table(table, price_data, verbose, report) for table in tables)
+    if history is not None:
+        history.record(time.time(), {coin_id: price_data.get(coin_id, {}).get(CURRENCY) for coin_id in coin_ids})
+        for table in tables:
+            write_sparklines(table, history)
+    return written, report
+
+# Everything that's configured and has its files in place - a competition with anything missing is skipped, not fatal
+def load_tables():
+    tables = []
+    for competition in competitions.load_competitions():
+        table = CompetitionTable(competition)
+        try:
+            if not os.path.exists(competition.table):
+                print(f"⚠️ {competition.table} not found - run bonus_content/startDataGetter.py --competition {competition.name} to create it.")
+                continue
+            table.reload()
+        except Exception as e:
+            print(f"❌ Failed to read {competition.coin_list} / {competition.table}: {e}")
+            continue
+        tables.append(table)
+    return tables
+
+def main():
+    tables = load_tables()
+    if not tables:
+        return
+
+    history = historyStore.load()
+    written, _ = refresh(tables, history=history, held=priceValidator.load_held())
+    if written is not None:
+        historyStore.save(history)
+    if written:
+        print("✅ Script completed - GitHub Actions will handle the commit.")
+
+# Long-running mode: the coin lists, tables and the HTTP session all stay in memory between refreshes, so each refresh
+# costs one round trip to CoinGecko rather than a cold start (Python start-up + imports + new connection). Files are only re-read
+# if something else changes them on disk. SIGINT/SIGTERM let the current refresh finish, then exit cleanly.
+# The response cache is left out here: it keeps /simple/price for as long as the refresh interval, so every other refresh
+# would just get the last one's prices back.
+def run_daemon(interval=DAEMON_INTERVAL):
+    stop = threading.Event()
+
+    def request_stop(signum, frame):
+        print(f"\n🛑 Received {signal.Signals(signum).name}, shutting down after the current refresh...")
+        stop.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    tables = load_tables()
+    if not tables:
+        return
+
+    provider = priceProvider.get_provider(headers=API_HEADER, cache=False)
+    history = historyStore.load()
+    held = priceValidator.load_held()
+    print(f"🔁 Refreshing {', '.join(table.competition.table for table in tables)} every {interval}s (Ctrl+C to stop)")
+
+    try:
+        while not stop.is_set():
+            started = time.monotonic()
+
+            for table in tables:
+                table.reload()
+            with metrics.timer("refresh"):
+                written, report = refresh(tables, provider, verbose=False, history=history, held=held)
+                if written is not None:
+                    historyStore.save(history)
+                    held = report["held"]
+            metrics.flush()
+            print(f"   refresh took {time.monotonic() - started:.2f}s")
+
+            stop.wait(max(0.0, interval - (time.monotonic() - started)))
+    finally:
+        provider.close()
+    print("👋 Daemon stopped.")
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Update tableData.json with today's CoinGecko prices")
+    arg_parser.add_argument("--daemon", action="store_true", help="Keep running and refresh every --interval seconds")
+    arg_parser.add_argument("--interval", type=float, default=DAEMON_INTERVAL, help="Seconds between refreshes in --daemon mode")
+    args = arg_parser.parse_args()
+
+    if args.daemon:
+        run_daemon(args.interval)
+    else:
+        main()
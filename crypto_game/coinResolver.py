@@ -0,0 +1,131 @@
+from collections import deque
+import csv
+import hashlib
+import os
+import pickle
+
+# Works out which coin an entrant meant from whatever they typed into the free-text 'Coin' field. The normaliser used to do this
+# by checking every cryptoList.csv id, then every name, against every entrant - O(entrants x coins), and "first match wins"
+# meant the answer depended on the order of cryptoList.csv (eg. "Bitcoin Cash" could land on Bitcoin or Bitcoin Cash).
+#
+# Instead we build an index once:
+#   - exact lookups on symbol, then id, then name (all case-insensitive)
+#   - an Aho-Corasick automaton over every id and name for substring matches, where the LONGEST match wins
+#     (ties go to whichever starts first, then to cryptoList.csv order, so the result is always the same)
+# The index is pickled next to cryptoList.csv and rebuilt automatically whenever the contents of that file change.
+
+CACHE_FILE_NAME = ".coinResolver.cache"
+CACHE_VERSION = 1   # Bump if the index layout changes, so old caches are ignored
+
+
+class CoinResolver:
+
+    def __init__(self, coins):
+        # coins is a list of (id, symbol, name) in cryptoList.csv order
+        self.by_symbol = {}
+        self.by_id = {}
+        self.by_name = {}
+        patterns = []
+        for coin_id, symbol, name in coins:
+            self.by_symbol.setdefault(symbol.lower(), symbol)
+            self.by_id.setdefault(coin_id.lower(), symbol)
+            self.by_name.setdefault(name.lower(), symbol)
+            patterns.append((coin_id.lower(), symbol))
+            patterns.append((name.lower(), symbol))
+        self.patterns = [(p, s) for p, s in patterns if p]
+        self._build_automaton()
+
+    def _build_automaton(self):
+        self.goto = [{}]
+        self.fail = [0]
+        self.output = [[]]    # Pattern numbers that end at each node (including via fail links)
+        for number, (pattern, _) in enumerate(self.patterns):
+            node = 0
+            for ch in pattern:
+                nxt = self.goto[node].get(ch)
+                if nxt is None:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    nxt = len(self.goto) - 1
+                    self.goto[node][ch] = nxt
+                node = nxt
+            self.output[node].append(number)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            node = queue.popleft()
+            for ch, child in self.goto[node].items():
+                queue.append(child)
+                fallback = self.fail[node]
+                while fallback and ch not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(ch, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    # Longest id/name found anywhere in the text, or None
+    def find_substring(self, text):
+        best = None     # (length, -start, -pattern number), so max() gives longest, then earliest, then list order
+        node = 0
+        for end, ch in enumerate(text):
+            while node and ch not in self.goto[node]:
+                node = self.fail[node]
+            node = self.goto[node].get(ch, 0)
+            for number in self.output[node]:
+                length = len(self.patterns[number][0])
+                candidate = (length, -(end - length + 1), -number)
+                if best is None or candidate > best:
+                    best = candidate
+        if best is None:
+            return None
+        return self.patterns[-best[2]][1]
+
+    # Returns (symbol, how it was matched) - how is one of "symbol", "id", "name", "substring" - or (None, None)
+    def resolve(self, text):
+        if not isinstance(text, str):
+            return None, None
+        key = text.strip().lower()
+        if key in self.by_symbol:
+            return self.by_symbol[key], "symbol"
+        if key in self.by_id:
+            return self.by_id[key], "id"
+        if key in self.by_name:
+            return self.by_name[key], "name"
+        symbol = self.find_substring(key)
+        if symbol is not None:
+            return symbol, "substring"
+        return None, None
+
+
+def read_coins(csv_path):
+    with open(csv_path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f)
+        reader.fieldnames = [name.strip() for name in reader.fieldnames]
+        for col in ["id", "symbol", "name"]:
+            if col not in reader.fieldnames:
+                raise ValueError("cryptoList.csv must contain 'id', 'symbol', and 'name' columns")
+        return [((row["id"] or "").strip(), (row["symbol"] or "").strip(), (row["name"] or "").strip()) for row in reader]
+
+
+# Loads the pickled index if it was built from the current cryptoList.csv, otherwise builds (and caches) a fresh one
+def load_resolver(csv_path="cryptoList.csv"):
+    with open(csv_path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    cache_path = os.path.join(os.path.dirname(os.path.abspath(csv_path)), CACHE_FILE_NAME)
+
+    if os.path.exists(cache_path):
+        try:
+            with open(cache_path, "rb") as f:
+                cached = pickle.load(f)
+            if cached.get("version") == CACHE_VERSION and cached.get("digest") == digest:
+                return cached["resolver"]
+        except Exception:
+            pass    # Corrupt or from an older version - just rebuild it
+
+    resolver = CoinResolver(read_coins(csv_path))
+    try:
+        with open(cache_path, "wb") as f:
+            pickle.dump({"version": CACHE_VERSION, "digest": digest, "resolver": resolver}, f)
+    except OSError:
+        pass        # Read-only folder etc. - we still have the index for this run
+    return resolver
@@ -1,101 +1,120 @@
 from datetime import datetime, timedelta, timezone
-from dateutil import parser
-import pandas as pd
-import requests
-import time
-
-# Initial config step for constants
-START_DATE = datetime(2025, 7, 14).date()
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Lets us share modules that live in the repo root
+import competitions
+import metrics
+with metrics.timer("import", module="pandas"):  # Usually the slowest part of start-up, so worth seeing in the metrics
+    import numpy as np
+    import pandas as pd
+import priceMatrix
+import priceProvider
+import priceStore
+import scoring
+import tiebreaker as tiebreaker_engine
+
+# Initial config step for constants - START_DATE and the file paths are swapped for another competition's by use_competition()
+START_DATE = competitions.DEFAULT.start_date
 END_DATE = datetime.today().date()
+CRYPTO_LIST_PATH = "cryptoList.csv"
+ATTENDEE_PATH = "attendeeList.csv"
+OUTPUT_DIR = "."        # Where results, tiebreakerData.csv, coinGeckoData.csv and priceMatrix.npy go
 API_HEADER = {"User-Agent": "Mozilla/5.0 (CryptoGameDataFetcher/1.1)"}  # Apparently including a header helps prioritise your API call... probably witchcraft or some old-wives-tale, but who really knows...
-API_URL = "https://api.coingecko.com/api/v3/coins/{}/market_chart"
-TIEBREAKER_URL = "https://api.coingecko.com/api/v3/coins/{}/market_chart/range"
 CURRENCY = "usd"
 
 
+# Points the game at one competition from competitions.json. The price store is shared between competitions (it's keyed by
+# coin and day), so any coin another competition has already fetched costs nothing here
+def use_competition(competition):
+    global START_DATE, CRYPTO_LIST_PATH, ATTENDEE_PATH, OUTPUT_DIR
+    START_DATE = competition.start_date
+    CRYPTO_LIST_PATH = competition.coin_list
+    ATTENDEE_PATH = competition.entrants
+    OUTPUT_DIR = competition.output_dir
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+
+def output_path(file_name):
+    return os.path.join(OUTPUT_DIR, file_name)
+
 # This is the function that calls the coinGecko API and obtains values for all relevant symbols as decided per the get_data() function later
-# We call this function in get_data(), hence defining it here ahead of time.
-def api_call(symbol, coin_id):
-    params = {
-        "vs_currency": CURRENCY,
-        "days": (END_DATE - START_DATE).days + 1,
-        "interval": "daily"
-    }
-
-    for attempt in range(3):
-        response = requests.get(API_URL.format(coin_id), headers=API_HEADER, params=params)
-        if response.status_code == 200:
-            data = response.json()
-            prices = {datetime.fromtimestamp(p[0] / 1000, tz=timezone.utc).date(): p[1] for p in data ["prices"]}
-            return prices
-        elif response.status_code == 429:
-            print(f"Rate limited for {coin_id}. Trying again in 1 minute", end="", flush=True)
-            for _ in range(65):
-                time.sleep(1)
-                print(".", end="", flush=True)
-            print(f"\nRequesting: {symbol} ({coin_id})")
-            print()
-        else:
-            print(f"Error fetching {coin_id}: {response.status_code}")
-            return None
-    return None
-
-# Predefining our tiebreaker logic. This will call the CoinGecko API in the event of a tie at the top, and will
-# download the data for the coin in question for the signUpDate. We will use the time of sign-up to see which attendee
-# picked the coin whilst it was at the lower price (or near as damnit)
-def tiebreaker(top_results, attendee_df, symbol_to_id):
+# We call this function in get_data(), hence defining it here ahead of time. coin_requests is {coin_id: since}, where 'since' is
+# the first day we still need - anything earlier is already sitting in the local price store, so there's no point asking again.
+# All requests are handed to the price provider (normally the shared fetch engine) in one go; it keeps as many in flight as the rate limit allows and deals
+# with any 429s itself, so no more sleeping between calls here.
+@metrics.timed("api_call")
+def api_call(coin_requests):
+    jobs = []
+    for coin_id, since in coin_requests.items():
+        params = {
+            "vs_currency": CURRENCY,
+            "days": (END_DATE - since).days + 1,
+            "interval": "daily"
+        }
+        jobs.append((priceProvider.MARKET_CHART.format(coin_id), params))
+
+    results = priceProvider.fetch_many(jobs, headers=API_HEADER)
+
+    all_prices = {}
+    for coin_id, data in zip(coin_requests, results):
+        if data is None:
+            print(f"Error fetching {coin_id}")
+            continue
+        all_prices[coin_id] = {datetime.fromtimestamp(p[0] / 1000, tz=timezone.utc).date(): p[1] for p in data["prices"]}
+    return all_prices
+
+# Predefining our tiebreaker logic. In the event of a tie at the top, every tied attendee's sign-up time is checked against
+# the intraday prices for their coin on that day, to see which attendee picked the coin whilst it was at the lower price
+# (or near as damnit). One API request per coin/day, and anything already in the price store isn't fetched again - see
+# tiebreaker.py. The full ranking goes to tiebreakerData.csv
+def tiebreaker(top_results, attendee_df, symbol_to_id, prices):
     print("\nTiebreaker check in progress...")
 
-    first_symbol = top_results.iloc[0]['cryptoSymbol']
-    coin_id = symbol_to_id.get(first_symbol)
-
-    signup_date_str = attendee_df.loc[
-        attendee_df['cryptoSymbol'] == first_symbol, 'signUpDate'
-    ].values[0]
-    sign_up_date = parser.parse(signup_date_str).date()
-
-    start_ts = int(datetime.combine(sign_up_date, datetime.min.time()).replace(tzinfo=timezone.utc).timestamp())
-    end_ts = int(datetime.combine(sign_up_date + timedelta(days=1), datetime.min.time()).replace(tzinfo=timezone.utc).timestamp())
-
-    url = TIEBREAKER_URL.format(coin_id)
-    params = {
-        "vs_currency": CURRENCY,
-        "from": start_ts,
-        "to": end_ts
-    }
-
-    print(f"Fetching intraday data for symbol {first_symbol} on {sign_up_date}...")
-    response = requests.get(url, headers=API_HEADER, params=params)
-    tie_data = []
-
-    if response.status_code == 200:
-        data = response.json()
-        prices = data.get("prices", [])
-        for price_entry in prices:
-            timestamp = datetime.fromtimestamp(price_entry[0] / 1000, tz=timezone.utc)
-            price = price_entry[1]
-            tie_data.append({
-                "cryptoSymbol": first_symbol,
-                "signUpDate": sign_up_date,
-                "timestampUTC": timestamp,
-                "price": price
-            })
-    else:
-        print(f"Failed to fetch intraday data for {first_symbol} on {sign_up_date}. Error code: {response.status_code}")
-    
-    if tie_data:
-        pd.DataFrame(tie_data).to_csv("tiebreakerData.csv", index=False)
-        print("Tiebreaker data written to tiebreakerData.csv!")
+    tied_df = attendee_df.loc[top_results.index]
+    end_row = prices.rows(np.array([np.datetime64(END_DATE, "D")]))[0]
+    end_prices = {sym: float(prices.prices[end_row, prices.column[sym]])
+                  for sym in tied_df['cryptoSymbol'].unique() if sym in prices.column}
+
+    store = priceStore.open_store()
+    ranked_df = tiebreaker_engine.resolve(tied_df, symbol_to_id, end_prices, store, headers=API_HEADER)
+    store.close()
+
+    ranked_df.to_csv(output_path("tiebreakerData.csv"), index=False)
+    print(ranked_df[["rank", "attendeeName", "cryptoSymbol", "signUpUTC", "entryPrice", "gainLossFormatted"]].to_string(index=False))
+    if ranked_df['gainLoss'].notna().any():
+        print(f"\nTiebreaker winner: {ranked_df.iloc[0]['attendeeName']} - full ranking written to tiebreakerData.csv!")
     else:
-        print("No tiebreaker data was available to write to file. Please check prices manually via CoinGecko.com")
+        print("No intraday data was available to settle the tie. Please check prices manually via CoinGecko.com")
+
+# Builds the symbol-by-date table (one column per day, "dd-MMM-yyyy" headers) from the local price store. Coins we hold no
+# prices for at all are left out, same as when a failed API call meant they never made it into coinGeckoData.csv
+def load_price_frame(store, symbol_to_id):
+    date_range = [(START_DATE + timedelta(days=i)) for i in range((END_DATE - START_DATE).days + 1)]
+    date_headers = [d.strftime("%d-%b-%Y") for d in date_range]
+
+    all_prices = []
+    for symbol, coin_id in symbol_to_id.items():
+        prices = priceStore.load_prices(store, coin_id, START_DATE, END_DATE)
+        if not prices:
+            continue
+        row = [symbol]
+        for d in date_range:
+            row.append(prices.get(d, None))
+        all_prices.append(row)
+
+    return pd.DataFrame(all_prices, columns=["symbol"] + date_headers)
 
 # Our main function to gather data from the CSVs we have, confirm which specific symbols we need data for
 # (instead of irresponsibly calling for all 100 - if attendees have only chosen 20 between them, we only make 20 calls)
-# and subsequently trigger the api_call() function for each, generating coinGeckoList.csv for later use in function decide_winner()
+# and subsequently trigger the api_call() function for each, topping-up the local price store (priceHistory.db) for later
+# use in function decide_winner(). Anything already stored is not requested again - a second run on the same day makes no calls.
 def get_data():
 
-    crypto_df = pd.read_csv("cryptoList.csv")       # Load our list of Top 100 cryptocurrencies by market cap at 14 July 2025
-    attendee_df = pd.read_csv("attendeeList.csv")   # Load list of GDAC 2025 attendees, their date-of-purchase and symbol choice
+    with metrics.timer("csv_load", file="cryptoList.csv"):
+        crypto_df = pd.read_csv(CRYPTO_LIST_PATH)       # Load our list of Top 100 cryptocurrencies by market cap at 14 July 2025
+    with metrics.timer("csv_load", file="attendeeList.csv"):
+        attendee_df = pd.read_csv(ATTENDEE_PATH)        # Load list of GDAC 2025 attendees, their date-of-purchase and symbol choice
 
     crypto_df['symbol'] = crypto_df['symbol'].str.lower()                   # Normalising to lower-case (safety net in case data is
     attendee_df['cryptoSymbol'] = attendee_df['cryptoSymbol'].str.lower()   # provided with erroneous formatting)
@@ -112,92 +131,92 @@ def get_data():
         missing = set(unique_symbols) - set(symbol_to_id.keys())
         print(f"WARNING: No CoinGecko ID could be located for {', '.join(missing)}")
     
-    date_range = [(START_DATE + timedelta(days=i)) for i in range((END_DATE - START_DATE).days + 1)]
-    date_headers = [d.strftime("%d-%b-%Y") for d in date_range]
+    store = priceStore.open_store()
 
-    all_prices = []
-
-    print("Fetching historical prices from CoinGecko...")
+    coin_requests = {}
     for symbol, coin_id in symbol_to_id.items():
-        print(f"Requesting: {symbol} ({coin_id})", end="", flush=True)
-        prices = api_call(symbol, coin_id)
-        for _ in range(12): # Be kind to this free API... leave a little gap between calls. There is a throttle at more than 5-6 requests per minute. 10s + 2s buffer should keep us going without hitting the last-resort 1min+ hold we've built in api_call()
-            time.sleep(1)
-            print(".", end="", flush=True)
-        print()
-        if not prices:
+        since = priceStore.missing_since(store, coin_id, START_DATE, END_DATE)
+        if since is None:
+            print(f"Already up to date: {symbol} ({coin_id})")
             continue
-        row = [symbol]
-        for d in date_range:
-            row.append(prices.get(d, None))
-        all_prices.append(row)
-
-    price_df = pd.DataFrame(all_prices, columns=["symbol"] + date_headers)
-    price_df.to_csv("coinGeckoData.csv")
+        print(f"Requesting: {symbol} ({coin_id}) from {since}")
+        coin_requests[coin_id] = since
+
+    if coin_requests:
+        print(f"Fetching historical prices from CoinGecko for {len(coin_requests)} coins...")
+        for coin_id, prices in api_call(coin_requests).items():
+            if prices:
+                priceStore.save_prices(store, coin_id, prices)
+            # Recorded even if nothing came back (eg. a coin listed after START_DATE), so the same days aren't asked for again
+            priceStore.record_fetched(store, coin_id, coin_requests[coin_id], END_DATE)
+
+    # decide_winner() scores from priceMatrix.npy (memory-mapped, see priceMatrix.py), so refresh that now the store is topped
+    # up. Still export the full table too, for anyone wanting to eyeball the numbers
+    with metrics.timer("price_matrix_build"):
+        priceMatrix.save(priceMatrix.build(store, symbol_to_id, START_DATE, END_DATE), output_path(priceMatrix.MATRIX_PATH))
+    price_df = load_price_frame(store, symbol_to_id)
+    store.close()
+    with metrics.timer("csv_dump", file="coinGeckoData.csv"):
+        price_df.to_csv(output_path("coinGeckoData.csv"))
     print("Saved data to CoinGeckoData.csv")
 
+# Normally get_data() has just written priceMatrix.npy - only go back to the store if it's missing, out of date or short of a coin
+def load_price_matrix(chosen_ids):
+    matrix_path = output_path(priceMatrix.MATRIX_PATH)
+    prices = priceMatrix.load(matrix_path)
+    if prices is None or not prices.covers(START_DATE, END_DATE, chosen_ids):
+        store = priceStore.open_store()
+        priceMatrix.save(priceMatrix.build(store, chosen_ids, START_DATE, END_DATE), matrix_path)
+        store.close()
+        prices = priceMatrix.load(matrix_path)
+    return prices
+
+@metrics.timed("decide_winner")
 def decide_winner():
-    print("\nLoading CoinGecko price data for analysis...")
-    price_df = pd.read_csv("coinGeckoData.csv")
-    attendee_df = pd.read_csv("attendeeList.csv")
-    crypto_df = pd.read_csv("cryptoList.csv")
+    print("\nLoading stored price data for analysis...")
+    with metrics.timer("csv_load", file="attendeeList.csv"):
+        attendee_df = pd.read_csv(ATTENDEE_PATH)
+    with metrics.timer("csv_load", file="cryptoList.csv"):
+        crypto_df = pd.read_csv(CRYPTO_LIST_PATH)
 
-    price_df['symbol'] = price_df['symbol'].str.lower() # Normalising again
-    price_df.set_index('symbol', inplace=True)
     attendee_df['cryptoSymbol'] = attendee_df['cryptoSymbol'].str.lower()
     crypto_df['symbol'] = crypto_df['symbol'].str.lower()
 
     symbol_to_id = crypto_df.set_index('symbol')['id'].to_dict()
+    chosen_ids = {sym: symbol_to_id[sym] for sym in attendee_df['cryptoSymbol'].unique() if sym in symbol_to_id}
 
-    results = []
+    prices = load_price_matrix(chosen_ids)
 
     # Phase 2: Take signUpDate from attendee list and calculate gains/losses to date, decide a winner and print to console
     # along with a full csv, top-to-bottom, of all attendee results for review if need be
     print("Calculating gains/losses for each attendee...")
-    for _, row in attendee_df.iterrows():
-        attendee = row['attendeeName']
-        symbol = row['cryptoSymbol']
-        sign_up_date = parser.parse(row['signUpDate']).date()
-
-        try:
-            start_price = price_df.loc[symbol, sign_up_date.strftime("%d-%b-%Y")]
-            end_price = price_df.loc[symbol, END_DATE.strftime("%d-%b-%Y")]
-        except KeyError:
-            print(f"Missing price data for {attendee} - {symbol} on required dates. Skipping...")
-            continue
-
-        if pd.isna(start_price) or pd.isna(end_price):
-            print(f"Incomplete price data for {attendee} - {symbol}. Skipping...")
-            continue
-
-        percent_change = ((end_price - start_price) / start_price) * 100
-        formatted = f"{'+' if percent_change >= 0 else '-'}{abs(percent_change):.2f}%"
-
-        results.append({
-            "attendeeName": attendee,
-            "cryptoSymbol": symbol,
-            "gainLoss": percent_change,
-            "gainLossFormatted": formatted
-        })
+    with metrics.timer("score_attendees"):
+        results_df = scoring.score_price_matrix(attendee_df, prices, END_DATE)  # Whole list in one go - see scoring.py
 
     # Outputting final results to CSV
-    results_df = pd.DataFrame(results)
-    results_df = results_df.sort_values(by="gainLoss", ascending=False)
-    results_df.to_csv("cryptoGameResults.csv", index=False)
+    with metrics.timer("csv_dump", file="cryptoGameResults.csv"):
+        results_df.to_csv(output_path("cryptoGameResults.csv"), index=False)
 
     # Outputting Top 10 to Console
     print("\n:----------Top 10 Results:----------:")
     print(results_df[["attendeeName", "cryptoSymbol", "gainLossFormatted"]].head(10).to_string(index=False))
 
-    # NEW tiebreaker logic - requires manual review at present, may add automation here depending on datetime data from SeatLab
+    # A tie at the top is settled automatically from intraday prices at each tied attendee's sign-up time (see tiebreaker() above)
     top_value = results_df.iloc[0]['gainLoss']
     top_results = results_df[results_df['gainLoss'] == top_value]
     if len(top_results) > 1:
         print("\nTIE! Initializing tiebreaker...")
-        tiebreaker(top_results, attendee_df, symbol_to_id)
+        with metrics.timer("tiebreaker"):
+            tiebreaker(top_results, attendee_df, symbol_to_id, prices)
     else:
         print("No tiebreaker needed!")
 
 if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Fetch prices for the crypto game and decide the winner")
+    arg_parser.add_argument("--competition", help="Run this competition from competitions.json, rather than the files here")
+    args = arg_parser.parse_args()
+
+    if args.competition:
+        use_competition(competitions.get_competition(args.competition))
     get_data()
     decide_winner()
@@ -1,96 +1,182 @@
-import pandas as pd
+from bisect import insort
+from datetime import timezone
+import argparse
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Lets us share modules that live in the repo root
+import coinResolver
+import metrics
+with metrics.timer("import", module="pandas"):
+    import pandas as pd
+import scoring
+
+ENTRANTS_FILE = "GDAC Crypto game entrants.csv"
+OUTPUT_FILE = "attendeeList.csv"
+MAX_PER_COIN = 5
+CHUNK_SIZE = 100_000    # Rows per chunk in --stream mode
+REQUIRED_ENTRANTS_COLS = ["Name", "Date", "Time", "Coin"]
+NO_DATE = pd.Timestamp.max.value    # Sort key for anything we can't parse, so it goes last
+NO_TIME = pd.Timedelta(hours=23, minutes=59)    # Entries with a date but no usable time count as the end of that day
+
+
+# ----------------------------------------------------------------------
+# Row-by-row building blocks. Everything here works on each row on its own (nothing is inferred from the column as a whole),
+# so main() gets exactly the same answer whether it sees the entire export at once or streams it through in chunks.
+# ----------------------------------------------------------------------
+
+# Step 0 tidy-up: normalise headers (fixes 'Date ' / 'Time ' etc.), make sure the columns we need exist, trim cell whitespace
+def clean_entrants(entrants_df):
+    entrants_df.columns = entrants_df.columns.astype(str).str.strip()
+    for col in REQUIRED_ENTRANTS_COLS:
+        if col not in entrants_df.columns:
+            entrants_df[col] = pd.NA
+    for c in REQUIRED_ENTRANTS_COLS:
+        entrants_df[c] = entrants_df[c].astype(str).str.strip()
+    return entrants_df
+
+
+# Step 1.1 + 1.2 (see main() for the full story). 'resolved' remembers what each distinct string resolved to
+def resolve_coins(entrants_df, resolver, resolved, verbose=True):
+    new_coins = []
+    for original_coin_display in entrants_df["Coin"]:
+        if original_coin_display not in resolved:
+            resolved[original_coin_display] = resolver.resolve(original_coin_display)
+        symbol_exact, matched_on = resolved[original_coin_display]
+
+        if symbol_exact is None or matched_on == "symbol":
+            new_coins.append(original_coin_display)     # Either already a ticker, or nothing we recognise (dropped in Step 4)
+            continue
+        if verbose and original_coin_display != symbol_exact:
+            print(f"Anomaly: '{original_coin_display}' being replaced with '{symbol_exact}'")
+        new_coins.append(symbol_exact)
+    entrants_df["Coin"] = pd.Series(new_coins, index=entrants_df.index)
+
+
+# Dates and times, parsed once up front (this used to happen up to five times over, in Steps 1.3, 3 and 7, and then again in
+# cryptoGame.py). Each distinct raw 'Date' string and each distinct raw 'Time' string is parsed exactly once - an export has
+# thousands of rows but only a few dozen distinct values - and the cache remembers them, across chunks too in --stream mode.
+# Everything the later steps need comes out of that one parse:
+#   - the Step 1.3 sort key: entry date-time, with date-only entries counting as 23:59
+#   - the Step 3 display strings: 'dd-MMM-yyyy' and 'HH:mm' (anything unparsable is left as it was)
+#   - the Step 7 sort key: sign-up date-time, unparsable values last
+#   - signUpUTC: the sign-up moment in UTC, saved in attendeeList.csv so nothing downstream has to parse a date again. Times
+#     are local (see scoring.LOCAL_TZ), and a missing time counts as 23:59, as the tiebreaker has always done
+# Dates are dd/mm/yyyy or dd/mm/yy, falling back to a general day-first parser for the odd ones - each of those on its own,
+# rather than letting pandas guess one format for the whole column from whichever row comes first.
+class DateCache:
+    def __init__(self):
+        self.days = {}          # raw Date -> Timestamp (NaT if unparsable)
+        self.strict = {}        # raw Date -> True if it was dd/mm/yyyy or dd/mm/yy
+        self.date_text = {}     # raw Date -> 'dd-MMM-yyyy'
+        self.times = {}         # raw Time -> time of day as a Timedelta (NaT if unparsable)
+        self.time_text = {}     # raw Time -> 'HH:mm'
+        self.utc = {}           # local sign-up moment -> signUpUTC
+
+    def add_dates(self, values):
+        new = pd.Series([v for v in values if v not in self.days], dtype=object)
+        if new.empty:
+            return
+        strict = pd.to_datetime(new, format="%d/%m/%Y", errors="coerce")
+        strict = strict.where(strict.notna(), pd.to_datetime(new, format="%d/%m/%y", errors="coerce"))
+        for value, day, is_strict in zip(new, strict, strict.notna()):
+            if not is_strict:
+                day = pd.to_datetime(value, dayfirst=True, errors="coerce")
+            self.days[value] = day
+            self.strict[value] = is_strict
+            self.date_text[value] = value if pd.isna(day) else day.strftime("%d-%b-%Y")
+
+    def add_times(self, values):
+        new = pd.Series([v for v in values if v not in self.times], dtype=object)
+        if new.empty:
+            return
+        parsed = pd.to_datetime(new, format="%H:%M", errors="coerce")
+        for value, t in zip(new, parsed):
+            self.times[value] = pd.NaT if pd.isna(t) else pd.Timedelta(hours=t.hour, minutes=t.minute)
+            self.time_text[value] = value if pd.isna(t) else t.strftime("%H:%M")
+
+    def utc_text(self, local_moments):
+        for moment in map(pd.Timestamp, local_moments.dropna().unique()):
+            if moment not in self.utc:
+                local = moment.to_pydatetime().replace(tzinfo=scoring.LOCAL_TZ)
+                self.utc[moment] = local.astimezone(timezone.utc).strftime(scoring.UTC_FORMAT)
+        return local_moments.map(self.utc).fillna("")
+
+
+# Returns a DataFrame on entrants_df's index with 'entry' (Step 1.3 key), 'date' and 'time' (Step 3), 'signup' (Step 7 key,
+# both keys as Timestamps with Timestamp.max for anything unparsable) and 'signUpUTC'
+def parse_datetimes(entrants_df, cache):
+    date_str = entrants_df["Date"].astype(str).str.strip()
+    time_str = entrants_df["Time"].astype(str).str.strip()
+    cache.add_dates(date_str.unique())
+    cache.add_times(time_str.unique())
+
+    day = pd.to_datetime(date_str.map(cache.days))
+    time = pd.to_timedelta(time_str.map(cache.times))
+    strict = date_str.map(cache.strict).astype(bool)
+    has_time = time.notna()
+
+    # dd/mm/yyyy and dd/mm/yy dates get their time added. Odd-format dates have always been sorted as midnight even when they
+    # had a time, and that's kept so Step 1.3 picks the same duplicates it always has
+    entry_offset = time.where(strict, pd.Timedelta(0)).where(has_time, NO_TIME)
+    return pd.DataFrame({
+        "entry": (day + entry_offset).fillna(pd.Timestamp.max),
+        "date": date_str.map(cache.date_text),
+        "time": time_str.map(cache.time_text),
+        "signup": (day.dt.normalize() + time).fillna(pd.Timestamp.max),
+        "signUpUTC": cache.utc_text(day.dt.normalize() + time.fillna(NO_TIME))
+    }, index=entrants_df.index)
+
 
 def main():
+    steps = metrics.Steps("normalizer_step")    # Each step's time goes to gdac_normalizer_step_seconds{step="..."}
 
     # ------------------------------------------------------------------
     # Step 0: Open files in requested modes and load into DataFrames
     # ------------------------------------------------------------------
+    steps.start("0 load")
     print("Importing entrants data")
-    with open("GDAC Crypto game entrants.csv", "r+", encoding="utf-8") as entrants_file:
-        entrants_df = pd.read_csv(entrants_file)
+    with open(ENTRANTS_FILE, "r+", encoding="utf-8") as entrants_file:
+        entrants_df = pd.read_csv(entrants_file, dtype=object)
 
         print("Importing cryptoList")
         with open("cryptoList.csv", "r", encoding="utf-8") as crypto_file:
             crypto_df = pd.read_csv(crypto_file)
 
-            # --- NEW: normalize headers (fixes 'Date ' / 'Time ' etc.) ---
-            entrants_df.columns = entrants_df.columns.astype(str).str.strip()
+            # --- NEW: normalize headers (fixes 'Date ' / 'Time ' etc.), ensure expected columns exist, trim cell whitespace ---
+            entrants_df = clean_entrants(entrants_df)
             crypto_df.columns = crypto_df.columns.astype(str).str.strip()
 
-            # Ensure expected columns exist
-            required_entrants_cols = ["Name", "Date", "Time", "Coin"]
-            for col in required_entrants_cols:
-                if col not in entrants_df.columns:
-                    entrants_df[col] = pd.NA
-
             for col in ["id", "symbol", "name"]:
                 if col not in crypto_df.columns:
                     raise ValueError("cryptoList.csv must contain 'id', 'symbol', and 'name' columns")
 
-            # --- NEW: trim cell whitespace in key columns ---
-            for c in ["Name", "Date", "Time", "Coin"]:
-                entrants_df[c] = entrants_df[c].astype(str).str.strip()
-
             crypto_df["id"] = crypto_df["id"].astype(str).str.strip()
             crypto_df["name"] = crypto_df["name"].astype(str).str.strip()
             crypto_df["symbol"] = crypto_df["symbol"].astype(str).str.strip()
 
             # Normalize helper series
-            crypto_ids_lower = crypto_df["id"].str.lower()
-            crypto_names_lower = crypto_df["name"].str.lower()
-            crypto_symbols_exact = crypto_df["symbol"]
-            crypto_symbols_lower = crypto_symbols_exact.str.lower()
-
-            # Prepare entrants 'Coin'
-            entrants_df["Coin"] = entrants_df["Coin"].astype(str)
-            coin_lower_series = entrants_df["Coin"].str.lower()
+            crypto_symbols_lower = crypto_df["symbol"].str.lower()
 
             # ------------------------------------------------------------------
-            # Step 1.1: Re-write full names (matched against crpytoList.id) to tickers (equivalent cryptoList.symbol)
+            # Step 1.1 + 1.2: Re-write full names (matched against cryptoList.id or cryptoList.name) to tickers (cryptoList.symbol)
             # ------------------------------------------------------------------
-            print("Normalizing id values to symbols")
-            id_symbol_pairs = list(zip(crypto_ids_lower, crypto_symbols_exact))
-
-            new_coins = []
-            for idx, coin_lower in coin_lower_series.items():
-                original_coin_display = entrants_df.at[idx, "Coin"]
-                replaced_value = original_coin_display  # default unchanged
-
-                for id_lower, symbol_exact in id_symbol_pairs:
-                    if isinstance(coin_lower, str) and id_lower in coin_lower:
-                        if original_coin_display != symbol_exact:
-                            print(f"Anomaly: '{original_coin_display}' being replaced with '{symbol_exact}'")
-                        replaced_value = symbol_exact
-                        break  # first match wins
-
-                new_coins.append(replaced_value)
-
-            entrants_df["Coin"] = pd.Series(new_coins, index=entrants_df.index)
-
-            # Refresh the lowercase series after 1.1
-            coin_lower_series = entrants_df["Coin"].astype(str).str.lower()
-
-            # ------------------------------------------------------------------
-            # Step 1.2: Re-write full names (matched against cryptoList.name) to tickers (equivalent cryptoList.symbol)
-            # ------------------------------------------------------------------
-            print("Normalizing id values to names")
-            name_symbol_name_triples = list(zip(crypto_names_lower, crypto_symbols_exact, crypto_df["name"]))
-
-            new_coins = []
-            for idx, coin_lower in coin_lower_series.items():
-                original_coin_display = entrants_df.at[idx, "Coin"]
-                replaced_value = original_coin_display  # default unchanged
-
-                for name_lower, symbol_exact, name_exact in name_symbol_name_triples:
-                    if isinstance(coin_lower, str) and name_lower in coin_lower:
-                        # Exact requested wording
-                        print(f"Anomaly: {original_coin_display} being replaced with {name_exact}")
-                        replaced_value = symbol_exact
-                        break  # first match wins
-
-                new_coins.append(replaced_value)
-
-            entrants_df["Coin"] = pd.Series(new_coins, index=entrants_df.index)
+            # This used to be two passes checking every id, then every name, against every entrant, with "first match wins".
+            # The resolver index (see coinResolver.py) does exact symbol/id/name lookups plus a longest-substring-wins search,
+            # and each distinct thing people typed is only resolved once.
+            steps.start("1.1 resolve coins")
+            print("Normalizing id and name values to symbols")
+            resolver = coinResolver.load_resolver("cryptoList.csv")
+            resolve_coins(entrants_df, resolver, {})
+
+            # Every date and time, parsed once - see parse_datetimes(). The results ride along as columns until they're used
+            steps.start("1.2 parse dates and times")
+            parsed = parse_datetimes(entrants_df, DateCache())
+            entrants_df["_entry_sort"] = parsed["entry"]
+            entrants_df["_date_text"] = parsed["date"]
+            entrants_df["_time_text"] = parsed["time"]
+            entrants_df["_signup_sort"] = parsed["signup"]
+            entrants_df["signUpUTC"] = parsed["signUpUTC"]
 
             # ------------------------------------------------------------------
             # Step 1.3: Filter out Party/Virtual ticket types ***OLD***
@@ -115,26 +201,12 @@ def main():
             # ------------------------------------------------------------------
             # Step 1.3: Deduplicate on ('Name', 'Coin') - Keeps earliest 'Date', then 'Time'
             # ------------------------------------------------------------------
+            steps.start("1.3 dedupe")
             print("Removing most recent duplicates where 'Name' and 'Coin' match.\nOldest entry will be retained, subseuqent entries will be deleted.")
 
             entrants_df["_name_norm"] = entrants_df["Name"].astype(str).str.strip().str.lower()
             entrants_df["_coin_norm"] = entrants_df["Coin"].astype(str).str.strip().str.lower()
-            date_str = entrants_df["Date"].astype(str).str.strip()
-            time_str = entrants_df["Time"].astype(str).str.strip()
-
-            dt1 = pd.to_datetime(date_str + " " + time_str, format="%d/%m/%Y %H:%M", errors="coerce")
-            dt2 = pd.to_datetime(date_str + " " + time_str, format="%d/%m/%y %H:%M", errors="coerce")
-            dt = dt1.where(dt1.notna(), dt2)
-
-            date_only = pd.to_datetime(date_str, dayfirst=True, errors="coerce")
-            dt = dt.where(dt.notna(), date_only)
-
-            time_parsed = pd.to_datetime(time_str, format="%H:%M", errors="coerce")
-            add_minutes = pd.Series(0, index=entrants_df.index)
-            add_minutes[(dt.notna()) & (time_parsed.isna())] = 23*60 + 59
-            dt = dt + pd.to_timedelta(add_minutes, unit="m")
-
-            entrants_df["_dt_sort"] = dt.fillna(pd.Timestamp.max)
+            entrants_df["_dt_sort"] = entrants_df.pop("_entry_sort")
             entrants_df["_orig_idx"] = range(len(entrants_df))
 
             entrants_df = entrants_df.sort_values(
@@ -152,6 +224,7 @@ def main():
             # ------------------------------------------------------------------
             # Step 2: Convert entrants column 'Coin' tolower
             # ------------------------------------------------------------------
+            steps.start("2 lowercase coins")
             print("Converting all values tolower")
             entrants_df["Coin"] = entrants_df["Coin"].astype(str).str.lower()
 
@@ -159,34 +232,15 @@ def main():
             # Step 3: Convert data in date column to format 'dd-MMM-yyyy'
             # (supports input in BOTH dd/MM/yy and dd/MM/yyyy)
             # ------------------------------------------------------------------
+            steps.start("3 format dates")
             print("Converting all dates to format 'dd-MMM-yyyy'")
-            date_str = entrants_df["Date"].astype(str).str.strip()
-
-            # Detect 4-digit and 2-digit year patterns
-            mask_yyyy = date_str.str.match(r"^\d{1,2}/\d{1,2}/\d{4}$", na=False)
-            mask_yy   = date_str.str.match(r"^\d{1,2}/\d{1,2}/\d{2}$",  na=False)
-
-            parsed = pd.Series(pd.NaT, index=entrants_df.index, dtype="datetime64[ns]")
-            # Parse explicit formats
-            parsed.loc[mask_yyyy] = pd.to_datetime(date_str.loc[mask_yyyy], format="%d/%m/%Y", errors="coerce")
-            parsed.loc[mask_yy]   = pd.to_datetime(date_str.loc[mask_yy],   format="%d/%m/%y", errors="coerce")
-
-            # Fallback for any oddballs: general parser with dayfirst
-            need_fallback = parsed.isna()
-            if need_fallback.any():
-                parsed.loc[need_fallback] = pd.to_datetime(date_str.loc[need_fallback], dayfirst=True, errors="coerce")
-
-            # Write formatted string; if still NaT, keep original trimmed value
-            entrants_df["Date"] = parsed.dt.strftime("%d-%b-%Y").where(parsed.notna(), date_str)
-
-            # Normalize Time -> keep as HH:mm (with safe fallback)
-            time_str = entrants_df["Time"].astype(str).str.strip()
-            times_parsed = pd.to_datetime(time_str, format="%H:%M", errors="coerce")
-            entrants_df["Time"] = times_parsed.dt.strftime("%H:%M").where(times_parsed.notna(), time_str)
+            entrants_df["Date"] = entrants_df.pop("_date_text")
+            entrants_df["Time"] = entrants_df.pop("_time_text")
 
             # ------------------------------------------------------------------
             # Step 4: Delete rows where entrants Coin not in cryptoList symbols
             # ------------------------------------------------------------------
+            steps.start("4 drop unknown coins")
             symbols_set = set(crypto_symbols_lower.tolist())
             to_drop_indices = []
             for idx, coin_val in entrants_df["Coin"].items():
@@ -200,10 +254,11 @@ def main():
                 entrants_df = entrants_df.drop(index=to_drop_indices).reset_index(drop=True)
 
             # ------------------------------------------------------------------
-            # Step 5: Delete all columns except 'Name', 'Date', 'Time', 'Coin'
+            # Step 5: Delete all columns except 'Name', 'Date', 'Time', 'Coin' (and 'signUpUTC', plus Step 7's sort key)
             # ------------------------------------------------------------------
+            steps.start("5-6 select and rename columns")
             print("Removing all non-relevant columns")
-            keep_cols = ["Name", "Date", "Time", "Coin"]
+            keep_cols = ["Name", "Date", "Time", "Coin", "signUpUTC", "_signup_sort"]
             for col in keep_cols:
                 if col not in entrants_df.columns:
                     entrants_df[col] = pd.NA
@@ -223,22 +278,17 @@ def main():
             # ------------------------------------------------------------------
             # Step 7 — Cap to first five entries per cryptoSymbol by date-time
             # ------------------------------------------------------------------
+            steps.start("7 cap per coin")
             print("Capping entries to first five per cryptoSymbol (by date-time)")
 
             # Build a sort key from signUpDate + signUpTime; put unparsable values last
-            dt = pd.to_datetime(
-                entrants_df["signUpDate"].astype(str).str.strip() + " " +
-                entrants_df["signUpTime"].astype(str).str.strip(),
-                format="%d-%b-%Y %H:%M",
-                errors="coerce"
-            )
             # Keep a stable tie-breaker
             entrants_df["_orig_idx"] = range(len(entrants_df))
-            entrants_df["_dt_sort"] = dt.fillna(pd.Timestamp.max)
+            entrants_df["_dt_sort"] = entrants_df.pop("_signup_sort")
 
             # Sort then mark rows beyond the first 5 per symbol
             entrants_df = entrants_df.sort_values(["cryptoSymbol", "_dt_sort", "_orig_idx"]).reset_index(drop=True)
-            excess_mask = entrants_df.groupby("cryptoSymbol").cumcount() >= 5
+            excess_mask = entrants_df.groupby("cryptoSymbol").cumcount() >= MAX_PER_COIN
             if excess_mask.any():
                 # Print one line per removed row for traceability
                 for i, row in entrants_df.loc[excess_mask].iterrows():
@@ -252,10 +302,123 @@ def main():
             entrants_df = entrants_df.drop(columns=["_orig_idx", "_dt_sort"], errors="ignore")
 
             # Step 8: Save entrants to attendeeList.csv
-            print("Saving data to 'attendeeList.csv'")
-            entrants_df.to_csv("attendeeList.csv", index=False)
+            steps.start("8 save")
+            print(f"Saving data to '{OUTPUT_FILE}'")
+            entrants_df.to_csv(OUTPUT_FILE, index=False)
+            steps.stop()
 
         # Step 9: Close entrants, close cryptoList (handled by context managers)
 
+
+# ----------------------------------------------------------------------
+# Streaming mode (--stream), for multi-million-row ticketing exports that we'd rather not hold in memory (several times over,
+# what with all the copies main() makes). The export is read CHUNK_SIZE rows at a time, and each chunk goes through the same
+# row-level steps as main(). Then, rather than sorting everything:
+#   - Step 1.3 keeps a running dict of (name, coin) -> earliest entry seen so far
+#   - Step 7 keeps a bounded, sorted list of the first five valid entries per symbol
+# so memory only grows with the number of distinct (name, coin) pairs, not with the size of the export.
+#
+# The order main() caps by works out as (signUp date-time, then the Step 1.3 sort order, ie. name, entry date-time, row number),
+# so that's the key we use here - which is what keeps attendeeList.csv identical between the two modes.
+# ----------------------------------------------------------------------
+
+def datetime_keys(series):
+    return series.to_numpy(dtype="datetime64[ns]").astype("int64").tolist()
+
+
+# Yields one tuple per valid (Step 4) row: ((name, coin), Step 1.3 key, symbol, Step 7 key, output row)
+def stream_records(chunksize, resolver, symbols_set, verbose=True):
+    resolved, date_cache = {}, DateCache()
+    row_offset = 0
+    with open(ENTRANTS_FILE, "r", encoding="utf-8") as entrants_file:
+        for chunk in pd.read_csv(entrants_file, dtype=object, chunksize=chunksize):
+            chunk.index = range(row_offset, row_offset + len(chunk))
+            row_offset += len(chunk)
+            metrics.count("normalizer_rows", len(chunk))
+
+            with metrics.timer("normalizer_step", step="chunk"):
+                chunk = clean_entrants(chunk)
+                resolve_coins(chunk, resolver, resolved, verbose)
+                name_norm = chunk["Name"].astype(str).str.strip().str.lower().tolist()
+                coin_norm = chunk["Coin"].astype(str).str.strip().str.lower().tolist()
+                parsed = parse_datetimes(chunk, date_cache)
+                entry_dt = datetime_keys(parsed["entry"])
+
+                chunk["Coin"] = chunk["Coin"].astype(str).str.lower()       # Step 2
+                chunk["Date"], chunk["Time"] = parsed["date"], parsed["time"]   # Step 3
+                signup_dt = datetime_keys(parsed["signup"])
+
+            rows = zip(chunk.index, chunk["Name"], chunk["Date"], chunk["Time"], chunk["Coin"], parsed["signUpUTC"], name_norm,
+                       coin_norm, entry_dt, signup_dt)
+            for row_number, name, date, time, coin, utc, name_key, coin_key, entry_key, signup_key in rows:
+                if coin not in symbols_set:                              # Step 4
+                    if verbose:
+                        print(f"Entry for '{name}' discounted for data mismatch: '{coin}' not present in cryptoList")
+                    continue
+                yield ((name_key, coin_key), (entry_key, row_number), coin,
+                       (signup_key, name_key, entry_key, row_number), (name, date, time, coin, utc))
+
+
+def main_streaming(chunksize=CHUNK_SIZE):
+    print(f"Streaming entrants data in chunks of {chunksize:,} rows")
+    resolver = coinResolver.load_resolver("cryptoList.csv")
+    symbols_set = set(resolver.by_symbol)
+
+    earliest = {}       # (name, coin) -> Step 1.3 key of the entry we're keeping
+    firsts = {}         # symbol -> sorted list of at most MAX_PER_COIN (Step 7 key, (name, coin), output row)
+    overflowed = set()  # symbols that have had entries pushed out of their list
+    rescan = set()      # symbols whose list has to be rebuilt with a second pass (see below)
+
+    for pair, entry_key, symbol, sort_key, row in stream_records(chunksize, resolver, symbols_set):
+        kept_key = earliest.get(pair)
+        if kept_key is not None and kept_key <= entry_key:
+            print(f"Entry for '{row[0]}' selected {row[3]} for a second time on '{row[1]} {row[2]}'. This has been removed as most recent duplicate.")
+            continue
+        earliest[pair] = entry_key
+
+        symbol_firsts = firsts.setdefault(symbol, [])
+        if kept_key is not None:
+            # A later row turned out to be this person's earliest pick of the coin - the one we were keeping is now the duplicate
+            for i, (old_sort_key, old_pair, old_row) in enumerate(symbol_firsts):
+                if old_pair == pair:
+                    del symbol_firsts[i]
+                    print(f"Entry for '{old_row[0]}' selected {old_row[3]} for a second time on '{old_row[1]} {old_row[2]}'. This has been removed as most recent duplicate.")
+                    # If the replacement sorts later than what it replaced, an entry we already pushed out may deserve the gap
+                    # it leaves. We no longer have it, so this symbol gets rebuilt from a second pass at the end. It takes a
+                    # duplicate with a missing/garbled sign-up time to trigger this, so it's rare
+                    if symbol in overflowed and sort_key > old_sort_key:
+                        rescan.add(symbol)
+                    break
+
+        insort(symbol_firsts, (sort_key, pair, row))
+        if len(symbol_firsts) > MAX_PER_COIN:
+            overflowed.add(symbol)
+            _, _, removed = symbol_firsts.pop()
+            print(f"Entry for '{removed[0]}' on '{removed[1]} {removed[2]}' removed due to >5 cap for '{removed[3]}'")
+
+    if rescan:
+        print(f"Re-reading entrants for {len(rescan)} symbol(s) whose first-five changed after a late duplicate")
+        for symbol in rescan:
+            firsts[symbol] = []
+        for pair, entry_key, symbol, sort_key, row in stream_records(chunksize, resolver, symbols_set, verbose=False):
+            if symbol in rescan and earliest[pair] == entry_key:
+                insort(firsts[symbol], (sort_key, pair, row))
+                del firsts[symbol][MAX_PER_COIN:]
+
+    rows = [row for symbol in sorted(firsts) for _, _, row in firsts[symbol]]
+    entrants_df = pd.DataFrame(rows, columns=["attendeeName", "signUpDate", "signUpTime", "cryptoSymbol", "signUpUTC"])
+    print(f"Saving data to '{OUTPUT_FILE}'")
+    with metrics.timer("normalizer_step", step="8 save"):
+        entrants_df.to_csv(OUTPUT_FILE, index=False)
+
+
 if __name__ == "__main__":
-    main()
+    arg_parser = argparse.ArgumentParser(description="Normalise the GDAC crypto game entrants export into attendeeList.csv")
+    arg_parser.add_argument("--stream", action="store_true", help="Process the export in chunks to keep memory flat")
+    arg_parser.add_argument("--chunksize", type=int, default=CHUNK_SIZE, help="Rows per chunk in --stream mode")
+    args = arg_parser.parse_args()
+
+    if args.stream:
+        main_streaming(args.chunksize)
+    else:
+        main()
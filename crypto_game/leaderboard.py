@@ -0,0 +1,229 @@
+from bisect import bisect_left
+from heapq import merge
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from itertools import islice
+from urllib.parse import parse_qs, urlparse
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Lets us share modules that live in the repo root
+import cryptoGame
+import cryptoTable
+import priceProvider
+import scoring
+
+# A live leaderboard for the crypto game, rather than re-running cryptoGame.py and re-scoring everybody each time.
+#
+# The trick is that within one coin, an attendee's gain is just (price now / their start price) - 1, so the order of that
+# coin's attendees never changes however the price moves - cheapest start price is always best. So attendees are kept in
+# per-coin lists sorted by start price once, up front, and then:
+#   - a price tick for a coin just records the new price - nothing needs re-sorting, and no other coin is touched
+#   - top-N is a lazy merge of the per-coin lists (each already best-first), so it only looks at about N + coins entries
+#   - an attendee's rank is 1 + the number of attendees doing strictly better, which is one binary search per coin
+# Both queries stay well under a millisecond for 10k attendees over 100 coins (see benchmarks/leaderboardLoad.py).
+#
+# Run it from the crypto_game folder (after cryptoGame.py has filled the price store) with:
+#   python leaderboard.py --port 8770 --poll 60
+# and poll http://127.0.0.1:8770/leaderboard?n=10 or /rank?name=Some%20Attendee from a widget.
+
+HOST = "127.0.0.1"
+PORT = 8770
+POLL_INTERVAL = 60      # Seconds between price polls from CoinGecko (0 turns polling off, eg. if ticks come from elsewhere)
+DEFAULT_TOP_N = 10
+
+
+def gain(start_price, price):
+    return ((price - start_price) / start_price) * 100
+
+
+class Leaderboard:
+
+    # entrants is a list of (attendeeName, symbol, start price) in attendee list order, prices is {symbol: current price}
+    def __init__(self, entrants, prices):
+        self.lock = threading.Lock()
+        self.prices = dict(prices)
+        self.coins = {}         # symbol -> [(start price, attendee order, name)], cheapest start first
+        self.by_name = {}       # name -> [(symbol, start price)]
+        for order, (name, symbol, start_price) in enumerate(entrants):
+            self.coins.setdefault(symbol, []).append((start_price, order, name))
+            self.by_name.setdefault(name, []).append((symbol, start_price))
+        for entries in self.coins.values():
+            entries.sort()
+        self.size = len(entrants)
+        self.ticks = 0
+        self.updated = time.time()
+
+    def tick(self, symbol, price):
+        if symbol not in self.coins or price is None:
+            return False
+        with self.lock:
+            self.prices[symbol] = price
+            self.ticks += 1
+            self.updated = time.time()
+        return True
+
+    # Best n attendees, best first. Equal gains share a rank; ties are listed in attendee list order
+    def top(self, n=DEFAULT_TOP_N):
+        with self.lock:
+            prices = dict(self.prices)
+
+        def ranked(symbol, entries):
+            price = prices[symbol]
+            for start_price, order, name in entries:
+                g = gain(start_price, price)
+                yield -g, order, name, symbol
+
+        results, rank, previous = [], 0, None
+        for position, (neg_gain, _, name, symbol) in enumerate(
+                islice(merge(*(ranked(s, e) for s, e in self.coins.items())), n), start=1):
+            if neg_gain != previous:
+                rank, previous = position, neg_gain
+            results.append({"rank": rank, "attendeeName": name, "cryptoSymbol": symbol, "gainLoss": -neg_gain,
+                            "gainLossFormatted": scoring.format_gain(-neg_gain)})
+        return results
+
+    # 1 + how many attendees have a strictly bigger gain
+    def rank_of_gain(self, g, prices):
+        better = 0
+        for symbol, entries in self.coins.items():
+            price = prices[symbol]
+            better += bisect_left(entries, -g, key=lambda entry: -gain(entry[0], price))
+        return better + 1
+
+    # Every entry under this attendee name (names aren't guaranteed unique), with its current rank
+    def rank(self, name):
+        with self.lock:
+            prices = dict(self.prices)
+        results = []
+        for symbol, start_price in self.by_name.get(name, []):
+            g = gain(start_price, prices[symbol])
+            results.append({"rank": self.rank_of_gain(g, prices), "attendeeName": name, "cryptoSymbol": symbol,
+                            "gainLoss": g, "gainLossFormatted": scoring.format_gain(g)})
+        return results
+
+
+# Builds the board from the attendee list and the price matrix - start prices on each sign-up date, current prices from
+# end_date. Attendees the batch scorer would skip (no price data) are left out here too
+def from_price_matrix(attendee_df, prices, end_date):
+    symbols = attendee_df['cryptoSymbol'].to_numpy()
+    columns = prices.columns(symbols)
+    rows = prices.rows(scoring.signup_days(attendee_df).to_numpy())
+    end_row = prices.rows(np.array([np.datetime64(end_date, "D")]))[0]
+
+    current = {}
+    if end_row >= 0:
+        current = {s: float(prices.prices[end_row, c]) for s, c in prices.column.items()
+                   if not np.isnan(prices.prices[end_row, c])}
+
+    entrants = []
+    for name, symbol, column, row in zip(attendee_df['attendeeName'], symbols, columns, rows):
+        if column < 0 or row < 0 or symbol not in current:
+            continue
+        start_price = float(prices.prices[row, column])
+        if np.isnan(start_price) or start_price == 0:
+            continue
+        entrants.append((name, symbol, start_price))
+    return Leaderboard(entrants, current)
+
+
+class LeaderboardHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass    # Keep the console quiet
+
+    def send_json(self, status, body):
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.send_header("Access-Control-Allow-Origin", "*")   # So a widget on another site can poll us
+        self.send_header("Cache-Control", "no-cache")
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        board = self.server.board
+        url = urlparse(self.path)
+        query = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        if url.path == "/leaderboard":
+            try:
+                n = max(1, min(int(query.get("n", DEFAULT_TOP_N)), board.size or 1))
+            except ValueError:
+                return self.send_json(400, {"error": "n must be a number"})
+            self.send_json(200, {"updated": board.updated, "entrants": board.size, "top": board.top(n)})
+        elif url.path == "/rank":
+            if "name" not in query:
+                return self.send_json(400, {"error": "name is required"})
+            self.send_json(200, {"updated": board.updated, "entrants": board.size, "results": board.rank(query["name"])})
+        elif url.path == "/prices":
+            self.send_json(200, {"updated": board.updated, "prices": dict(board.prices)})
+        else:
+            self.send_json(404, {"error": "not found"})
+
+
+def start_server(board, host=HOST, port=PORT):
+    server = ThreadingHTTPServer((host, port), LeaderboardHandler)
+    server.daemon_threads = True
+    server.board = board
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+# Polls the price provider (CoinGecko, or a replay) for the coins on the board and feeds each price in as a tick, until stop is set
+def poll_prices(board, symbol_to_id, interval, stop):
+    provider = priceProvider.get_provider(headers=cryptoGame.API_HEADER)
+    ids = {symbol_to_id[s]: s for s in board.coins if s in symbol_to_id}
+    try:
+        while not stop.is_set():
+            price_data = cryptoTable.fetch_todays_prices(list(ids), provider, currencies=[cryptoGame.CURRENCY])
+            if price_data is None:
+                print("❌ Failed to fetch price data.")
+            else:
+                for coin_id, symbol in ids.items():
+                    board.tick(symbol, price_data.get(coin_id, {}).get(cryptoGame.CURRENCY))
+            stop.wait(interval)
+    finally:
+        provider.close()
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Serve a live crypto game leaderboard over HTTP/JSON")
+    arg_parser.add_argument("--host", default=HOST)
+    arg_parser.add_argument("--port", type=int, default=PORT)
+    arg_parser.add_argument("--poll", type=float, default=POLL_INTERVAL, help="Seconds between price polls (0 = off)")
+    args = arg_parser.parse_args()
+
+    attendee_df = pd.read_csv("attendeeList.csv")
+    crypto_df = pd.read_csv("cryptoList.csv")
+    attendee_df['cryptoSymbol'] = attendee_df['cryptoSymbol'].str.lower()
+    crypto_df['symbol'] = crypto_df['symbol'].str.lower()
+    symbol_to_id = crypto_df.set_index('symbol')['id'].to_dict()
+    chosen_ids = {sym: symbol_to_id[sym] for sym in attendee_df['cryptoSymbol'].unique() if sym in symbol_to_id}
+
+    board = from_price_matrix(attendee_df, cryptoGame.load_price_matrix(chosen_ids), cryptoGame.END_DATE)
+    server = start_server(board, args.host, args.port)
+    print(f"Leaderboard for {board.size} attendees across {len(board.coins)} coins on http://{args.host}:{args.port}/leaderboard")
+
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.set())
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.set())
+    try:
+        if args.poll > 0:
+            poll_prices(board, symbol_to_id, args.poll, stop)
+        else:
+            stop.wait()
+    finally:
+        server.shutdown()
+    print("Leaderboard stopped.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+from datetime import date, timedelta
+import json
+import os
+import tempfile
+import numpy as np
+import priceStore
+
+# The crypto game's prices as one flat day-by-symbol float64 array on disk (priceMatrix.npy), plus a small JSON sidecar
+# saying which day row 0 is and which symbol each column is. Row n is START_DATE + n days, so finding an attendee's start
+# price is just (sign-up date - START_DATE).days -> row, symbol -> column, and no date strings get formatted or parsed.
+# The .npy is memory-mapped rather than read in, so loading it costs next to nothing however many days it covers - unlike
+# coinGeckoData.csv, which gains a column every day and has to be parsed in full on every run.
+# Prices we don't have are stored as NaN.
+
+MATRIX_PATH = "priceMatrix.npy"
+
+
+def sidecar_path(path):
+    return os.path.splitext(path)[0] + ".json"
+
+
+class PriceMatrix:
+
+    def __init__(self, prices, start_date, symbols, requested):
+        self.prices = prices                # (days, symbols) array - a read-only memmap when loaded from disk
+        self.start_date = start_date
+        self.symbols = symbols
+        self.requested = requested          # Every symbol asked for when it was built, including any we had no prices for
+        self.column = {symbol: i for i, symbol in enumerate(symbols)}
+
+    @property
+    def end_date(self):
+        return self.start_date + timedelta(days=len(self.prices) - 1)
+
+    # Row numbers for an array of datetime64 days, with -1 for anything outside the matrix (or NaT)
+    def rows(self, days):
+        offsets = (np.asarray(days, dtype="datetime64[D]") - np.datetime64(self.start_date, "D")).astype(np.int64)
+        valid = ~np.isnat(np.asarray(days, dtype="datetime64[D]")) & (offsets >= 0) & (offsets < len(self.prices))
+        return np.where(valid, offsets, -1)
+
+    # Column numbers for a list of symbols, with -1 for any we don't hold
+    def columns(self, symbols):
+        return np.fromiter((self.column.get(s, -1) for s in symbols), dtype=np.int64, count=len(symbols))
+
+    # True if this matrix was built for the same start date, reaches end_date and was asked for every one of the symbols
+    def covers(self, start_date, end_date, symbols):
+        return self.start_date == start_date and self.end_date >= end_date and set(symbols) <= set(self.requested)
+
+
+# Builds the matrix from the local price store for {symbol: coin_id}, covering start_date..end_date inclusive. Coins we hold no
+# prices for at all are left out, same as load_price_frame() does for coinGeckoData.csv
+def build(store, symbol_to_id, start_date, end_date):
+    days = (end_date - start_date).days + 1
+    symbols, columns = [], []
+    for symbol, coin_id in symbol_to_id.items():
+        prices = priceStore.load_prices(store, coin_id, start_date, end_date)
+        if not prices:
+            continue
+        column = np.full(days, np.nan)
+        for d, p in prices.items():
+            if p is not None:
+                column[(d - start_date).days] = p
+        symbols.append(symbol)
+        columns.append(column)
+
+    prices = np.column_stack(columns) if columns else np.empty((days, 0))
+    return PriceMatrix(prices, start_date, symbols, list(symbol_to_id))
+
+
+# write(f) into a uniquely named temp file in the same directory, renamed over path once it's complete (same idea as
+# tableStore.write_atomic, so two runs saving at once can't write into each other's temp file)
+def replace_file(path, mode, write):
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".%s." % os.path.basename(path),
+                                    suffix=".tmp")
+    try:
+        with os.fdopen(fd, mode) as f:
+            write(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# Writes both files via temp files and renames, .npy first - load() checks the shapes agree, so a crash in between just
+# means the next run rebuilds
+def save(matrix, path=MATRIX_PATH):
+    replace_file(path, "wb", lambda f: np.save(f, np.ascontiguousarray(matrix.prices, dtype=np.float64)))
+    meta = {"start_date": matrix.start_date.isoformat(), "days": len(matrix.prices), "symbols": matrix.symbols,
+            "requested": matrix.requested}
+    replace_file(sidecar_path(path), "w", lambda f: json.dump(meta, f))
+
+
+# Memory-maps a saved matrix, or returns None if there isn't one (or the two files don't match up)
+def load(path=MATRIX_PATH):
+    if not os.path.exists(path) or not os.path.exists(sidecar_path(path)):
+        return None
+    try:
+        with open(sidecar_path(path)) as f:
+            meta = json.load(f)
+        prices = np.load(path, mmap_mode="r")
+    except (OSError, ValueError):
+        return None
+    if prices.shape != (meta["days"], len(meta["symbols"])):
+        return None
+    return PriceMatrix(prices, date.fromisoformat(meta["start_date"]), meta["symbols"], meta.get("requested", meta["symbols"]))
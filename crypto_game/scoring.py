@@ -0,0 +1,120 @@
+from zoneinfo import ZoneInfo
+from dateutil import parser
+import numpy as np
+import pandas as pd
+
+# Batch scoring for decide_winner(). The original loop went through attendeeList.csv row by row, parsing each signUpDate with
+# dateutil and doing two price_df.loc lookups per attendee - fine for a conference hall, not so fine for a ticketing export or
+# a few hundred what-if runs. Here everything happens in bulk:
+#   - sign-up days come straight from attendeeList.csv's signUpUTC column (or, for older lists, all sign-up dates are parsed
+#     in one go, with dateutil only as a fallback, once per odd-looking distinct string)
+#   - start and end prices come from a single indexed gather out of a date-by-symbol price matrix (either built from a
+#     price_df, or straight out of the memory-mapped priceMatrix.npy, where a date's row is just its day offset)
+#   - gains/losses are one NumPy expression, and ranking is a single argsort
+# The output matches the old loop exactly, including which attendees get skipped and the order ties come out in.
+
+LOCAL_TZ = ZoneInfo("Europe/London")   # Sign-up dates and times in the entrants export are local (Guernsey) time
+UTC_FORMAT = "%Y-%m-%dT%H:%M:%SZ"       # attendeeList.csv's signUpUTC column
+
+
+# Sign-up days for an attendee list (a DatetimeIndex of local calendar days). entrantDataNormalizer.py writes each sign-up
+# moment to signUpUTC, so that's used as it is - one fixed-format conversion, no guessing. Lists written before it did fall
+# back to parsing signUpDate
+def signup_days(attendee_df):
+    if 'signUpUTC' not in attendee_df:
+        return parse_signup_dates(attendee_df['signUpDate'])
+    moments = pd.to_datetime(attendee_df['signUpUTC'], format=UTC_FORMAT, utc=True, errors="coerce")
+    return pd.DatetimeIndex(moments).tz_convert(LOCAL_TZ).tz_localize(None).normalize()
+
+
+def parse_signup_dates(date_strings):
+    parsed = pd.to_datetime(date_strings, format="%d-%b-%Y", errors="coerce")
+    odd = parsed.isna()
+    if odd.any():
+        lookup = {s: parser.parse(s) for s in date_strings[odd].unique()}
+        parsed = parsed.where(~odd, pd.to_datetime(date_strings[odd].map(lookup)))
+    return pd.DatetimeIndex(parsed).normalize()
+
+
+# Turns the symbol-by-date price table (one "dd-MMM-yyyy" column per day) into a date-by-symbol float matrix plus the two
+# indexes needed to find things in it
+def price_matrix(price_df):
+    dates = pd.to_datetime(pd.Index(price_df.columns).astype(str), format="%d-%b-%Y", errors="coerce")
+    keep = ~dates.isna()
+    matrix = price_df.loc[:, keep].to_numpy(dtype=float).T
+    return matrix, pd.DatetimeIndex(dates[keep]), pd.Index(price_df.index)
+
+
+# Row order for a descending sort, done exactly the way pandas' sort_values(ascending=False) did it for the old results table
+# (reverse, argsort, reverse back, NaNs last). Note that it's the same quicksort pandas uses by default rather than a stable
+# sort: for more than a handful of rows the two can put tied attendees in a different order, and we want
+# cryptoGameResults.csv to come out identical to before - who actually wins a tie is the tiebreaker's job anyway
+def rank_descending(values):
+    is_nan = np.isnan(values)
+    idx = np.flatnonzero(~is_nan)
+    order = idx[::-1][np.argsort(values[idx][::-1], kind="quicksort")][::-1]
+    return np.concatenate([order, np.flatnonzero(is_nan)])
+
+
+def format_gain(percent_change):
+    return f"{'+' if percent_change >= 0 else '-'}{abs(percent_change):.2f}%"
+
+
+# attendee_df needs attendeeName, signUpDate and cryptoSymbol (already lower-cased). price_df is indexed by symbol with one
+# column per day. Returns the results table, best first, ready for cryptoGameResults.csv
+def score_attendees(attendee_df, price_df, end_date):
+    matrix, date_index, symbol_index = price_matrix(price_df)
+    symbols = attendee_df['cryptoSymbol'].to_numpy()
+    sign_up_dates = signup_days(attendee_df)
+
+    symbol_pos = symbol_index.get_indexer(symbols)
+    start_row = date_index.get_indexer(sign_up_dates)
+    end_row = date_index.get_indexer(pd.DatetimeIndex([pd.Timestamp(end_date)]))[0]
+    return score_rows(attendee_df, matrix, symbol_pos, start_row, end_row)
+
+
+# Same again, but against a priceMatrix.PriceMatrix - rows are day offsets from its start date, so there's nothing to look up
+def score_price_matrix(attendee_df, stored, end_date):
+    symbols = attendee_df['cryptoSymbol'].to_numpy()
+    sign_up_dates = signup_days(attendee_df)
+
+    symbol_pos = stored.columns(symbols)
+    start_row = stored.rows(sign_up_dates.to_numpy())
+    end_row = stored.rows(np.array([np.datetime64(end_date, "D")]))[0]
+    return score_rows(attendee_df, stored.prices, symbol_pos, start_row, end_row)
+
+
+# The shared part: matrix is (days, symbols), and symbol_pos/start_row/end_row say where each attendee's prices are (-1 if
+# they aren't there at all)
+def score_rows(attendee_df, matrix, symbol_pos, start_row, end_row):
+    names = attendee_df['attendeeName'].to_numpy()
+    symbols = attendee_df['cryptoSymbol'].to_numpy()
+
+    missing = (symbol_pos < 0) | (start_row < 0) | (end_row < 0)
+    found = ~missing
+    start_prices = np.full(len(names), np.nan)
+    end_prices = np.full(len(names), np.nan)
+    start_prices[found] = matrix[start_row[found], symbol_pos[found]]
+    end_prices[found] = matrix[end_row, symbol_pos[found]]
+
+    incomplete = found & (np.isnan(start_prices) | np.isnan(end_prices))
+    for i in np.flatnonzero(missing | incomplete):
+        if missing[i]:
+            print(f"Missing price data for {names[i]} - {symbols[i]} on required dates. Skipping...")
+        else:
+            print(f"Incomplete price data for {names[i]} - {symbols[i]}. Skipping...")
+
+    scored = np.flatnonzero(found & ~incomplete)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gains = ((end_prices[scored] - start_prices[scored]) / start_prices[scored]) * 100
+
+    order = rank_descending(gains)
+    ranked = scored[order]
+    gains = gains[order]
+
+    return pd.DataFrame({
+        "attendeeName": names[ranked],
+        "cryptoSymbol": symbols[ranked],
+        "gainLoss": gains,
+        "gainLossFormatted": [format_gain(g) for g in gains.tolist()]
+    }, index=attendee_df.index[ranked])     # Keeps each attendee's attendee_df row label, so the tiebreaker can look them up
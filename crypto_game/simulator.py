@@ -0,0 +1,286 @@
+from concurrent.futures import ProcessPoolExecutor
+from datetime import date, datetime
+from itertools import product
+from multiprocessing import shared_memory
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))  # Lets us share modules that live in the repo root
+import coinResolver
+import entrantDataNormalizer as normalizer
+import priceMatrix
+import scoring
+
+# What-if runs for the crypto game: "who would have won with a different end date / a cap of three per coin / keeping people's
+# latest pick rather than their first / only counting entries made before the deadline?" Rather than editing constants and
+# re-running the normaliser and the game (API calls and all) for each question, the simulator:
+#   - loads the entrants export once, through the normaliser's own row-by-row steps (coin resolution, date parsing) but stopping
+#     short of the dedupe and the cap, since those are what scenarios change
+#   - loads the price matrix once (priceMatrix.npy - no API calls at all)
+#   - puts both in shared memory, and hands scenarios out to a process pool that attaches to it rather than copying it
+#   - scores each scenario with a handful of array operations: the dedupe and cap orders are sorted once up front, so per
+#     scenario the dedupe is a running count within each (name, coin) and the cap a running count within each coin
+# Each result has the winner, how many are tied with them, and the top of the ranking. Ties are reported, not broken - the
+# tiebreaker needs intraday prices from the API, which is exactly what this is meant to avoid.
+#
+# Usage: python simulator.py --end-dates 2025-09-01,2025-10-01 --caps 3,5,10 --dedupe earliest,latest \
+#            --cutoffs "none,2025-07-20 23:59" [--processes 8] [--output simulationResults.csv]
+
+DEDUPE_RULES = ["earliest", "latest", "none"]   # Keep each person's first pick of a coin (as the normaliser does), last, or all
+OUTPUT_FILE = "simulationResults.csv"
+TOP = 10
+NO_KEY = np.iinfo(np.int64).max     # Sort key for dates/times we couldn't parse - same as the normaliser, they go last
+
+
+class Scenario:
+    def __init__(self, end_date, cap=normalizer.MAX_PER_COIN, cutoff=None, dedupe="earliest"):
+        if dedupe not in DEDUPE_RULES:
+            raise ValueError(f"Unknown dedupe rule '{dedupe}' - expected one of {', '.join(DEDUPE_RULES)}")
+        self.end_date = end_date    # date
+        self.cap = cap              # Max entrants per coin, or None for no cap
+        self.cutoff = cutoff        # datetime - entries made after it don't count - or None
+        self.dedupe = dedupe
+
+    def as_dict(self):
+        return {"end_date": self.end_date.isoformat(), "cap": self.cap,
+                "cutoff": self.cutoff.isoformat(sep=" ", timespec="minutes") if self.cutoff else None, "dedupe": self.dedupe}
+
+
+# Every combination of the given options
+def grid(end_dates, caps=(normalizer.MAX_PER_COIN,), cutoffs=(None,), dedupes=("earliest",)):
+    return [Scenario(end_date, cap, cutoff, dedupe) for end_date, cap, cutoff, dedupe in product(end_dates, caps, cutoffs, dedupes)]
+
+
+def datetime_keys(series):
+    return np.where(series.isna(), NO_KEY, series.to_numpy(dtype="datetime64[ns]").astype(np.int64))
+
+
+# Steps 0-3 of the normaliser (see entrantDataNormalizer.main), keeping every row that names a coin we know. Returns one row per
+# entry: attendeeName, cryptoSymbol, the Step 1.3 entry date-time, the Step 7 sign-up date-time, and the sign-up day
+def load_entrants(entrants_file=normalizer.ENTRANTS_FILE, crypto_list="cryptoList.csv"):
+    with open(entrants_file, "r", encoding="utf-8") as f:
+        entrants_df = normalizer.clean_entrants(pd.read_csv(f, dtype=object))
+    resolver = coinResolver.load_resolver(crypto_list)
+    normalizer.resolve_coins(entrants_df, resolver, {}, verbose=False)
+
+    parsed = normalizer.parse_datetimes(entrants_df, normalizer.DateCache())
+    entrants_df["Coin"] = entrants_df["Coin"].astype(str).str.lower()
+    entrants_df["signUpUTC"] = parsed["signUpUTC"]
+    entry, signup = parsed["entry"], parsed["signup"]
+
+    known = entrants_df["Coin"].isin(set(resolver.by_symbol)).to_numpy()
+    return pd.DataFrame({
+        "attendeeName": entrants_df["Name"].to_numpy()[known],
+        "cryptoSymbol": entrants_df["Coin"].to_numpy()[known],
+        "entry": entry.where(entry != pd.Timestamp.max).to_numpy()[known],
+        "signup": signup.where(signup != pd.Timestamp.max).to_numpy()[known],
+        "signupDay": scoring.signup_days(entrants_df).to_numpy()[known]
+    })
+
+
+# ----------------------------------------------------------------------
+# Worker side. The arrays live in shared memory; each worker attaches once, when the pool starts it
+# ----------------------------------------------------------------------
+
+_arrays = {}
+_attached = []      # Keeps the SharedMemory handles alive for as long as the worker is
+
+
+def attach(specs, start_date):
+    _arrays.clear()
+    for name, (shm_name, shape, dtype) in specs.items():
+        shm = shared_memory.SharedMemory(name=shm_name)
+        _attached.append(shm)
+        _arrays[name] = np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+    _arrays["start_date"] = start_date
+
+
+# Within each group of a sorted order (group_start marks the first of each), how many of the masked rows come at or before
+# each row, and how many masked rows the group has altogether
+def running_counts(masked, group_start):
+    counts = np.cumsum(masked)
+    before = (counts - masked)[group_start]
+    group = np.cumsum(group_start) - 1
+    totals = np.append(before[1:], counts[-1]) - before
+    return counts - before[group], totals[group]
+
+
+def evaluate(scenario, top=TOP):
+    a = _arrays
+    n = len(a["price_col"])
+    end_row = (scenario.end_date - a["start_date"]).days
+    if n == 0 or not 0 <= end_row < len(a["prices"]):
+        return {"error": f"no prices for {scenario.end_date}"}
+
+    mask = a["signup_row"] <= end_row                   # Nobody who signed up after the end date
+    if scenario.cutoff is not None:
+        mask &= a["entry"] <= pd.Timestamp(scenario.cutoff).value
+
+    if scenario.dedupe != "none":
+        order = a["dedupe_order"]
+        masked = mask[order]
+        rank, total = running_counts(masked, a["pair_start"])
+        keep = masked & (rank == (1 if scenario.dedupe == "earliest" else total))
+        mask = np.zeros(n, dtype=bool)
+        mask[order] = keep
+
+    if scenario.cap is not None:
+        order = a["cap_order"]
+        masked = mask[order]
+        rank, _ = running_counts(masked, a["coin_start"])
+        keep = masked & (rank <= scenario.cap)
+        mask = np.zeros(n, dtype=bool)
+        mask[order] = keep
+
+    rows = np.flatnonzero(mask & (a["price_col"] >= 0) & (a["signup_row"] >= 0))
+    start_prices = a["prices"][a["signup_row"][rows], a["price_col"][rows]]
+    end_prices = a["prices"][end_row, a["price_col"][rows]]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        gains = (end_prices - start_prices) / start_prices * 100
+    scored = ~np.isnan(gains)
+    rows, gains = rows[scored], gains[scored]
+
+    order = scoring.rank_descending(gains)
+    ranking = rows[order[:top]] if top else rows[order]
+    result = {"entrants": int(mask.sum()), "scored": len(rows), "ranking": ranking, "gains": gains[order[:len(ranking)]]}
+    if len(rows):
+        result["tied"] = int((gains == gains[order[0]]).sum())
+    return result
+
+
+def evaluate_batch(scenarios, top):
+    return [evaluate(scenario, top) for scenario in scenarios]
+
+
+# ----------------------------------------------------------------------
+# Driver side
+# ----------------------------------------------------------------------
+
+class Simulator:
+    # entrants is what load_entrants() returns; prices a priceMatrix.PriceMatrix
+    def __init__(self, entrants, prices):
+        self.names = entrants["attendeeName"].to_numpy()
+        self.symbols = entrants["cryptoSymbol"].to_numpy()
+        self.start_date = prices.start_date
+
+        entry = datetime_keys(entrants["entry"])
+        signup = datetime_keys(entrants["signup"])
+        signup_day = entrants["signupDay"].to_numpy(dtype="datetime64[D]")
+        signup_row = np.where(np.isnat(signup_day), -1,
+                              (signup_day - np.datetime64(prices.start_date, "D")).astype(np.int64))
+        name_codes = pd.factorize(entrants["attendeeName"].astype(str).str.strip().str.lower(), sort=True)[0]
+        coin_codes = pd.factorize(self.symbols, sort=True)[0]
+        position = np.arange(len(entrants))
+
+        # The normaliser's Step 1.3 order (name, coin, entry time, row) and Step 7 order (coin, sign-up time, then Step 1.3's)
+        dedupe_order = np.lexsort((position, entry, coin_codes, name_codes))
+        cap_order = np.lexsort((position, entry, name_codes, signup, coin_codes))
+
+        arrays = {
+            "prices": np.ascontiguousarray(prices.prices, dtype=np.float64),
+            "price_col": prices.columns(self.symbols),
+            "signup_row": signup_row,
+            "entry": entry,
+            "dedupe_order": dedupe_order,
+            "pair_start": group_starts(name_codes[dedupe_order], coin_codes[dedupe_order]),
+            "cap_order": cap_order,
+            "coin_start": group_starts(coin_codes[cap_order])
+        }
+        self.arrays = arrays    # Kept for running in this process, so it never has to attach to its own shared memory
+        self.shared = []
+        self.specs = {}
+        for name, array in arrays.items():
+            shm = shared_memory.SharedMemory(create=True, size=max(1, array.nbytes))
+            np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+            self.shared.append(shm)
+            self.specs[name] = (shm.name, array.shape, array.dtype.str)
+
+    @classmethod
+    def from_files(cls, entrants_file=normalizer.ENTRANTS_FILE, crypto_list="cryptoList.csv", matrix_path=priceMatrix.MATRIX_PATH):
+        prices = priceMatrix.load(matrix_path)
+        if prices is None:
+            raise FileNotFoundError(f"No usable {matrix_path} - run cryptoGame.py first to build it")
+        return cls(load_entrants(entrants_file, crypto_list), prices)
+
+    # Scores every scenario, in parallel across 'processes' workers (1 runs them here, None means one per CPU). Returns one
+    # result per scenario, in order: the scenario, entrants kept, entrants scored, winner, gain, tied and the top-'top' ranking
+    def run(self, scenarios, processes=None, top=TOP):
+        processes = processes or os.cpu_count() or 1
+        if processes == 1 or len(scenarios) < 2:
+            _arrays.clear()
+            _arrays.update(self.arrays, start_date=self.start_date)
+            raw = evaluate_batch(scenarios, top)
+        else:
+            batches = [scenarios[i::processes * 4] for i in range(processes * 4)]     # Interleaved, so slow ones spread out
+            with ProcessPoolExecutor(max_workers=processes, initializer=attach,
+                                     initargs=(self.specs, self.start_date)) as executor:
+                results = list(executor.map(evaluate_batch, batches, [top] * len(batches)))
+            raw = [None] * len(scenarios)
+            for i, batch in enumerate(results):
+                raw[i::processes * 4] = batch
+        return [self.describe(scenario, result) for scenario, result in zip(scenarios, raw)]
+
+    def describe(self, scenario, result):
+        described = {**scenario.as_dict(), "entrants": result.get("entrants", 0), "scored": result.get("scored", 0)}
+        if "error" in result:
+            described["error"] = result["error"]
+        if result.get("scored"):
+            described.update(winner=self.names[result["ranking"][0]], cryptoSymbol=self.symbols[result["ranking"][0]],
+                             gainLoss=float(result["gains"][0]), tied=result["tied"])
+        described["ranking"] = [(self.names[i], self.symbols[i], round(float(g), 4))
+                                for i, g in zip(result.get("ranking", []), result.get("gains", []))]
+        return described
+
+    def close(self):
+        for shm in self.shared:
+            shm.close()
+            shm.unlink()
+        self.shared = []
+
+
+# True where a new group starts in already-sorted key columns
+def group_starts(*keys):
+    starts = np.ones(len(keys[0]), dtype=bool)
+    if len(starts):
+        starts[1:] = np.logical_or.reduce([key[1:] != key[:-1] for key in keys])
+    return starts
+
+
+def parse_cutoff(value):
+    return None if value.strip().lower() == "none" else datetime.fromisoformat(value.strip())
+
+
+def parse_cap(value):
+    return None if value.strip().lower() == "none" else int(value)
+
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Score a grid of what-if scenarios for the crypto game")
+    arg_parser.add_argument("--end-dates", default=date.today().isoformat(), help="Comma-separated yyyy-mm-dd")
+    arg_parser.add_argument("--caps", default=str(normalizer.MAX_PER_COIN), help="Comma-separated entrants per coin ('none' = no cap)")
+    arg_parser.add_argument("--cutoffs", default="none", help="Comma-separated 'yyyy-mm-dd HH:MM' entry deadlines ('none' = no deadline)")
+    arg_parser.add_argument("--dedupe", default="earliest", help=f"Comma-separated, from {', '.join(DEDUPE_RULES)}")
+    arg_parser.add_argument("--processes", type=int, help="Worker processes (default: one per CPU)")
+    arg_parser.add_argument("--entrants", default=normalizer.ENTRANTS_FILE, help="The raw entrants export")
+    arg_parser.add_argument("--output", default=OUTPUT_FILE)
+    args = arg_parser.parse_args()
+
+    scenarios = grid([date.fromisoformat(d) for d in args.end_dates.split(",")], [parse_cap(c) for c in args.caps.split(",")],
+                     [parse_cutoff(c) for c in args.cutoffs.split(",")], args.dedupe.split(","))
+    simulator = Simulator.from_files(args.entrants)
+    try:
+        started = time.perf_counter()
+        results = simulator.run(scenarios, args.processes)
+        elapsed = time.perf_counter() - started
+    finally:
+        simulator.close()
+
+    results_df = pd.DataFrame(results).drop(columns=["ranking"])
+    results_df.to_csv(args.output, index=False)
+    print(results_df.head(20).to_string(index=False))
+    print(f"\n{len(scenarios)} scenarios over {len(simulator.names)} entries in {elapsed:.2f}s "
+          f"({len(scenarios) / elapsed * 60:,.0f}/min) - written to {args.output}")
@@ -0,0 +1,122 @@
+from bisect import bisect_left
+from datetime import datetime, time, timedelta, timezone
+import numpy as np
+import pandas as pd
+import fetchEngine
+import priceProvider
+import priceStore
+import scoring
+
+# Settles a tie at the top automatically. Daily prices can't split two people who picked the same coin on the same day, but
+# the time they signed up can: whoever picked it while it was cheaper (ie. whose gain from that moment is bigger) wins.
+#   - tied entrants are grouped by (coin, sign-up day), and each group costs one market_chart/range request for that day
+#   - the intraday series is kept in the price store, so running it again (or another tie on the same day) costs nothing
+#   - each entrant's sign-up time is binary-searched in the sorted series to find the nearest price
+#   - everyone is ranked on their gain from that price to the same end price the main scoring used; if that's still level,
+#     the earlier sign-up wins. Anyone without a usable signUpTime goes after everyone who has one
+# Sign-up times are local (Guernsey) time - entrantDataNormalizer.py converts them from Europe/London to UTC (signUpUTC).
+
+LOCAL_TZ = scoring.LOCAL_TZ
+NO_TIME = time(23, 59)      # Entrants without a usable signUpTime are placed at the very end of the day (and ranked last)
+CURRENCY = "usd"
+
+
+# Unix seconds for the start and end of a local calendar day
+def day_window(day):
+    start = datetime.combine(day, time(0), tzinfo=LOCAL_TZ)
+    end = datetime.combine(day + timedelta(days=1), time(0), tzinfo=LOCAL_TZ)
+    return int(start.timestamp()), int(end.timestamp())
+
+
+# Each entrant's sign-up moment in UTC, plus whether each one had a real time. The normaliser has already worked the moments
+# out into signUpUTC; older attendee lists without it get them from the signUpDate ("dd-MMM-yyyy") and signUpTime ("HH:mm")
+# columns
+def signup_moments(tied_df):
+    time_text = tied_df.get('signUpTime', pd.Series("", index=tied_df.index)).astype(str).str.strip()
+    if 'signUpUTC' in tied_df:
+        moments = pd.to_datetime(tied_df['signUpUTC'], format=scoring.UTC_FORMAT, utc=True, errors="coerce")
+        return [m.to_pydatetime() for m in moments], list(time_text.str.fullmatch(r"\d{2}:\d{2}"))
+
+    days = scoring.parse_signup_dates(tied_df['signUpDate'])
+    times = pd.to_datetime(time_text, format="%H:%M", errors="coerce")
+    moments = []
+    for day, t in zip(days, times):
+        local_time = NO_TIME if pd.isna(t) else t.time()
+        moments.append(datetime.combine(day.date(), local_time, tzinfo=LOCAL_TZ).astimezone(timezone.utc))
+    return moments, list(times.notna())
+
+
+# Nearest point to target_ms in a sorted series - returns (ms, price), or (None, None) if the series is empty. If the target
+# sits exactly halfway between two points, the earlier one is used
+def nearest_price(times_ms, prices, target_ms):
+    if not times_ms:
+        return None, None
+    i = bisect_left(times_ms, target_ms)
+    if i == len(times_ms) or (i > 0 and target_ms - times_ms[i - 1] <= times_ms[i] - target_ms):
+        i -= 1
+    return times_ms[i], prices[i]
+
+
+# One range request per (coin_id, day) we don't already hold. Returns how many requests were made
+def fetch_windows(store, windows, headers=None):
+    todo = [(coin_id, day) for coin_id, day in windows if not priceStore.has_intraday(store, coin_id, *day_window(day))]
+    if not todo:
+        return 0
+
+    jobs = []
+    for coin_id, day in todo:
+        from_ts, to_ts = day_window(day)
+        jobs.append((priceProvider.MARKET_CHART_RANGE.format(coin_id), {"vs_currency": CURRENCY, "from": from_ts, "to": to_ts}))
+    results = priceProvider.fetch_many(jobs, headers=headers or fetchEngine.API_HEADER)
+
+    for (coin_id, day), data in zip(todo, results):
+        if data is None or not data.get("prices"):
+            print(f"Failed to fetch intraday data for {coin_id} on {day}.")
+            continue
+        priceStore.save_intraday(store, coin_id, *day_window(day), data["prices"])
+    return len(todo)
+
+
+# tied_df needs attendeeName, cryptoSymbol, signUpDate and (ideally) signUpTime. end_prices is {symbol: price} - the same end
+# prices the main scoring used. Returns everyone ranked, winner first
+def resolve(tied_df, symbol_to_id, end_prices, store, headers=None):
+    moments, time_known = signup_moments(tied_df)
+    coin_ids = [symbol_to_id.get(symbol) for symbol in tied_df['cryptoSymbol']]
+    local_days = [m.astimezone(LOCAL_TZ).date() for m in moments]
+
+    windows = sorted({(coin_id, day) for coin_id, day in zip(coin_ids, local_days) if coin_id})
+    requests_made = fetch_windows(store, windows, headers)
+    print(f"Tiebreaker: {len(tied_df)} tied entrants across {len(windows)} coin/day groups "
+          f"({requests_made} fetched, {len(windows) - requests_made} already stored)")
+
+    series = {}
+    for coin_id, day in windows:
+        series[(coin_id, day)] = priceStore.load_intraday(store, coin_id, *day_window(day))
+
+    rows = []
+    for (_, entrant), moment, known, coin_id, day in zip(tied_df.iterrows(), moments, time_known, coin_ids, local_days):
+        times_ms, prices = series.get((coin_id, day), ([], []))
+        price_ms, entry_price = nearest_price(times_ms, prices, int(moment.timestamp() * 1000))
+        end_price = end_prices.get(entrant['cryptoSymbol'])
+        gain = np.nan
+        if entry_price and end_price is not None:
+            gain = ((end_price - entry_price) / entry_price) * 100
+        rows.append({
+            "attendeeName": entrant['attendeeName'],
+            "cryptoSymbol": entrant['cryptoSymbol'],
+            "signUpDate": entrant['signUpDate'],
+            "signUpTime": entrant.get('signUpTime', ""),
+            "signUpUTC": moment.isoformat(),
+            "priceTimestampUTC": None if price_ms is None else datetime.fromtimestamp(price_ms / 1000, tz=timezone.utc).isoformat(),
+            "entryPrice": entry_price,
+            "endPrice": end_price,
+            "gainLoss": gain,
+            "gainLossFormatted": "n/a" if np.isnan(gain) else scoring.format_gain(gain),
+            "signUpTimeKnown": known
+        })
+
+    # Without a sign-up time we can't say where in the day someone picked their coin, so they can't win on it
+    ranked = pd.DataFrame(rows).sort_values(["signUpTimeKnown", "gainLoss", "signUpUTC"], ascending=[False, False, True],
+                                            na_position="last", kind="mergesort")
+    ranked.insert(0, "rank", range(1, len(ranked) + 1))
+    return ranked.reset_index(drop=True)
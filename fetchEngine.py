@@ -0,0 +1,195 @@
+from concurrent.futures import ThreadPoolExecutor
+from email.utils import parsedate_to_datetime
+import asyncio
+import json
+import os
+import time
+import requests
+from requests.adapters import HTTPAdapter
+import metrics
+import responseCache
+
+# Shared fetch layer for every script that talks to CoinGecko. Rather than each script sleeping for a fixed 12s between calls
+# (and then waiting a hard-coded minute+ when it gets a 429 anyway), requests go through a single token bucket sized to the
+# API plan's rate limit. Everything that fits inside the limit is sent straight away over a pooled HTTP session, so a run
+# takes as long as the rate limit says it must, and no longer.
+#
+# Config is via environment variables so the same code works for the free tier, a paid key, or a local stub server:
+#   COINGECKO_API_BASE          - defaults to the public v3 API
+#   COINGECKO_RATE_PER_MINUTE   - defaults to 5, which is about what the free tier will tolerate
+#   COINGECKO_BURST             - how many requests may go out back-to-back before the rate kicks in (default 1)
+# Responses are also kept in an on-disk cache (see responseCache.py), so anything we've already got doesn't cost a request.
+# Time spent waiting on the bucket, on the wire, backing off after 429s and parsing JSON is all reported to metrics.py.
+
+API_BASE = os.environ.get("COINGECKO_API_BASE", "https://api.coingecko.com/api/v3").rstrip("/")
+API_HEADER = {"User-Agent": "Mozilla/5.0 (CryptoTableDataFetcher/1.0)"}
+RATE_PER_MINUTE = float(os.environ.get("COINGECKO_RATE_PER_MINUTE", 5))
+BURST = int(os.environ.get("COINGECKO_BURST", 1))
+MAX_RETRIES = 5
+BACKOFF_SECONDS = 15    # Used when a 429 comes back without a Retry-After header - doubles on each further attempt
+POOL_SIZE = 10          # Max requests in flight (and connections kept alive) at any one time
+
+
+# A token bucket, implemented as a "next free slot" clock (GCRA) because it needs no background refill. Reservations are made
+# synchronously, so any number of tasks sharing one event loop can never double-book the same slot.
+class TokenBucket:
+    def __init__(self, rate_per_minute, burst=1, clock=time.monotonic):
+        self.interval = 60.0 / rate_per_minute
+        self.burst = max(1, burst)
+        self.clock = clock
+        self.next_slot = clock()
+        self.paused_until = 0.0
+        self.pauses = 0         # Bumped by every pause(), so a waiter can tell its reservation was made before one
+
+    # Book the next slot and return how many seconds the caller must wait before it may send its request
+    def reserve(self):
+        now = self.clock()
+        self.next_slot = max(self.next_slot, now)
+        wait = max(0.0, self.next_slot - now - (self.burst - 1) * self.interval)
+        self.next_slot += self.interval
+        return max(wait, self.paused_until - now)
+
+    # The server has told us to back off - nobody gets a slot until the pause is over, and any slot booked before now is void
+    def pause(self, seconds):
+        until = self.clock() + seconds
+        self.paused_until = max(self.paused_until, until)
+        self.next_slot = self.paused_until
+        self.pauses += 1
+
+    async def acquire(self):
+        started = None
+        while True:
+            pauses = self.pauses
+            wait = self.reserve()
+            if wait <= 0:
+                break
+            started = started or time.perf_counter()
+            await asyncio.sleep(wait)
+            # A 429 elsewhere while we slept voids our slot - book a fresh one after the pause, in turn with everyone else
+            # who was waiting, rather than all sending the moment it ends
+            if self.pauses == pauses:
+                break
+        if started is not None:
+            metrics.add_time("rate_limit_wait", time.perf_counter() - started)
+
+
+# Retry-After can be either a number of seconds or an HTTP date
+def retry_after_seconds(response):
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class FetchEngine:
+    def __init__(self, rate_per_minute=RATE_PER_MINUTE, burst=BURST, headers=API_HEADER, max_retries=MAX_RETRIES,
+                 pool_size=POOL_SIZE, clock=time.monotonic, cache=True):
+        self.bucket = TokenBucket(rate_per_minute, burst, clock)
+        self.max_retries = max_retries
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update(headers)
+        # requests is blocking, so calls run on our own small thread pool - this also caps how many are in flight at once,
+        # and unlike an asyncio.Semaphore it isn't tied to one event loop, so the engine can be reused between runs
+        self.executor = ThreadPoolExecutor(max_workers=pool_size)
+        self.stats = {"requests": 0, "rate_limited": 0, "errors": 0}
+        # cache=True uses the shared on-disk cache, False/None turns it off, or pass in a responseCache.ResponseCache
+        self.own_cache = cache is True
+        self.cache = responseCache.open_default() if cache is True else (cache or None)
+
+    def _get(self, url, params, headers=None):
+        return self.session.get(url, params=params, headers=headers, timeout=30)
+
+    async def get_json(self, url, params=None):
+        conditional = None
+        if self.cache is not None:
+            body, conditional = self.cache.lookup(url, params)
+            if body is not None:
+                metrics.count("response_cache", result="hit")
+                with metrics.timer("json_parse", source="cache"):
+                    return json.loads(body)
+
+        loop = asyncio.get_running_loop()
+        for attempt in range(self.max_retries):
+            await self.bucket.acquire()
+            self.stats["requests"] += 1
+            started = time.perf_counter()
+            try:
+                response = await loop.run_in_executor(self.executor, self._get, url, params, conditional)
+            except requests.RequestException as e:
+                self.stats["errors"] += 1
+                metrics.count("http_responses", status="error")
+                print(f"❌ Request to {url} failed: {e}")
+                return None
+            metrics.add_time("http_request", time.perf_counter() - started)
+            metrics.count("http_responses", status=response.status_code)
+
+            if response.status_code == 200:
+                with metrics.timer("json_parse", source="http"):
+                    data = response.json()
+                if self.cache is not None:
+                    self.cache.store(url, params, response.content, response.headers.get("ETag"),
+                                     response.headers.get("Last-Modified"))
+                return data
+            elif response.status_code == 304 and conditional:
+                body = self.cache.revalidated(url, params)
+                if body is not None:
+                    with metrics.timer("json_parse", source="cache"):
+                        return json.loads(body)
+                conditional = None      # Evicted in the meantime - ask again for the full thing
+            elif response.status_code == 429:
+                self.stats["rate_limited"] += 1
+                delay = retry_after_seconds(response)
+                if delay is None:
+                    delay = BACKOFF_SECONDS * 2 ** attempt
+                metrics.add_time("rate_limit_backoff", delay)
+                print(f"⚠️ Rate limited on {url}. Backing off {delay:.0f}s...")
+                self.bucket.pause(delay)
+            else:
+                self.stats["errors"] += 1
+                print(f"❌ Error {response.status_code} from {url}: {response.text[:200]}")
+                return None
+
+        self.stats["errors"] += 1
+        print(f"❌ Giving up on {url} after {self.max_retries} rate-limited attempts")
+        return None
+
+    # jobs is a list of (url, params) - results come back in the same order, with None for anything that failed
+    async def get_many(self, jobs):
+        return await asyncio.gather(*(self.get_json(url, params) for url, params in jobs))
+
+    # Closing the engine marks the end of a run, so this is where the cache says how it got on
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.session.close()
+        if self.cache is not None:
+            if self.cache.stats["hits"] or self.cache.stats["misses"] or self.cache.stats["revalidated"]:
+                print(self.cache.report())
+            if self.own_cache:
+                self.cache.close()
+
+
+# Synchronous helpers for the scripts. Pass an existing engine to keep its session (and rate-limit state) between calls,
+# otherwise a fresh one is built from the keyword arguments and thrown away afterwards.
+def fetch_many(jobs, engine=None, **engine_kwargs):
+    own_engine = engine is None
+    if own_engine:
+        engine = FetchEngine(**engine_kwargs)
+    try:
+        return asyncio.run(engine.get_many(jobs))
+    finally:
+        if own_engine:
+            engine.close()
+
+
+def fetch_json(url, params=None, engine=None, **engine_kwargs):
+    return fetch_many([(url, params)], engine, **engine_kwargs)[0]
@@ -0,0 +1,207 @@
+from array import array
+import json
+import math
+import os
+import struct
+import tempfile
+import metrics
+
+# Price history for the table. tableData.json only ever holds today's price, so every refresh used to throw the previous one
+# away, and a chart would have needed a market_chart call per coin. Now each refresh is also appended to two fixed-size ring
+# buffers per coin, kept in one small binary file (tableHistory.bin):
+#   - hourly: the latest price in each hour, for the last HOURLY_POINTS hours
+#   - daily: the latest price in each day (UTC), for the last DAILY_POINTS days - a downsampled copy of the hourly ring, so
+#     points that age out of it are still represented, just at one per day
+# Prices are float32 (plenty for a chart) and unknown slots are NaN, so the file size is fixed by the number of coins and the
+# retention, however long the updater runs. History is keyed by CoinGecko id, so competitions sharing a coin share its history.
+# Standard library only (array + struct), so it doesn't cost cryptoTable.py's fast start anything.
+#
+# From the rings, sparkline_payload() precomputes what the widget needs to draw a trend line per coin with no API calls: min,
+# max, and the known prices downsampled to SPARKLINE_POINTS and scaled 0-100 between min and max.
+#
+# Config via environment variables, in the same way as fetchEngine.py (changing the retention keeps the newest points):
+#   HISTORY_PATH            - defaults to tableHistory.bin in the working directory
+#   HISTORY_HOURLY_POINTS   - defaults to 168 (a week)
+#   HISTORY_DAILY_POINTS    - defaults to 365
+
+HISTORY_PATH = os.environ.get("HISTORY_PATH", "tableHistory.bin")
+HOURLY_POINTS = int(os.environ.get("HISTORY_HOURLY_POINTS", 168))
+DAILY_POINTS = int(os.environ.get("HISTORY_DAILY_POINTS", 365))
+SPARKLINE_POINTS = 24
+SPARKLINE_SUFFIX = ".sparklines.json"
+MAGIC = b"GDHIST01"
+HEADER = struct.Struct("<8sIII")    # magic, hourly points, daily points, length of the JSON index that follows
+NAN = float("nan")
+
+
+# One ring of fixed-width slots per coin, all sharing the same slot times (every coin is written on the same refresh).
+# 'head' is the next slot to write, so once the ring is full the oldest slot is the one at head.
+class Ring:
+    def __init__(self, points, step, coins=0):
+        self.points = points
+        self.step = step                                # Seconds per slot (3600 or 86400)
+        self.times = array("q", [0] * points)           # Bucket start (unix seconds) of each slot, 0 if never written
+        self.values = array("f", [NAN] * (points * coins))
+        self.head = 0
+
+    def latest_bucket(self):
+        return self.times[(self.head - 1) % self.points]
+
+    # Opens the slot for ts's bucket (or reuses it if that bucket is the latest already) and returns its index
+    def slot_for(self, ts, coins):
+        bucket = int(ts // self.step * self.step)
+        if self.latest_bucket() == bucket:
+            return (self.head - 1) % self.points
+        slot = self.head
+        self.times[slot] = bucket
+        for coin in range(coins):
+            self.values[coin * self.points + slot] = NAN
+        self.head = (self.head + 1) % self.points
+        return slot
+
+    # Slot indexes oldest to newest, skipping any never written
+    def order(self):
+        return [slot for slot in (((self.head + i) % self.points) for i in range(self.points)) if self.times[slot]]
+
+    def series(self, coin):
+        base = coin * self.points
+        return [(self.times[slot], self.values[base + slot]) for slot in self.order()]
+
+    # Same history, different number of slots - keeps the newest points that fit
+    def resized(self, points, coins):
+        ring = Ring(points, self.step, coins)
+        kept = self.order()[-points:]
+        for new_slot, slot in enumerate(kept):
+            ring.times[new_slot] = self.times[slot]
+            for coin in range(coins):
+                ring.values[coin * points + new_slot] = self.values[coin * self.points + slot]
+        ring.head = len(kept) % points
+        return ring
+
+
+class PriceHistory:
+    def __init__(self, hourly_points=HOURLY_POINTS, daily_points=DAILY_POINTS):
+        self.coin_ids = []
+        self.column = {}
+        self.hourly = Ring(hourly_points, 3600)
+        self.daily = Ring(daily_points, 86400)
+
+    def add_coin(self, coin_id):
+        self.column[coin_id] = len(self.coin_ids)
+        self.coin_ids.append(coin_id)
+        for ring in (self.hourly, self.daily):
+            ring.values.extend(array("f", [NAN] * ring.points))
+
+    # Records one refresh - {coin_id: price} at unix time ts. A second refresh within the same hour (or day) replaces that
+    # bucket's price, so each slot ends up holding the last price seen in it
+    def record(self, ts, prices):
+        for coin_id in prices:
+            if coin_id not in self.column:
+                self.add_coin(coin_id)
+        for ring in (self.hourly, self.daily):
+            slot = ring.slot_for(ts, len(self.coin_ids))
+            for coin_id, price in prices.items():
+                if price is not None:
+                    ring.values[self.column[coin_id] * ring.points + slot] = price
+
+    def series(self, coin_id, ring):
+        if coin_id not in self.column:
+            return []
+        return [(ts, price) for ts, price in ring.series(self.column[coin_id]) if not math.isnan(price)]
+
+
+# Reads the history file, or starts a new one if there isn't one (or it isn't one of ours)
+def load(path=HISTORY_PATH, hourly_points=HOURLY_POINTS, daily_points=DAILY_POINTS):
+    history = PriceHistory(hourly_points, daily_points)
+    if not os.path.exists(path):
+        return history
+    with open(path, "rb") as f:
+        data = f.read()
+    try:
+        magic, stored_hourly, stored_daily, index_length = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("not a history file")
+        offset = HEADER.size
+        index = json.loads(data[offset:offset + index_length])
+        offset += index_length
+        coins = len(index["coin_ids"])
+
+        rings = []
+        for points, step, head in ((stored_hourly, 3600, index["hourly_head"]), (stored_daily, 86400, index["daily_head"])):
+            ring = Ring(points, step)
+            ring.times = array("q", data[offset:offset + points * 8])
+            offset += points * 8
+            ring.values = array("f", data[offset:offset + points * coins * 4])
+            offset += points * coins * 4
+            if len(ring.times) != points or len(ring.values) != points * coins:
+                raise ValueError("file is truncated")
+            ring.head = head
+            rings.append(ring)
+    except (struct.error, ValueError, KeyError) as e:
+        print(f"⚠️ Couldn't read {path} ({e}) - starting a new price history")
+        return history
+
+    history.coin_ids = index["coin_ids"]
+    history.column = {coin_id: i for i, coin_id in enumerate(history.coin_ids)}
+    history.hourly = rings[0] if rings[0].points == hourly_points else rings[0].resized(hourly_points, coins)
+    history.daily = rings[1] if rings[1].points == daily_points else rings[1].resized(daily_points, coins)
+    return history
+
+
+@metrics.timed("history_save")
+def save(history, path=HISTORY_PATH):
+    index = json.dumps({"coin_ids": history.coin_ids, "hourly_head": history.hourly.head,
+                        "daily_head": history.daily.head}).encode("utf-8")
+    # A uniquely named temp file in the same directory, renamed over the old one - as tableStore.write_atomic does
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=".%s." % os.path.basename(path),
+                                    suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, history.hourly.points, history.daily.points, len(index)))
+            f.write(index)
+            for ring in (history.hourly, history.daily):
+                ring.times.tofile(f)
+                ring.values.tofile(f)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+# Averages consecutive points into at most 'points' buckets (time order kept)
+def downsample(values, points):
+    if len(values) <= points:
+        return values
+    size = len(values) / points
+    return [sum(chunk) / len(chunk) for chunk in (values[int(i * size):int((i + 1) * size)] for i in range(points))]
+
+
+def sparkline(series, points=SPARKLINE_POINTS):
+    if not series:
+        return None
+    values = downsample([price for _, price in series], points)
+    low, high = min(price for _, price in series), max(price for _, price in series)
+    spread = high - low
+    return {
+        "from": series[0][0],
+        "to": series[-1][0],
+        "min": float(f"{low:.6g}"),
+        "max": float(f"{high:.6g}"),
+        "points": [round((v - low) / spread * 100) if spread else 50 for v in values]
+    }
+
+
+# {"symbols": [...], "hourly": [line per symbol], "daily": [line per symbol]} for one table's coins ({symbol: coin_id}), in
+# the table's own order so the widget can zip it with the static payload. A coin with no history yet gets null
+def sparkline_payload(history, symbol_to_id, points=SPARKLINE_POINTS):
+    symbols = list(symbol_to_id)
+    return {
+        "symbols": symbols,
+        "hourly": [sparkline(history.series(symbol_to_id[s], history.hourly), points) for s in symbols],
+        "daily": [sparkline(history.series(symbol_to_id[s], history.daily), points) for s in symbols]
+    }
+
+
+def sparkline_path(table_path):
+    return os.path.splitext(table_path)[0] + SPARKLINE_SUFFIX
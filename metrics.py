@@ -0,0 +1,180 @@
+from contextlib import contextmanager
+from functools import wraps
+import atexit
+import json
+import os
+import sys
+import tempfile
+import threading
+import time
+
+# Lightweight timers and counters, so we can see where a run's time actually goes (imports, HTTP latency, 429 back-off,
+# JSON/CSV parsing, file writes...) rather than guessing from the emoji status lines. Standard library only, so it costs
+# cryptoTable.py's fast start nothing, and when neither output below is switched on it just adds up a few numbers in memory.
+#
+# Config is via environment variables, in the same way as fetchEngine.py:
+#   METRICS_LOG     - write one JSON line per finished timer (and a summary at exit) here; "-" means stderr. Off by default
+#   METRICS_PROM    - write every timer and counter to this file, in Prometheus text format, at exit (and on every flush(),
+#                     eg. after each daemon refresh). Point node_exporter's textfile collector at it to graph production runs
+#   METRICS_PREFIX  - prepended to every metric name (default "gdac_")
+#
+# Usage:
+#   with metrics.timer("fetch_todays_prices"): ...             # gdac_fetch_todays_prices_seconds_sum / _count
+#   @metrics.timed("api_call")                                  # the same, around every call to a function
+#   metrics.count("http_responses", status=429)                 # gdac_http_responses_total{status="429"}
+#   metrics.add_time("rate_limit_wait", waited)                 # for time measured somewhere else (eg. an asyncio.sleep)
+#   steps = metrics.Steps("normalizer_step"); steps.start("dedupe"); ...; steps.start("format dates"); ...; steps.stop()
+
+LOG_PATH = os.environ.get("METRICS_LOG", "")
+PROM_PATH = os.environ.get("METRICS_PROM", "")
+PREFIX = os.environ.get("METRICS_PREFIX", "gdac_")
+
+
+def label_key(labels):
+    return tuple(sorted((name, str(value)) for name, value in labels.items()))
+
+
+def display_name(name, labels):
+    return name + ("{" + ",".join(f"{k}={v}" for k, v in labels) + "}" if labels else "")
+
+
+class Registry:
+    def __init__(self, log_path=LOG_PATH, prom_path=PROM_PATH, prefix=PREFIX):
+        self.log_path = log_path
+        self.prom_path = prom_path
+        self.prefix = prefix
+        self.lock = threading.Lock()    # The fetch engine's worker threads report in too
+        self.timers = {}                # (name, labels) -> [count, total seconds, max seconds]
+        self.counters = {}              # (name, labels) -> value
+        self.log_file = None
+
+    def add_time(self, name, seconds, **labels):
+        key = (name, label_key(labels))
+        with self.lock:
+            timer = self.timers.setdefault(key, [0, 0.0, 0.0])
+            timer[0] += 1
+            timer[1] += seconds
+            timer[2] = max(timer[2], seconds)
+        self.log("timer", name, labels, seconds=round(seconds, 6))
+
+    def count(self, name, value=1, **labels):
+        key = (name, label_key(labels))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    @contextmanager
+    def timer(self, name, **labels):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - started, **labels)
+
+    # Decorator form of timer(), for timing every call to a function
+    def timed(self, name, **labels):
+        def decorate(fn):
+            @wraps(fn)
+            def wrapper(*args, **kwargs):
+                with self.timer(name, **labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    # Structured log line - nothing is written unless METRICS_LOG is set
+    def log(self, event, name, labels, **fields):
+        if not self.log_path:
+            return
+        record = {"ts": round(time.time(), 3), "event": event, "name": name, **labels, **fields}
+        line = json.dumps(record, default=str) + "\n"
+        with self.lock:
+            if self.log_file is None:
+                self.log_file = sys.stderr if self.log_path == "-" else open(self.log_path, "a", encoding="utf-8")
+            self.log_file.write(line)
+            self.log_file.flush()
+
+    def prometheus_text(self):
+        def labelled(name, labels, extra=()):
+            pairs = list(labels) + list(extra)
+            if not pairs:
+                return name
+            escaped = (v.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n") for _, v in pairs)
+            return name + "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+        with self.lock:
+            timers = sorted(self.timers.items())
+            counters = sorted(self.counters.items())
+
+        lines = []
+        typed = set()
+        for (name, labels), (count, total, longest) in timers:
+            metric = f"{self.prefix}{name}_seconds"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} summary")
+            lines.append(f"{labelled(metric + '_count', labels)} {count}")
+            lines.append(f"{labelled(metric + '_sum', labels)} {total:.6f}")
+            lines.append(f"{labelled(metric, labels, [('quantile', '1')])} {longest:.6f}")
+        for (name, labels), value in counters:
+            metric = f"{self.prefix}{name}_total"
+            if metric not in typed:
+                typed.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{labelled(metric, labels)} {value:g}")
+        return "\n".join(lines) + "\n"
+
+    # Written to a temp file and renamed over the target, so a scrape never sees half a file
+    def write_prometheus(self, path):
+        directory = os.path.dirname(os.path.abspath(path))
+        fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".%s." % os.path.basename(path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w") as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def flush(self):
+        if self.prom_path:
+            self.write_prometheus(self.prom_path)
+
+    def close(self):
+        self.flush()
+        if self.log_path:
+            with self.lock:
+                timers = {display_name(name, labels): round(total, 6) for (name, labels), (_, total, _) in self.timers.items()}
+                counters = {display_name(name, labels): value for (name, labels), value in self.counters.items()}
+            self.log("summary", "run", {}, timers=timers, counters=counters)
+            if self.log_file not in (None, sys.stderr):
+                self.log_file.close()
+            self.log_file = None
+
+
+# Times a run of consecutive steps without wrapping each one in a with-block: starting a step stops the one before it
+class Steps:
+    def __init__(self, name, registry=None):
+        self.name = name
+        self.registry = registry
+        self.current = None
+        self.started = None
+
+    def start(self, step):
+        self.stop()
+        self.current, self.started = step, time.perf_counter()
+
+    def stop(self):
+        if self.current is not None:
+            (self.registry or REGISTRY).add_time(self.name, time.perf_counter() - self.started, step=self.current)
+            self.current = None
+
+
+# One registry per process, written out when the process exits
+REGISTRY = Registry()
+atexit.register(REGISTRY.close)
+
+add_time = REGISTRY.add_time
+count = REGISTRY.count
+timer = REGISTRY.timer
+timed = REGISTRY.timed
+flush = REGISTRY.flush
@@ -0,0 +1,141 @@
+import asyncio
+import hashlib
+import json
+import os
+import time
+import fetchEngine
+import responseCache
+
+# Where prices come from. Scripts ask a provider for an API path ("/simple/price", "/coins/bitcoin/market_chart/range"...)
+# rather than building CoinGecko URLs themselves, so the same code can run against:
+#   - CoinGeckoProvider: the real API (or the stub, via COINGECKO_API_BASE), through the shared rate-limited fetch engine.
+#     Set PRICE_RECORD_DIR and every response is also saved there, ready to be replayed
+#   - ReplayProvider: recorded responses served from local files - no network at all, and the same answers every time, so
+#     fetch and scoring runs can be benchmarked and regression-tested offline (eg. in CI). Each response can be delayed by
+#     a fixed latency and/or its recorded time scaled by a speed factor, to mimic a real run
+# Responses come back exactly as CoinGecko sends them (parsed JSON), or None if there's nothing to give.
+#
+# Which one get_provider() hands out is set by environment variables, in the same way as fetchEngine.py:
+#   PRICE_PROVIDER          - "coingecko" (default) or "replay"
+#   PRICE_REPLAY_DIR        - recordings to replay, and where PRICE_RECORD_DIR recordings usually go (default "replay")
+#   PRICE_REPLAY_SPEED      - replay at this multiple of the recorded pace (eg. 1 = real time, 10 = ten times faster);
+#                             leave unset to ignore recorded timings altogether
+#   PRICE_REPLAY_LATENCY    - extra seconds added to every replayed response (default 0)
+#   PRICE_RECORD_DIR        - if set, CoinGeckoProvider saves every response it gets here
+
+SIMPLE_PRICE = "/simple/price"
+MARKET_CHART = "/coins/{}/market_chart"
+MARKET_CHART_RANGE = "/coins/{}/market_chart/range"
+HISTORY = "/coins/{}/history"
+COIN = "/coins/{}"
+
+PROVIDER = os.environ.get("PRICE_PROVIDER", "coingecko").lower()
+REPLAY_DIR = os.environ.get("PRICE_REPLAY_DIR", "replay")
+REPLAY_SPEED = float(os.environ["PRICE_REPLAY_SPEED"]) if os.environ.get("PRICE_REPLAY_SPEED") else None
+REPLAY_LATENCY = float(os.environ.get("PRICE_REPLAY_LATENCY", 0))
+RECORD_DIR = os.environ.get("PRICE_RECORD_DIR", "")
+
+
+# One file per distinct request (path + sorted params), so a recording is found again whatever order the params are in
+def recording_path(directory, path, params):
+    key = responseCache.cache_key(path, params)
+    return os.path.join(directory, hashlib.sha1(key.encode()).hexdigest()[:20] + ".json")
+
+
+class PriceProvider:
+    name = "base"
+
+    async def get_json(self, path, params=None):
+        raise NotImplementedError
+
+    # jobs is a list of (path, params) - results come back in the same order, with None for anything that failed
+    async def get_many(self, jobs):
+        return await asyncio.gather(*(self.get_json(path, params) for path, params in jobs))
+
+    def close(self):
+        pass
+
+
+class CoinGeckoProvider(PriceProvider):
+    name = "coingecko"
+
+    def __init__(self, api_base=fetchEngine.API_BASE, engine=None, record_dir=RECORD_DIR, **engine_kwargs):
+        self.api_base = api_base.rstrip("/")
+        self.own_engine = engine is None
+        self.engine = engine or fetchEngine.FetchEngine(**engine_kwargs)
+        self.record_dir = record_dir
+        if record_dir:
+            os.makedirs(record_dir, exist_ok=True)
+
+    def url(self, path):
+        return self.api_base + path
+
+    async def get_json(self, path, params=None):
+        started = time.perf_counter()
+        data = await self.engine.get_json(self.url(path), params)
+        if data is not None and self.record_dir:
+            recording = {"path": path, "params": params, "elapsed": round(time.perf_counter() - started, 4), "response": data}
+            with open(recording_path(self.record_dir, path, params), "w") as f:
+                json.dump(recording, f)
+        return data
+
+    def close(self):
+        if self.own_engine:
+            self.engine.close()
+
+
+class ReplayProvider(PriceProvider):
+    name = "replay"
+
+    def __init__(self, directory=REPLAY_DIR, speed=REPLAY_SPEED, latency=REPLAY_LATENCY):
+        self.directory = directory
+        self.speed = speed
+        self.latency = latency
+        self.stats = {"replayed": 0, "missing": 0}
+
+    async def get_json(self, path, params=None):
+        try:
+            with open(recording_path(self.directory, path, params)) as f:
+                recording = json.load(f)
+        except FileNotFoundError:
+            self.stats["missing"] += 1
+            print(f"❌ No recording of {responseCache.cache_key(path, params)} in {self.directory}")
+            return None
+
+        delay = self.latency
+        if self.speed:
+            delay += recording.get("elapsed", 0.0) / self.speed
+        if delay > 0:
+            await asyncio.sleep(delay)
+        self.stats["replayed"] += 1
+        return recording["response"]
+
+    def close(self):
+        if self.stats["missing"]:
+            print(f"⚠️ Replay: {self.stats['replayed']} responses replayed, {self.stats['missing']} had no recording")
+
+
+# The provider the environment asks for. engine_kwargs (eg. headers) only matter for CoinGecko
+def get_provider(**engine_kwargs):
+    if PROVIDER == "replay":
+        return ReplayProvider()
+    if PROVIDER != "coingecko":
+        raise ValueError(f"Unknown PRICE_PROVIDER '{PROVIDER}' - expected 'coingecko' or 'replay'")
+    return CoinGeckoProvider(**engine_kwargs)
+
+
+# Synchronous helpers for the scripts, same idea as fetchEngine's: pass a provider to keep it (and its HTTP session and
+# rate-limit state) between calls, otherwise one is made from the environment and closed again afterwards
+def fetch_many(jobs, provider=None, **engine_kwargs):
+    own_provider = provider is None
+    if own_provider:
+        provider = get_provider(**engine_kwargs)
+    try:
+        return asyncio.run(provider.get_many(jobs))
+    finally:
+        if own_provider:
+            provider.close()
+
+
+def fetch_json(path, params=None, provider=None, **engine_kwargs):
+    return fetch_many([(path, params)], provider, **engine_kwargs)[0]
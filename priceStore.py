@@ -0,0 +1,121 @@
+from datetime import date, timedelta
+import sqlite3
+
+# A small local price store, keyed by (coin_id, date), so we only ever ask CoinGecko for the days we haven't already seen.
+# Previously cryptoGame.py re-downloaded everything from START_DATE to today for every coin on every run, which got slower
+# (and ate more of the free API's rate limit) with every passing day. SQLite ships with Python, so no extra installs needed.
+# Intraday series fetched for the tiebreaker live here too, along with a note of which windows we've fetched in full.
+#
+# What's been fetched is tracked separately from what's been stored (fetched_ranges), since the two aren't the same: a coin
+# listed after the start date has no prices for its first days however many times we ask, and a window can have holes in it.
+# A range fetched on a given day holds final figures for every day before that - the day itself was only a snapshot, so it
+# counts as covered for the rest of that day (a second run the same day makes no calls), and is asked for again after that.
+
+DB_PATH = "priceHistory.db"
+
+
+def open_store(path=DB_PATH):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS daily_prices ("
+        "coin_id TEXT NOT NULL, "
+        "date TEXT NOT NULL, "      # ISO format (yyyy-mm-dd) so that string ordering == date ordering
+        "price REAL, "
+        "PRIMARY KEY (coin_id, date))"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS intraday_prices ("
+        "coin_id TEXT NOT NULL, "
+        "ts INTEGER NOT NULL, "     # Unix time in milliseconds, as CoinGecko gives it
+        "price REAL, "
+        "PRIMARY KEY (coin_id, ts))"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS intraday_windows ("
+        "coin_id TEXT NOT NULL, "
+        "from_ts INTEGER NOT NULL, "    # Unix seconds, same as the market_chart/range request
+        "to_ts INTEGER NOT NULL, "
+        "PRIMARY KEY (coin_id, from_ts, to_ts))"
+    )
+    conn.execute(
+        "CREATE TABLE IF NOT EXISTS fetched_ranges ("
+        "coin_id TEXT NOT NULL, "
+        "fetched_from TEXT NOT NULL, "  # ISO dates, inclusive
+        "fetched_to TEXT NOT NULL, "
+        "fetched_on TEXT NOT NULL, "    # The day the request was made
+        "PRIMARY KEY (coin_id, fetched_from, fetched_to, fetched_on))"
+    )
+    conn.commit()
+    return conn
+
+
+# Notes that the days from_date..to_date (inclusive) have been asked for, whatever came back
+def record_fetched(conn, coin_id, from_date, to_date, fetched_on=None):
+    fetched_on = fetched_on or date.today()
+    conn.execute(
+        "INSERT OR REPLACE INTO fetched_ranges (coin_id, fetched_from, fetched_to, fetched_on) VALUES (?, ?, ?, ?)",
+        (coin_id, from_date.isoformat(), to_date.isoformat(), fetched_on.isoformat())
+    )
+    conn.commit()
+
+
+# Works out the earliest date we still need from the API for this coin, or None if what we've fetched already covers the
+# window - ie. the first day from start_date that no fetched range covers (see the note at the top about the fetch day itself)
+def missing_since(conn, coin_id, start_date, end_date, today=None):
+    today = today or date.today()
+    rows = conn.execute(
+        "SELECT fetched_from, fetched_to, fetched_on FROM fetched_ranges WHERE coin_id = ? ORDER BY fetched_from", (coin_id,)
+    ).fetchall()
+
+    needed = start_date
+    for fetched_from, fetched_to, fetched_on in rows:
+        first, last, fetched_on = date.fromisoformat(fetched_from), date.fromisoformat(fetched_to), date.fromisoformat(fetched_on)
+        if fetched_on < today:
+            last = min(last, fetched_on - timedelta(days=1))
+        if first > needed:
+            break
+        needed = max(needed, last + timedelta(days=1))
+    return needed if needed <= end_date else None
+
+
+def save_prices(conn, coin_id, prices):
+    conn.executemany(
+        "INSERT OR REPLACE INTO daily_prices (coin_id, date, price) VALUES (?, ?, ?)",
+        [(coin_id, d.isoformat(), p) for d, p in prices.items()]
+    )
+    conn.commit()
+
+
+# Returns {date: price} for a coin between two dates (inclusive)
+def load_prices(conn, coin_id, start_date, end_date):
+    rows = conn.execute(
+        "SELECT date, price FROM daily_prices WHERE coin_id = ? AND date BETWEEN ? AND ?",
+        (coin_id, start_date.isoformat(), end_date.isoformat())
+    ).fetchall()
+    return {date.fromisoformat(d): p for d, p in rows}
+
+
+# True if we've already fetched (and stored) this exact window for the coin
+def has_intraday(conn, coin_id, from_ts, to_ts):
+    return conn.execute(
+        "SELECT 1 FROM intraday_windows WHERE coin_id = ? AND from_ts = ? AND to_ts = ?", (coin_id, from_ts, to_ts)
+    ).fetchone() is not None
+
+
+# points is CoinGecko's [[ms, price], ...] for the window from_ts..to_ts
+def save_intraday(conn, coin_id, from_ts, to_ts, points):
+    conn.executemany(
+        "INSERT OR REPLACE INTO intraday_prices (coin_id, ts, price) VALUES (?, ?, ?)",
+        [(coin_id, int(ts), price) for ts, price in points]
+    )
+    conn.execute("INSERT OR REPLACE INTO intraday_windows (coin_id, from_ts, to_ts) VALUES (?, ?, ?)", (coin_id, from_ts, to_ts))
+    conn.commit()
+
+
+# Returns ([ms, ...], [price, ...]) sorted by time, for everything we hold between two Unix times (in seconds, inclusive)
+def load_intraday(conn, coin_id, from_ts, to_ts):
+    rows = conn.execute(
+        "SELECT ts, price FROM intraday_prices WHERE coin_id = ? AND ts BETWEEN ? AND ? ORDER BY ts",
+        (coin_id, from_ts * 1000, to_ts * 1000)
+    ).fetchall()
+    return [ts for ts, _ in rows], [price for _, price in rows]
@@ -0,0 +1,138 @@
+from datetime import datetime, timezone
+import math
+import os
+import statistics
+import metrics
+import tableStore
+
+# A sanity check on each batch of prices before any of it reaches tableData.json. A coin CoinGecko left out used to be
+# skipped with a print, leaving yesterday's price on the public table with nothing to say so, and a bad tick went straight
+# through. Now every coin in the batch gets one of:
+#   - ok
+#   - missing: not in the response (or no USD price) - its old price stays in the table, marked "missing"
+#   - invalid: a price that can't be right (zero, negative, not a number) - held back and marked, like a missing one
+#   - stale: CoinGecko's own last_updated_at for the coin is more than STALE_AFTER seconds old - written, but marked "stale"
+#   - spike: the move since the coin's last recorded price is more than SIGMA standard deviations of its recent hourly log
+#     returns (scaled by the hours since that price, and never less than MIN_MOVE, or stablecoins would trip on every
+#     wobble) - held back and marked "held". If the next run finds it still at the new level, the move is taken as real:
+#     it's "confirmed", written, and becomes part of the history the next baseline is worked out from
+# The statistics come from the last WINDOW points of the hourly ring in historyStore.py, which the updater already has in
+# memory, so the whole pass is a few hundred float operations per coin - nothing next to the fetch.
+#
+# Each run writes a report (validationReport.json): counts per status, every coin that isn't ok and why, and the coins being
+# held back - which the next run reads back to confirm or clear them.
+#
+# Config via environment variables, in the same way as fetchEngine.py:
+#   VALIDATION_REPORT       - defaults to validationReport.json in the working directory
+#   VALIDATION_SIGMA        - defaults to 6
+#   VALIDATION_WINDOW       - hourly points to work the statistics out from, defaults to 48
+#   VALIDATION_MIN_POINTS   - fewer known points than this and a coin has no spike check, defaults to 12
+#   VALIDATION_MIN_MOVE     - smallest move (as a log return) that can count as a spike, defaults to 0.05 (about 5%)
+#   VALIDATION_STALE_AFTER  - seconds, defaults to 7200
+
+REPORT_PATH = os.environ.get("VALIDATION_REPORT", "validationReport.json")
+SIGMA = float(os.environ.get("VALIDATION_SIGMA", 6))
+WINDOW = int(os.environ.get("VALIDATION_WINDOW", 48))
+MIN_POINTS = int(os.environ.get("VALIDATION_MIN_POINTS", 12))
+MIN_MOVE = float(os.environ.get("VALIDATION_MIN_MOVE", 0.05))
+STALE_AFTER = float(os.environ.get("VALIDATION_STALE_AFTER", 7200))
+
+OK, MISSING, INVALID, STALE, SPIKE, CONFIRMED = "ok", "missing", "invalid", "stale", "spike", "confirmed"
+HELD_BACK = {MISSING, INVALID, SPIKE}                       # No price from these goes into the table or the history
+TABLE_STATUS = {MISSING: "missing", INVALID: "held", SPIKE: "held", STALE: "stale"}    # What the widget is told
+
+
+# Last recorded price, its time, and the standard deviation of hourly log returns (per sqrt(hour), so gaps in the ring
+# don't inflate it) from the recent points. None if the coin has too little history to judge by
+def baseline(history, coin_id, slots):
+    column = history.column.get(coin_id)
+    if column is None:
+        return None
+    ring = history.hourly
+    base = column * ring.points
+    points = [(ring.times[slot], ring.values[base + slot]) for slot in slots]
+    points = [(ts, price) for ts, price in points if price > 0]     # NaN (never written) compares False too
+    if len(points) < MIN_POINTS:
+        return None
+    returns = [math.log(price / prev_price) / math.sqrt(max(ts - prev_ts, 3600) / 3600)
+               for (prev_ts, prev_price), (ts, price) in zip(points, points[1:])]
+    return points[-1][1], points[-1][0], statistics.pstdev(returns)
+
+
+def load_held(path=REPORT_PATH):
+    if not os.path.exists(path):
+        return {}
+    try:
+        return tableStore.load_table(path).get("held", {})
+    except (ValueError, OSError):
+        return {}
+
+
+# Checks price_data ({coin_id: {currency: price, "last_updated_at": ts}}) for every coin we asked for. history is a
+# historyStore.PriceHistory (or None - then there's no spike check), held is the previous report's "held". Returns the
+# prices that passed (held-back coins removed) and the report
+@metrics.timed("validate_prices")
+def validate(price_data, coin_ids, history, now, held=None, currency="usd"):
+    held = held or {}
+    slots = history.hourly.order()[-WINDOW:] if history is not None else []
+    accepted, coins, now_held = {}, {}, {}
+    counts = dict.fromkeys([OK, MISSING, INVALID, STALE, SPIKE, CONFIRMED], 0)
+
+    for coin_id in coin_ids:
+        fields = price_data.get(coin_id)
+        price = (fields or {}).get(currency)
+        detail = {}
+        if price is None:
+            status = MISSING
+        elif not isinstance(price, (int, float)) or not math.isfinite(price) or price <= 0:
+            status, detail = INVALID, {"price": price}
+        else:
+            status = OK
+            stats = baseline(history, coin_id, slots) if history is not None else None
+            if stats is not None:
+                last_price, last_ts, sigma = stats
+                allowed = max(SIGMA * sigma * math.sqrt(max(now - last_ts, 3600) / 3600), MIN_MOVE)
+                move = math.log(price / last_price)
+                if abs(move) > allowed:
+                    detail = {"price": price, "previous": last_price, "move": round(move, 4), "allowed": round(allowed, 4)}
+                    previous = held.get(coin_id)
+                    # Still where it was last run (within the same allowance) - it's a real move, not a bad tick
+                    if previous and abs(math.log(price / previous["price"])) <= allowed:
+                        status, detail["held_since"] = CONFIRMED, previous["since"]
+                    else:
+                        status = SPIKE
+                        now_held[coin_id] = {"price": price, "since": previous["since"] if previous else int(now)}
+            updated_at = fields.get("last_updated_at")
+            if status in (OK, CONFIRMED) and updated_at is not None and now - updated_at > STALE_AFTER:
+                status, detail = STALE, {"price": price, "last_updated_at": updated_at, "age": int(now - updated_at)}
+
+        counts[status] += 1
+        if status != OK:
+            coins[coin_id] = {"status": status, **detail}
+        if status not in HELD_BACK:
+            accepted[coin_id] = fields
+
+    metrics.count("price_checks", counts[OK], status=OK)
+    for status, count in counts.items():
+        if status != OK and count:
+            metrics.count("price_checks", count, status=status)
+            print(f"⚠️ {count} coin(s) {status}: {', '.join(c for c, d in coins.items() if d['status'] == status)}")
+
+    report = {
+        "generated": datetime.fromtimestamp(now, tz=timezone.utc).isoformat(timespec="seconds"),
+        "checked": len(coin_ids),
+        "sigma": SIGMA,
+        "counts": counts,
+        "coins": coins,
+        "held": now_held
+    }
+    return accepted, report
+
+
+# The status the table should show for a coin (None when there's nothing to say)
+def table_status(report, coin_id):
+    return TABLE_STATUS.get(report["coins"].get(coin_id, {}).get("status"))
+
+
+def write_report(report, path=REPORT_PATH):
+    tableStore.write_atomic(path, report)
@@ -0,0 +1,187 @@
+from datetime import datetime, timezone
+from urllib.parse import urlencode, urlparse
+import os
+import re
+import sqlite3
+import threading
+import time
+
+# On-disk cache of CoinGecko responses, used by fetchEngine.py so that a re-run after a crash (or a manual workflow_dispatch)
+# doesn't have to pay for the whole rate-limit budget again. Each response is kept for as long as its endpoint says it can be:
+#   - /history for a day that's already over, and /market_chart/range for a window that's already closed, never change
+#   - /simple/price is "today's price", so only lives for a minute
+#   - everything else gets a short TTL (see ttl_for() below)
+# Once an entry goes stale it isn't thrown away straight away - if the server gave us an ETag / Last-Modified we send it
+# back (If-None-Match / If-Modified-Since), and a 304 just extends the entry rather than costing a full download.
+# The file is capped at MAX_BYTES of response bodies, evicting least-recently-used entries first.
+#
+# Config via environment variables, in the same way as fetchEngine.py:
+#   COINGECKO_CACHE_PATH        - defaults to .responseCache.db in the working directory; set it to "" to turn caching off
+#   COINGECKO_CACHE_MAX_MB      - defaults to 50
+
+CACHE_PATH = os.environ.get("COINGECKO_CACHE_PATH", ".responseCache.db")
+MAX_BYTES = int(float(os.environ.get("COINGECKO_CACHE_MAX_MB", 50)) * 1024 * 1024)
+IMMUTABLE = None                # TTL for responses that will never change
+SIMPLE_PRICE_TTL = 60
+MARKET_CHART_TTL = 10 * 60      # Rolling "last n days" charts - the latest point moves, the rest doesn't
+COIN_INFO_TTL = 24 * 60 * 60    # /coins/{id} metadata (names, image URLs...)
+DEFAULT_TTL = 5 * 60
+SETTLED_SECONDS = 60 * 60       # A range that ended at least this long ago is treated as final
+
+
+# Seconds a response may be served without asking the server again, or IMMUTABLE
+def ttl_for(url, params, now=None):
+    now = time.time() if now is None else now
+    path = urlparse(url).path.rstrip("/")
+    params = params or {}
+
+    if path.endswith("/simple/price"):
+        return SIMPLE_PRICE_TTL
+    if path.endswith("/market_chart/range"):
+        try:
+            closed = float(params["to"]) <= now - SETTLED_SECONDS
+        except (KeyError, TypeError, ValueError):
+            closed = False
+        return IMMUTABLE if closed else DEFAULT_TTL
+    if path.endswith("/market_chart"):
+        return MARKET_CHART_TTL
+    if path.endswith("/history"):
+        # date is dd-mm-yyyy - anything before today (UTC) is a finished day
+        try:
+            day = datetime.strptime(str(params["date"]), "%d-%m-%Y").date()
+            finished = day < datetime.fromtimestamp(now, tz=timezone.utc).date()
+        except (KeyError, ValueError):
+            finished = False
+        return IMMUTABLE if finished else DEFAULT_TTL
+    if re.search(r"/coins/[^/]+$", path):
+        return COIN_INFO_TTL
+    return DEFAULT_TTL
+
+
+def cache_key(url, params):
+    if not params:
+        return url
+    return f"{url}?{urlencode(sorted((str(k), str(v)) for k, v in params.items()))}"
+
+
+class ResponseCache:
+    def __init__(self, path=CACHE_PATH, max_bytes=MAX_BYTES, clock=time.time):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.clock = clock
+        # The engine can be driven from more than one thread (eg. a fresh asyncio.run each time), so share one connection
+        # behind a lock rather than tying it to whichever thread opened it
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")     # It's a cache - losing the last write on a power cut is fine
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, "
+            "body BLOB NOT NULL, "
+            "etag TEXT, "
+            "last_modified TEXT, "
+            "expires_at REAL, "         # NULL == immutable
+            "last_used REAL NOT NULL, "
+            "size INTEGER NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_last_used ON responses (last_used)")
+        self.conn.commit()
+        self.stats = {"hits": 0, "misses": 0, "revalidated": 0, "stored": 0, "evicted": 0}
+
+    # Returns (body, None) for a fresh hit, (None, conditional headers) for a stale entry the server can revalidate, or
+    # (None, None) if there's nothing usable
+    def lookup(self, url, params):
+        key = cache_key(url, params)
+        now = self.clock()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT body, etag, last_modified, expires_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.stats["misses"] += 1
+                return None, None
+            body, etag, last_modified, expires_at = row
+            if expires_at is None or expires_at > now:
+                self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+                self.conn.commit()
+                self.stats["hits"] += 1
+                return body, None
+
+        self.stats["misses"] += 1
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+        return None, headers or None
+
+    # The server said 304 - our stale copy is still good, so give it a new lease of life and hand it back
+    def revalidated(self, url, params):
+        key = cache_key(url, params)
+        now = self.clock()
+        ttl = ttl_for(url, params, now)
+        with self.lock:
+            row = self.conn.execute("SELECT body FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute(
+                "UPDATE responses SET expires_at = ?, last_used = ? WHERE key = ?",
+                (None if ttl is IMMUTABLE else now + ttl, now, key)
+            )
+            self.conn.commit()
+        self.stats["misses"] -= 1
+        self.stats["revalidated"] += 1
+        return row[0]
+
+    def store(self, url, params, body, etag=None, last_modified=None):
+        now = self.clock()
+        ttl = ttl_for(url, params, now)
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, body, etag, last_modified, expires_at, last_used, size) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (cache_key(url, params), body, etag, last_modified, None if ttl is IMMUTABLE else now + ttl, now, len(body))
+            )
+            self._evict()
+            self.conn.commit()
+        self.stats["stored"] += 1
+
+    # Drop least-recently-used entries until the bodies fit inside max_bytes again
+    def _evict(self):
+        total = self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        for key, size in self.conn.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall():
+            if total <= self.max_bytes:
+                break
+            self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+            self.stats["evicted"] += 1
+
+    def size_bytes(self):
+        with self.lock:
+            return self.conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def report(self):
+        lookups = self.stats["hits"] + self.stats["misses"] + self.stats["revalidated"]
+        saved = self.stats["hits"] + self.stats["revalidated"]
+        rate = f"{saved / lookups:.0%}" if lookups else "n/a"
+        return (f"🗄️ Response cache: {self.stats['hits']} hits, {self.stats['revalidated']} revalidated (304), "
+                f"{self.stats['misses']} misses - {rate} served locally; {self.stats['evicted']} evicted, "
+                f"{self.size_bytes() / 1024:,.0f}KB on disk")
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+
+
+# The cache fetchEngine uses when it isn't handed one, or None if caching has been switched off
+def open_default():
+    if not CACHE_PATH:
+        return None
+    try:
+        return ResponseCache(CACHE_PATH)
+    except sqlite3.Error as e:
+        print(f"⚠️ Response cache unavailable ({e}), carrying on without it")
+        return None
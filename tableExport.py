@@ -0,0 +1,128 @@
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+import metrics
+import tableStore
+
+try:
+    import brotli   # Optional - without it we just don't write the .br variants
+except ImportError:
+    brotli = None
+
+# A compact, columnar copy of tableData.json for the website widget, split by how often each part changes:
+#   - tableData.static.json: symbol, name, thumb and start price/date for each coin. These only change when the coin list or
+#     start prices do, so the widget asks for it as tableData.static.json?v=<version> and it can be cached for as long as
+#     the browser likes - a new version means a new URL
+#   - tableData.hot.json: today's price and % change (per currency too, plus any coin's validation status) - the only part
+#     that moves every hour. Each field is one array in the same coin order as the static file, so no key is repeated per
+#     coin, and it names the static version it goes with
+# Next to each sits a gzip copy (.gz), and a brotli one (.br) if the brotli package is installed, for hosts that can serve
+# precompressed files. Everything is only rewritten if its content actually changed, same as tableData.json itself.
+# tableData.json stays as it is - these are written alongside it.
+
+STATIC_SUFFIX = ".static.json"
+HOT_SUFFIX = ".hot.json"
+STATIC_FIELDS = [("symbol", "symbol"), ("name", "id"), ("thumb", "thumb"), ("start_price", "start_price")]
+
+
+def payload_base(table_path):
+    return os.path.splitext(table_path)[0]
+
+
+def static_path(table_path):
+    return payload_base(table_path) + STATIC_SUFFIX
+
+
+def hot_path(table_path):
+    return payload_base(table_path) + HOT_SUFFIX
+
+
+def encode(payload):
+    return json.dumps(payload, separators=(",", ":"), ensure_ascii=False).encode("utf-8")
+
+
+def static_payload(table_data):
+    coins = list(table_data.values())
+    payload = {field: [coin.get(key) for coin in coins] for field, key in STATIC_FIELDS}
+    start_dates = {coin.get("start_date") for coin in coins}
+    # Nearly always one start date for the whole competition, so it's only spelled out per coin when they differ
+    payload["start_date"] = start_dates.pop() if len(start_dates) == 1 else [coin.get("start_date") for coin in coins]
+    currencies = sorted({currency for coin in coins for currency in coin.get("start_prices", {})})
+    if currencies:
+        payload["start_prices"] = {currency: [coin.get("start_prices", {}).get(currency) for coin in coins]
+                                   for currency in currencies}
+    return payload
+
+
+def hot_payload(table_data, version):
+    coins = list(table_data.values())
+    dates = {coin.get("todays_date") for coin in coins} - {None}
+    payload = {
+        "static": version,
+        "date": max(dates) if dates else None,
+        "price": [coin.get("todays_price") for coin in coins],
+        "percent_change": [coin.get("percent_change") for coin in coins]
+    }
+    # Only there when priceValidator.py has flagged a coin: "missing", "held" or "stale" for those, null for the rest
+    if any(coin.get("status") for coin in coins):
+        payload["status"] = [coin.get("status") for coin in coins]
+    currencies = sorted({currency for coin in coins for currency in coin.get("prices", {})})
+    if currencies:
+        payload["prices"] = {c: [coin.get("prices", {}).get(c) for coin in coins] for c in currencies}
+        payload["percent_changes"] = {c: [coin.get("percent_changes", {}).get(c) for coin in coins] for c in currencies}
+    return payload
+
+
+def write_if_changed(path, data):
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            if f.read() == data:
+                return False
+    # A temp file of its own (rather than path + ".tmp"), so two processes writing at once never share one
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)), prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    with os.fdopen(fd, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+    return True
+
+
+# The payload plus its precompressed copies. mtime=0 keeps the gzip bytes the same for the same content, so an unchanged
+# payload never shows up as a changed .gz
+def write_variants(path, data):
+    if not write_if_changed(path, data):
+        return False
+    write_if_changed(path + ".gz", gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli is not None:
+        write_if_changed(path + ".br", brotli.compress(data, quality=11))
+    return True
+
+
+# Writes both payloads for the table at table_path. Returns the names of the files that changed
+@metrics.timed("payload_export")
+def write_payloads(table_path, table_data):
+    written = []
+    static = encode(static_payload(table_data))
+    version = hashlib.sha1(static).hexdigest()[:12]
+    if write_variants(static_path(table_path), static):
+        written.append(os.path.basename(static_path(table_path)))
+    if write_variants(hot_path(table_path), encode(hot_payload(table_data, version))):
+        written.append(os.path.basename(hot_path(table_path)))
+    return written
+
+
+# Every payload file for the table that exists on disk (for the Action to commit)
+def payload_paths(table_path):
+    paths = []
+    for path in (static_path(table_path), hot_path(table_path)):
+        paths.extend(p for p in (path, path + ".gz", path + ".br") if os.path.exists(p))
+    return paths
+
+
+if __name__ == "__main__":
+    # Rebuild the payloads for tableData.json by hand (the updater normally does this whenever it writes the table)
+    table_path = "tableData.json"
+    with tableStore.locked(table_path):
+        written = write_payloads(table_path, tableStore.load_table(table_path))
+    print(f"Wrote {', '.join(written) or 'nothing - already up to date'}")
@@ -0,0 +1,155 @@
+from contextlib import contextmanager
+import json
+import os
+import tempfile
+import time
+import metrics
+
+try:
+    import fcntl
+except ImportError:     # Windows
+    fcntl = None
+    import msvcrt
+
+# Reading and writing tableData.json. The updater used to patch every coin and re-dump the whole file (pretty-printed) every
+# hour, so the Action committed a fresh 32 KB document even when the only thing that moved was a price by a cent. Now:
+#   - new values are compared with the stored ones, and coins that haven't moved beyond a tolerance are left alone
+#   - if nothing moved, nothing is written (so there's nothing for the Action to commit)
+#   - writes are compact, and go to a temp file that is renamed over the original, so the site never sees a half-written file
+#   - every read-modify-write (the updater, metaPipeline.py, startDataGetter.py) goes through merge_update(), which holds an
+#     advisory lock on tableData.json.lock, re-reads the file, and changes only the fields it was given - so overlapping runs
+#     (the hourly Action plus a manual one, or the daemon plus a backfill) queue up rather than undoing each other's work
+#
+# The lock waits up to TABLE_LOCK_TIMEOUT seconds (environment variable, defaults to 60) before giving up with a TimeoutError.
+
+PERCENT_TOLERANCE = 0.01    # Percentage points - the widget shows 2 decimal places, so anything smaller is invisible anyway
+LOCK_SUFFIX = ".lock"
+LOCK_TIMEOUT = float(os.environ.get("TABLE_LOCK_TIMEOUT", 60))
+LOCK_POLL = 0.05            # Seconds between attempts while someone else holds the lock
+
+
+def load_table(path):
+    with metrics.timer("json_load", file=os.path.basename(path)), open(path, "r") as f:
+        return json.load(f)
+
+
+def moved(old_price, new_price, old_percent, new_percent, tolerance):
+    return new_price != old_price and abs((new_percent or 0.0) - (old_percent or 0.0)) >= tolerance - 1e-9
+
+
+# updates is {symbol: {field: value}}. Returns the subset of updates that are worth writing - a coin counts as changed if it
+# has no price yet, it's a new day (so todays_date is never more than a day behind, however quiet the coin), or its price
+# moved and its percent_change moved by at least 'tolerance' percentage points. The same goes for each currency in the
+# per-currency prices/percent_changes (a currency we've never stored counts as changed too)
+def changed_entries(table_data, updates, tolerance=PERCENT_TOLERANCE):
+    changes = {}
+    for symbol, fields in updates.items():
+        current = table_data.get(symbol, {})
+        if "todays_price" not in current or current.get("todays_price") == 0:
+            changes[symbol] = fields
+        elif "todays_date" in fields and fields["todays_date"] != current.get("todays_date"):
+            changes[symbol] = fields
+        elif moved(current.get("todays_price"), fields.get("todays_price"),
+                   current.get("percent_change", 0.0), fields.get("percent_change", 0.0), tolerance):
+            changes[symbol] = fields
+        else:
+            old_prices, old_percents = current.get("prices", {}), current.get("percent_changes", {})
+            new_percents = fields.get("percent_changes", {})
+            for currency, price in fields.get("prices", {}).items():
+                if currency not in old_prices or moved(old_prices[currency], price, old_percents.get(currency),
+                                                       new_percents.get(currency), tolerance):
+                    changes[symbol] = fields
+                    break
+    return changes
+
+
+# Serialise to a temp file in the same directory, then rename it over the target. os.replace is atomic on the same
+# filesystem, so anyone reading the file gets either the old version or the new one, never a truncated mix
+def write_atomic(path, data):
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".%s." % os.path.basename(path), suffix=".tmp")
+    try:
+        with metrics.timer("json_dump", file=os.path.basename(path)), os.fdopen(fd, "w") as f:
+            json.dump(data, f, separators=(",", ":"))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+def try_lock(f):
+    try:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        else:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        return True
+    except OSError:
+        return False
+
+
+def unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# Holds the lock for the file at 'path' - a separate .lock file, so the lock survives the data file being renamed over. The
+# lock file itself is never deleted (removing it while someone waits on it would let two writers in at once). Locks are per
+# open file, so don't nest this for the same path within one process
+@contextmanager
+def locked(path, timeout=LOCK_TIMEOUT):
+    lock_path = path + LOCK_SUFFIX
+    with open(lock_path, "a+") as f:
+        deadline = time.monotonic() + timeout
+        with metrics.timer("table_lock_wait", file=os.path.basename(path)):
+            while not try_lock(f):
+                if time.monotonic() >= deadline:
+                    raise TimeoutError(f"Gave up waiting {timeout:g}s for {lock_path} - is another update stuck?")
+                time.sleep(LOCK_POLL)
+        try:
+            yield
+        finally:
+            unlock(f)
+
+
+# As in a JSON merge patch, a field set to None is removed (eg. a coin's "status" once there's nothing wrong with it)
+def merge(table_data, changes):
+    for symbol, fields in changes.items():
+        entry = table_data.setdefault(symbol, {})
+        for field, value in fields.items():
+            if value is None:
+                entry.pop(field, None)
+            else:
+                entry[field] = value
+
+
+# Applies changes ({symbol: {field: value}}) to the table as it is on disk right now, under its lock, and writes it back. Only
+# the given fields are touched, so writers of different fields (prices, names/thumbs, start prices) never clobber each other.
+# Anything built from the table - on_write(table_data), eg. the widget payloads - is written before the lock is released, so it
+# always lands in the same order as the table. Returns the merged table
+def merge_update(path, changes, on_write=None):
+    with locked(path):
+        table_data = load_table(path) if os.path.exists(path) else {}
+        merge(table_data, changes)
+        write_atomic(path, table_data)
+        if on_write is not None:
+            on_write(table_data)
+    return table_data
+
+
+# Merges the changes into the table on disk (see merge_update) and writes it, then brings table_data up to date with
+# what was written - including anything another writer changed since it was loaded. Returns False (and writes nothing) if
+# there was nothing to do
+def save_changes(path, table_data, changes, on_write=None):
+    if not changes:
+        return False
+    merged = merge_update(path, changes, on_write)
+    table_data.clear()
+    table_data.update(merged)
+    return True